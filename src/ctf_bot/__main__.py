@@ -1,13 +1,68 @@
 """Main entry point for the CTF bot when run as a module."""
-from .config import DISCORD_TOKEN
-from .discord_bot import create_bot
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
 
 
-def main():
-    """Main entry point for the CTF bot."""
+def run_bot() -> None:
+    from .config import DISCORD_TOKEN
+    from .discord_bot import create_bot
+
     bot = create_bot()
     bot.run(DISCORD_TOKEN)
 
 
+def run_export(args: argparse.Namespace) -> int:
+    """Export a tenant's meeting docs; returns the exit status."""
+    from .config import EXPORT_DIR, TENANTS_FILE
+    from .export import export_meeting_docs
+    from .integrations.google_docs import get_docs_manager
+    from .tenants import TenantRegistry, default_tenant
+
+    registry = TenantRegistry(TENANTS_FILE, default_tenant())
+    tenants = {t.name: t for t in registry.tenants()}
+    if args.tenant not in tenants:
+        print(f"Unknown tenant '{args.tenant}' (have: {', '.join(sorted(tenants))}).")
+        return 2
+    tenant = tenants[args.tenant]
+    out_dir = args.out or EXPORT_DIR / tenant.name
+
+    result = export_meeting_docs(get_docs_manager(tenant), out_dir, args.workers, args.full)
+    print(
+        f"Exported {len(result.exported)} docs to {out_dir}, "
+        f"{len(result.unchanged)} unchanged, {len(result.failed)} failed."
+    )
+    for error in result.failed.values():
+        print(f"  {error}")
+    return 1 if result.failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Main entry point for the CTF bot: runs the bot, or `export`."""
+    from .config import EXPORT_WORKERS
+    from .tenants import DEFAULT_TENANT_NAME
+
+    parser = argparse.ArgumentParser(prog="ctf-bot", description="CTF meeting agenda bot.")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("run", help="run the Discord bot (the default)")
+    export = commands.add_parser(
+        "export", help="write every meeting doc to a local Markdown archive"
+    )
+    export.add_argument("--tenant", default=DEFAULT_TENANT_NAME,
+                        help="which team's folder to export (see TENANTS_FILE)")
+    export.add_argument("--out", type=Path, default=None,
+                        help="output directory (default: EXPORT_DIR/<tenant>)")
+    export.add_argument("--workers", type=int, default=EXPORT_WORKERS,
+                        help="docs downloaded at once")
+    export.add_argument("--full", action="store_true",
+                        help="re-export every doc, not just those changed since the last run")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        sys.exit(run_export(args))
+    run_bot()
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -30,3 +30,112 @@ SCOPES = [
     "https://www.googleapis.com/auth/documents",
     "https://www.googleapis.com/auth/drive",
 ]
+
+# Cache of (folder, doc name) -> file ID lookups, so we don't hit Drive every command
+DOC_ID_CACHE_TTL = float(os.environ.get("DOC_ID_CACHE_TTL", "600"))  # seconds
+DOC_ID_CACHE_SIZE = int(os.environ.get("DOC_ID_CACHE_SIZE", "128"))
+
+# Single add_agenda_item calls for the same doc arriving within this window are
+# written together. The journal replayer already batches and never waits.
+AGENDA_COALESCE_WINDOW = float(os.environ.get("AGENDA_COALESCE_WINDOW", "0.3"))  # seconds
+
+# Compute the new agenda cell's index from one snapshot (single round trip)
+# instead of re-fetching the doc after inserting the row
+AGENDA_INDEX_ARITHMETIC = os.environ.get("AGENDA_INDEX_ARITHMETIC", "true").lower() in ("1", "true", "yes")
+
+# Number of parsed document snapshots kept in memory, keyed by revision
+DOC_SNAPSHOT_CACHE_SIZE = int(os.environ.get("DOC_SNAPSHOT_CACHE_SIZE", "16"))
+
+# Writable local state (the .secret volume is mounted read-only in Docker)
+_state_dir = os.environ.get("BOT_STATE_DIR", ".state")
+STATE_DIR = Path(_state_dir) if os.path.isabs(_state_dir) else project_root / _state_dir
+MEETING_NUMBERS_DB = STATE_DIR / "meeting_numbers.sqlite3"
+
+# Other teams' guilds can be given their own folder, docs, credentials and
+# quotas in a JSON tenants file (see tenants.py); the settings in this file
+# are the "default" tenant, serving every guild the file doesn't list.
+# Reload it with !reload-tenants.
+_tenants_file = os.environ.get("TENANTS_FILE", ".secret/tenants.json")
+TENANTS_FILE = Path(_tenants_file) if os.path.isabs(_tenants_file) else project_root / _tenants_file
+
+# Gateway sharding: DISCORD_SHARD_COUNT=auto (Discord's recommendation) or a
+# number runs the bot with several gateway connections; DISCORD_SHARD_IDS=0,1
+# makes this process run only those shards, for splitting them across processes.
+DISCORD_SHARD_COUNT = os.environ.get("DISCORD_SHARD_COUNT", "").lower()
+DISCORD_SHARD_IDS = [int(s) for s in os.environ.get("DISCORD_SHARD_IDS", "").split(",") if s.strip()]
+
+# /add-agenda and /create-doc are registered with Discord on startup unless
+# DISCORD_SYNC_COMMANDS=false (e.g. for all but one of several shard processes)
+DISCORD_SYNC_COMMANDS = os.environ.get("DISCORD_SYNC_COMMANDS", "true").lower() == "true"
+
+# How commands talk to Google: "thread" runs googleapiclient in worker threads,
+# "asyncio" uses the native aiohttp client in integrations/google_async.py, and
+# "process" runs each tenant's googleapiclient threads in a child process
+# (integrations/google_worker.py) so parsing big docs never stalls the gateway
+GOOGLE_TRANSPORT = os.environ.get("GOOGLE_TRANSPORT", "thread").lower()
+GOOGLE_HTTP_POOL_SIZE = int(os.environ.get("GOOGLE_HTTP_POOL_SIZE", "20"))
+# Threads each tenant's Google calls run on with the "thread" and "process" transports
+GOOGLE_WORKER_THREADS = int(os.environ.get("GOOGLE_WORKER_THREADS", "8"))
+
+# Import the Google client libraries in the background once connected to
+# Discord, instead of at startup or on the first command
+GOOGLE_WARM_UP = os.environ.get("GOOGLE_WARM_UP", "true").lower() in ("1", "true", "yes")
+
+# Access tokens are refreshed in the background this many seconds before they
+# expire, and saved (owner-only) to GOOGLE_TOKEN_CACHE so restarts and worker
+# processes reuse them; set GOOGLE_TOKEN_CACHE= (empty) to keep them in memory
+GOOGLE_TOKEN_REFRESH_MARGIN = float(os.environ.get("GOOGLE_TOKEN_REFRESH_MARGIN", "600"))
+_token_cache = os.environ.get("GOOGLE_TOKEN_CACHE", str(STATE_DIR / "google_tokens.json"))
+GOOGLE_TOKEN_CACHE = (
+    (Path(_token_cache) if os.path.isabs(_token_cache) else project_root / _token_cache)
+    if _token_cache else None
+)
+
+# Google API quotas (requests per minute) enforced client-side, and how many
+# times a 429/5xx is retried with backoff
+DRIVE_READS_PER_MINUTE = float(os.environ.get("DRIVE_READS_PER_MINUTE", "1000"))
+DRIVE_WRITES_PER_MINUTE = float(os.environ.get("DRIVE_WRITES_PER_MINUTE", "300"))
+DOCS_READS_PER_MINUTE = float(os.environ.get("DOCS_READS_PER_MINUTE", "300"))
+DOCS_WRITES_PER_MINUTE = float(os.environ.get("DOCS_WRITES_PER_MINUTE", "60"))
+GOOGLE_MAX_RETRIES = int(os.environ.get("GOOGLE_MAX_RETRIES", "5"))
+
+# Commands are queued per target document: at most this many waiting per doc,
+# and at most this many docs worked on at once
+DISPATCH_MAX_BACKLOG = int(os.environ.get("DISPATCH_MAX_BACKLOG", "25"))
+DISPATCH_MAX_PARALLEL = int(os.environ.get("DISPATCH_MAX_PARALLEL", "4"))
+
+# Agenda items are journaled locally before being written to Google
+AGENDA_JOURNAL_DB = STATE_DIR / "agenda_journal.sqlite3"
+AGENDA_REPLAY_BATCH_SIZE = int(os.environ.get("AGENDA_REPLAY_BATCH_SIZE", "50"))
+AGENDA_JOURNAL_MAX_ATTEMPTS = int(os.environ.get("AGENDA_JOURNAL_MAX_ATTEMPTS", "8"))
+
+# Prometheus-format /metrics endpoint; set METRICS_PORT=0 to turn it off.
+# Use METRICS_HOST=0.0.0.0 to scrape it from outside a container.
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9108"))
+
+# Ready-made copies of TEMPLATE_DOC_NAME (meeting number already filled in)
+# kept in TEMPLATE_STAGING_FOLDER_ID, so !create-doc only has to rename one.
+# Off by default (TEMPLATE_POOL_SIZE=0); the staged copies are visible in the
+# staging folder, so give them a folder of their own rather than the shared one.
+# The pool is checked against the template's modifiedTime every
+# TEMPLATE_POOL_CHECK_INTERVAL seconds.
+TEMPLATE_POOL_SIZE = int(os.environ.get("TEMPLATE_POOL_SIZE", "0"))
+TEMPLATE_STAGING_FOLDER_ID = os.environ.get("TEMPLATE_STAGING_FOLDER_ID", FOLDER_ID)
+TEMPLATE_POOL_CHECK_INTERVAL = float(os.environ.get("TEMPLATE_POOL_CHECK_INTERVAL", "300"))
+STAGED_DOCS_DB = STATE_DIR / "staged_docs.sqlite3"
+
+# !agenda answers from the cached agenda doc while Drive's changes feed,
+# polled every AGENDA_CHANGES_POLL_INTERVAL seconds, says it hasn't changed.
+# 0 turns polling off; every !agenda then checks the doc's revision instead.
+AGENDA_CHANGES_POLL_INTERVAL = float(os.environ.get("AGENDA_CHANGES_POLL_INTERVAL", "30"))
+
+# Slash command autocomplete answers from an in-memory listing of the folder,
+# re-read every FOLDER_INDEX_REFRESH_INTERVAL seconds or when Drive reports a change
+FOLDER_INDEX_REFRESH_INTERVAL = float(os.environ.get("FOLDER_INDEX_REFRESH_INTERVAL", "300"))
+
+# `ctf-bot export` writes each meeting doc as Markdown under EXPORT_DIR/<tenant>,
+# downloading EXPORT_WORKERS docs at once; later runs only fetch changed docs
+_export_dir = os.environ.get("EXPORT_DIR", "export")
+EXPORT_DIR = Path(_export_dir) if os.path.isabs(_export_dir) else project_root / _export_dir
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", "8"))
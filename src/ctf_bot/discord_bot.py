@@ -1,22 +1,325 @@
 """Discord bot integration for CTF bot."""
 import asyncio
+import re
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
 import discord
+from discord import app_commands
 from discord.ext import commands
 
-from .config import TARGET_DOC_NAME
-from .integrations.google_docs import GoogleDocsManager
+from .config import (
+    TARGET_DOC_NAME, GOOGLE_TRANSPORT, METRICS_HOST, METRICS_PORT, GOOGLE_WARM_UP,
+    TENANTS_FILE, DISCORD_SHARD_COUNT, DISCORD_SHARD_IDS, DISCORD_SYNC_COMMANDS,
+)
+from .dispatcher import QueueFull
+from .metrics import format_stats, registry, start_metrics_server
+from .integrations import google_async, google_docs
+from .integrations.templating import PLACEHOLDER_RE
+from .runtime import TenantRuntime
+from .tenants import Tenant, TenantRegistry, default_tenant
 
 
-def create_bot():
+AGENDA_ITEM_MAX_LENGTH = 500
+AGENDA_BULK_MAX_ITEMS = 200
+AGENDA_ATTACHMENT_MAX_BYTES = 100_000
+DOC_NAME_MAX_LENGTH = 100
+
+# Bullets, numbering and checkboxes in front of pasted list items
+_LIST_MARKER = re.compile(r"^(?:[-*+•]|\d+[.)]|\[[ xX]?\])\s+")
+
+
+def split_agenda_items(text: str) -> List[str]:
+    """One agenda item per non-blank line, without list markers or Markdown headings."""
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#"):
+            continue
+        while _LIST_MARKER.match(line):
+            line = _LIST_MARKER.sub("", line, count=1).strip()
+        if line:
+            items.append(line)
+    return items
+
+
+def bulk_agenda_report(count: int, too_long: List[int], doc_name: str = TARGET_DOC_NAME) -> str:
+    """
+    Reply for !add-agenda-bulk once its items are journaled; `too_long` are
+    1-based item numbers. How the writes went comes later, as a ✅ on the
+    message or a reply listing what couldn't be added.
+    """
+    accepted = count - len(too_long)
+    if accepted:
+        lines = [
+            f"📝 Recorded {accepted} item(s) for the '{doc_name}' agenda table. "
+            f"I'll react with ✅ once they're in the doc."
+        ]
+    else:
+        lines = [f"Nothing recorded for the '{doc_name}' agenda table."]
+    lines += [f"❌ #{n}: too long (max {AGENDA_ITEM_MAX_LENGTH} chars), skipped" for n in too_long]
+    report = "\n".join(lines)
+    return report if len(report) <= 1900 else report[:1899] + "…"
+
+
+def agenda_failure_report(failed: List[Tuple[str, str]]) -> str:
+    """Reply to a message whose agenda items (text, error) were given up on."""
+    if len(failed) == 1:
+        return f"❌ Couldn't add this to the agenda after several tries: `{failed[0][1]}`"
+    lines = [f"❌ Couldn't add {len(failed)} item(s) to the agenda after several tries:"]
+    for n, (text, error) in enumerate(failed, 1):
+        line = f"- {text[:80]}: `{error[:200]}`"
+        if sum(len(l) + 1 for l in lines) + len(line) > 1850:
+            lines.append(f"… and {len(failed) - n + 1} more")
+            break
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def agenda_listing(items: List[str], doc_name: str = TARGET_DOC_NAME) -> str:
+    """Reply for !agenda: the items numbered, cut off to fit one message."""
+    if not items:
+        return f"The '{doc_name}' agenda is empty."
+    lines = [f"**{doc_name}** agenda:"]
+    for n, item in enumerate(items, 1):
+        line = f"{n}. {item or '(empty)'}"
+        if sum(len(l) + 1 for l in lines) + len(line) > 1850:
+            lines.append(f"… and {len(items) - n + 1} more")
+            break
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def parse_doc_fields(text: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Split `name | key=value | key=value` into the doc name and the template
+    fields. Raises ValueError for a part that isn't key=value.
+    """
+    name, *parts = text.split("|")
+    fields = {}
+    for part in parts:
+        key, sep, value = part.partition("=")
+        key = key.strip()
+        if not sep or not PLACEHOLDER_RE.fullmatch(f"{{{{{key}}}}}"):
+            raise ValueError(part.strip())
+        fields[key] = value.strip()
+    return name.strip(), fields
+
+
+async def record_agenda_item(
+    runtime: TenantRuntime, item: str, channel_id: Optional[int], message_id: Optional[int]
+) -> str:
+    """Journal one agenda item for the replayer to write; returns the reply."""
+    try:
+        await asyncio.to_thread(runtime.journal.append, item, channel_id, message_id)
+    except Exception as e:
+        return f"Failed to add agenda item: `{e}`"
+    runtime.replayer.wake()
+    return (
+        f"📝 Recorded for the '{runtime.tenant.target_doc_name}' agenda table. "
+        f"I'll react with ✅ once it's in the doc."
+    )
+
+
+async def acknowledge(interaction: discord.Interaction) -> None:
+    """
+    Defer a slash command before doing anything else: Discord only waits 3
+    seconds for the first response, and the user sees "thinking..." at once.
+    """
+    interaction.extras["started_at"] = time.perf_counter()
+    await interaction.response.defer(thinking=True)
+
+
+async def warm_up_google() -> None:
+    """Load the Google client stack in a worker thread, off the event loop."""
+    if GOOGLE_TRANSPORT == "process":
+        return  # each worker process loads its own
+    module = google_async if GOOGLE_TRANSPORT == "asyncio" else google_docs
+    await asyncio.to_thread(module.warm_up)
+
+
+def make_bot(intents: discord.Intents) -> commands.Bot:
+    """A Bot on one gateway connection, or an AutoShardedBot if DISCORD_SHARD_COUNT is set."""
+    if not DISCORD_SHARD_COUNT:
+        return commands.Bot(command_prefix="!", intents=intents)
+    if DISCORD_SHARD_COUNT == "auto":
+        if DISCORD_SHARD_IDS:
+            raise RuntimeError("DISCORD_SHARD_IDS needs a fixed DISCORD_SHARD_COUNT.")
+        return commands.AutoShardedBot(command_prefix="!", intents=intents)
+    return commands.AutoShardedBot(
+        command_prefix="!",
+        intents=intents,
+        shard_count=int(DISCORD_SHARD_COUNT),
+        shard_ids=DISCORD_SHARD_IDS or None,
+    )
+
+
+def create_bot(tenants: Optional[TenantRegistry] = None):
     intents = discord.Intents.default()
     intents.message_content = True
     
-    bot = commands.Bot(command_prefix="!", intents=intents)
-    
+    bot = make_bot(intents)
+    if tenants is None:
+        tenants = TenantRegistry(TENANTS_FILE, default_tenant())
+    runtimes: Dict[str, TenantRuntime] = {}
+
+    async def queue_feedback(
+        reply: Callable[[str], Awaitable[object]], runtime: TenantRuntime, key: str, run, payload
+    ):
+        """Queue a job for `key`, telling the user where they are in line."""
+        try:
+            ahead, result = runtime.dispatcher.submit(key, run, payload)
+        except QueueFull:
+            await reply("⏳ That document is busy right now, please try again in a minute.")
+            return None
+        if ahead:
+            await reply(f"⏳ Queued, {ahead} request(s) ahead of you.")
+        return result
+
+    async def queue_create_doc(
+        reply: Callable[[str], Awaitable[object]], runtime: TenantRuntime,
+        name: str, fields: Dict[str, str], template: Optional[str],
+    ):
+        """Queue a create-doc job behind the others copying the same template."""
+        try:
+            key = await runtime.create_doc_key(template)
+        except Exception as e:
+            await reply(f"Failed to create document: `{e}`")
+            return None
+        return await queue_feedback(reply, runtime, key, runtime.create_doc, (name, fields, template))
+
+    # Agenda items are recorded locally first, then written to the doc in
+    # batches by the replayer. Once every item from a message is settled it
+    # gets a ✅, or one reply listing the items that couldn't be added.
+    async def agenda_message_settled(
+        channel_id: Optional[int], message_id: Optional[int], failed: List[Tuple[str, str]]
+    ):
+        channel = bot.get_channel(channel_id) if channel_id else None
+        if channel is None or not message_id:
+            return
+        message = channel.get_partial_message(message_id)
+        try:
+            if failed:
+                await message.reply(agenda_failure_report(failed))
+            else:
+                await message.add_reaction("✅")
+        except discord.HTTPException:
+            pass
+
+    # Each tenant gets its own queues, journal, background tasks and Google
+    # budget; they are created on first use and started once connected
+    def runtime_for(tenant: Tenant) -> TenantRuntime:
+        runtime = runtimes.get(tenant.name)
+        if runtime is None:
+            runtime = runtimes[tenant.name] = TenantRuntime(
+                tenant, on_settled=agenda_message_settled
+            )
+        if bot.is_ready() and not runtime.started:
+            asyncio.ensure_future(runtime.start())
+        return runtime
+
+    def guild_runtime(guild_id: Optional[int]) -> Optional[TenantRuntime]:
+        """The runtime of the tenant serving `guild_id`, or None."""
+        tenant = tenants.for_guild(guild_id)
+        return runtime_for(tenant) if tenant is not None else None
+
+    async def tenant_runtime(ctx: commands.Context) -> Optional[TenantRuntime]:
+        """The runtime of the tenant serving the command's guild, or None after telling the user."""
+        runtime = guild_runtime(ctx.guild.id if ctx.guild is not None else None)
+        if runtime is None:
+            await ctx.reply("This server isn't set up with a Google Drive folder.")
+        return runtime
+
+    def start_served_tenants() -> None:
+        """Start the tenants serving the guilds on this process's shards."""
+        for guild in bot.guilds:
+            tenant = tenants.for_guild(guild.id)
+            if tenant is not None:
+                runtime_for(tenant)
+
+    async def reload_tenants() -> List[Tenant]:
+        """Re-read the tenants file; runtimes of changed or removed tenants are replaced."""
+        configured = await asyncio.to_thread(tenants.reload)
+        current = set(configured)
+        for name, runtime in list(runtimes.items()):
+            if runtime.tenant not in current:
+                del runtimes[name]
+                await runtime.stop()
+        if GOOGLE_TRANSPORT == "asyncio":
+            await google_async.drop_async_docs_managers(current)
+        else:
+            google_docs.drop_docs_managers(current)
+        start_served_tenants()
+        return configured
+
+    metrics_server = None
+    commands_synced = False
+
+    @bot.before_invoke
+    async def start_command_timer(ctx: commands.Context):
+        ctx.started_at = time.perf_counter()
+
+    @bot.after_invoke
+    async def record_command_time(ctx: commands.Context):
+        started = getattr(ctx, "started_at", None)
+        if started is not None:
+            registry.observe(
+                "command_seconds", time.perf_counter() - started,
+                command=ctx.command.qualified_name,
+                outcome="error" if ctx.command_failed else "ok",
+            )
+
+    def record_slash_time(interaction: discord.Interaction, outcome: str) -> None:
+        started = interaction.extras.get("started_at")
+        if started is not None and interaction.command is not None:
+            registry.observe(
+                "command_seconds", time.perf_counter() - started,
+                command=f"/{interaction.command.qualified_name}", outcome=outcome,
+            )
+
+    @bot.event
+    async def on_app_command_completion(interaction: discord.Interaction, command):
+        record_slash_time(interaction, "ok")
+
+    @bot.tree.error
+    async def on_slash_command_error(
+        interaction: discord.Interaction, error: app_commands.AppCommandError
+    ):
+        record_slash_time(interaction, "error")
+        print(f"Slash command failed: {error!r}")
+
     @bot.event
     async def on_ready():
+        nonlocal metrics_server, commands_synced
         print(f"Logged in as {bot.user} (id={bot.user.id})")
+        if METRICS_PORT and metrics_server is None:
+            try:
+                metrics_server = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+                print(f"Serving metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+            except OSError as e:
+                print(f"Metrics endpoint disabled: {e}")
+        # Load the client libraries once up front so the first command
+        # doesn't pay for it; each tenant then syncs its meeting numbers
+        try:
+            if GOOGLE_WARM_UP:
+                await warm_up_google()
+        except Exception as e:
+            print(f"Google client warm-up failed: {e}")
+        start_served_tenants()
+        # on_ready fires again after reconnects; registering once is enough
+        if DISCORD_SYNC_COMMANDS and not commands_synced:
+            try:
+                synced = await bot.tree.sync()
+                commands_synced = True
+                print(f"Registered {len(synced)} slash command(s)")
+            except discord.HTTPException as e:
+                print(f"Slash command registration failed: {e}")
+
+    @bot.event
+    async def on_guild_join(guild: discord.Guild):
+        tenant = tenants.for_guild(guild.id)
+        if tenant is not None:
+            runtime_for(tenant)
     
     @bot.command(name="add-agenda")
     async def add_agenda(ctx: commands.Context, *, item: str):
@@ -25,48 +328,234 @@ def create_bot():
         if not item:
             await ctx.reply("Usage: `!add-agenda <text>`")
             return
-        if len(item) > 500:
-            await ctx.reply("Agenda item too long (max 500 chars).")
+        if len(item) > AGENDA_ITEM_MAX_LENGTH:
+            await ctx.reply(f"Agenda item too long (max {AGENDA_ITEM_MAX_LENGTH} chars).")
+            return
+        runtime = await tenant_runtime(ctx)
+        if runtime is None:
             return
+        await ctx.reply(await record_agenda_item(runtime, item, ctx.channel.id, ctx.message.id))
+    
+    @bot.command(name="add-agenda-bulk")
+    async def add_agenda_bulk(ctx: commands.Context, *, text: str = ""):
+        """Add one agenda item per line of the message, or of an attached .txt/.md file."""
+        for attachment in ctx.message.attachments:
+            if not attachment.filename.lower().endswith((".txt", ".md")):
+                await ctx.reply("Only .txt and .md attachments can be imported.")
+                return
+            if attachment.size > AGENDA_ATTACHMENT_MAX_BYTES:
+                await ctx.reply(f"`{attachment.filename}` is too large (max 100 KB).")
+                return
+            text += "\n" + (await attachment.read()).decode("utf-8", errors="replace")
 
-        async with ctx.channel.typing():
-            # Build services (blocking work goes in a thread)
-            def work():
-                docs_manager = GoogleDocsManager()
-                docs_manager.add_agenda_item(item)
+        items = split_agenda_items(text)
+        if not items:
+            await ctx.reply("Usage: `!add-agenda-bulk` followed by one item per line, "
+                            "or with a .txt/.md file attached")
+            return
+        if len(items) > AGENDA_BULK_MAX_ITEMS:
+            await ctx.reply(f"Too many items ({len(items)}, max {AGENDA_BULK_MAX_ITEMS}).")
+            return
+
+        runtime = await tenant_runtime(ctx)
+        if runtime is None:
+            return
 
+        too_long = [n for n, item in enumerate(items, 1) if len(item) > AGENDA_ITEM_MAX_LENGTH]
+        accepted = [item for item in items if len(item) <= AGENDA_ITEM_MAX_LENGTH]
+        if accepted:
+            # The replayer settles the message (✅ or one failure reply) by itself
             try:
-                await asyncio.to_thread(work)
+                await asyncio.to_thread(
+                    runtime.journal.append_many, accepted, ctx.channel.id, ctx.message.id
+                )
             except Exception as e:
-                await ctx.reply(f"Failed to add agenda item: `{e}`")
+                await ctx.reply(f"Failed to add agenda items: `{e}`")
                 return
+            runtime.replayer.wake()
 
-        await ctx.reply(f"✅ Added to '{TARGET_DOC_NAME}' agenda table.")
+        await ctx.reply(bulk_agenda_report(len(items), too_long, runtime.tenant.target_doc_name))
     
+    @bot.command(name="agenda")
+    async def agenda(ctx: commands.Context):
+        """List the items in the meeting agenda."""
+        runtime = await tenant_runtime(ctx)
+        if runtime is None:
+            return
+        watcher = runtime.change_watcher
+        trust_cache = watcher is not None and watcher.is_fresh()
+        try:
+            items = await runtime.call("agenda_items", trust_cache)
+        except Exception as e:
+            await ctx.reply(f"Failed to read the agenda: `{e}`")
+            return
+        await ctx.reply(agenda_listing(items, runtime.tenant.target_doc_name))
+
     @bot.command(name="create-doc")
     async def create_doc(ctx: commands.Context, *, name: str):
-        """Create a new document from the template."""
-        name = name.strip()
+        """
+        Create a new document from the template. Fill extra `{{placeholders}}`
+        with `!create-doc <name> | ctf=Example CTF | attendees=...`.
+        """
+        try:
+            name, fields = parse_doc_fields(name)
+        except ValueError as e:
+            await ctx.reply(f"Template fields must look like `| key=value`, got `{e}`.")
+            return
         if not name:
-            await ctx.reply("Usage: `!create-doc <document name>`")
+            await ctx.reply("Usage: `!create-doc <document name> [| key=value ...]`")
             return
-        if len(name) > 100:
-            await ctx.reply("Document name too long (max 100 chars).")
+        if len(name) > DOC_NAME_MAX_LENGTH:
+            await ctx.reply(f"Document name too long (max {DOC_NAME_MAX_LENGTH} chars).")
             return
 
-        async with ctx.channel.typing():
-            # Build services (blocking work goes in a thread)
-            def work():
-                docs_manager = GoogleDocsManager()
-                doc_id = docs_manager.create_from_template(name)
-                return doc_id
+        runtime = await tenant_runtime(ctx)
+        if runtime is None:
+            return
+
+        result = await queue_create_doc(ctx.reply, runtime, name, fields, None)
+        if result is None:
+            return
 
+        async with ctx.channel.typing():
             try:
-                doc_id = await asyncio.to_thread(work)
+                doc_id = await result
             except Exception as e:
                 await ctx.reply(f"Failed to create document: `{e}`")
                 return
 
+        if runtime.provisioner is not None:
+            runtime.provisioner.wake()
         await ctx.reply(f"✅ Created document '{name}' from template. Document ID: {doc_id}")
     
+    # Slash versions of !add-agenda and !create-doc. They defer straight away
+    # and edit the deferred reply with the result; autocomplete answers from
+    # the tenant's in-memory folder index, so typing never touches Drive.
+    async def doc_name_choices(
+        interaction: discord.Interaction, current: str
+    ) -> List[app_commands.Choice[str]]:
+        runtime = guild_runtime(interaction.guild_id)
+        if runtime is None:
+            return []
+        return [
+            app_commands.Choice(name=name, value=name)
+            for name in runtime.folder_index.suggest(current)
+        ]
+
+    async def template_choices(
+        interaction: discord.Interaction, current: str
+    ) -> List[app_commands.Choice[str]]:
+        runtime = guild_runtime(interaction.guild_id)
+        if runtime is None:
+            return []
+        return [
+            app_commands.Choice(name=name, value=name)
+            for name in runtime.folder_index.suggest(current, runtime.tenant.template_doc_name)
+        ]
+
+    @bot.tree.command(name="add-agenda", description="Add an item to the meeting agenda.")
+    @app_commands.describe(item="The agenda item")
+    async def add_agenda_slash(
+        interaction: discord.Interaction,
+        item: app_commands.Range[str, 1, AGENDA_ITEM_MAX_LENGTH],
+    ):
+        await acknowledge(interaction)
+        runtime = guild_runtime(interaction.guild_id)
+        if runtime is None:
+            await interaction.edit_original_response(
+                content="This server isn't set up with a Google Drive folder."
+            )
+            return
+        item = item.strip()
+        if not item:
+            await interaction.edit_original_response(content="The agenda item is empty.")
+            return
+        # The deferred reply keeps its ID once edited; the ✅ goes on it
+        reply = await interaction.original_response()
+        await interaction.edit_original_response(
+            content=await record_agenda_item(runtime, item, interaction.channel_id, reply.id)
+        )
+
+    @bot.tree.command(name="create-doc", description="Create a new document from a template.")
+    @app_commands.describe(
+        name="Name of the new document",
+        template="Template to copy (default: the configured template)",
+        fields="Extra template fields, e.g. ctf=Example CTF | attendees=alice, bob",
+    )
+    @app_commands.autocomplete(name=doc_name_choices, template=template_choices)
+    async def create_doc_slash(
+        interaction: discord.Interaction,
+        name: app_commands.Range[str, 1, DOC_NAME_MAX_LENGTH],
+        template: Optional[str] = None,
+        fields: Optional[str] = None,
+    ):
+        await acknowledge(interaction)
+
+        async def reply(content: str):
+            await interaction.edit_original_response(content=content)
+
+        try:
+            _, parsed = parse_doc_fields(f"|{fields}") if fields else ("", {})
+        except ValueError as e:
+            await reply(f"Template fields must look like `key=value | key=value`, got `{e}`.")
+            return
+        name = name.strip()
+        if not name:
+            await reply("The document name is empty.")
+            return
+        runtime = guild_runtime(interaction.guild_id)
+        if runtime is None:
+            await reply("This server isn't set up with a Google Drive folder.")
+            return
+
+        # Queue notices show in the deferred reply until the result replaces them
+        result = await queue_create_doc(reply, runtime, name, parsed, template)
+        if result is None:
+            return
+        try:
+            doc_id = await result
+        except Exception as e:
+            await reply(f"Failed to create document: `{e}`")
+            return
+
+        if runtime.provisioner is not None:
+            runtime.provisioner.wake()
+        await reply(f"✅ Created document '{name}' from template. Document ID: {doc_id}")
+
+    @bot.command(name="resync-meetings")
+    @commands.has_permissions(administrator=True)
+    async def resync_meetings(ctx: commands.Context):
+        """Re-count meeting docs in Drive and fix the meeting number counter."""
+        runtime = await tenant_runtime(ctx)
+        if runtime is None:
+            return
+        async with ctx.channel.typing():
+            try:
+                last = await runtime.reconcile_meeting_numbers()
+            except Exception as e:
+                await ctx.reply(f"Failed to sync meeting numbers: `{e}`")
+                return
+
+        await ctx.reply(f"✅ Meeting numbers synced. Next meeting will be {last + 1:02d}.")
+
+    @bot.command(name="bot-stats")
+    @commands.has_permissions(administrator=True)
+    async def bot_stats(ctx: commands.Context):
+        """Show command and Google API latencies since the bot started."""
+        stats = format_stats()
+        if len(stats) > 1900:
+            stats = stats[:1900] + "\n..."
+        await ctx.reply(f"```\n{stats}\n```")
+
+    @bot.command(name="reload-tenants")
+    @commands.has_permissions(administrator=True)
+    async def reload_tenants_command(ctx: commands.Context):
+        """Re-read the tenants file without restarting."""
+        try:
+            configured = await reload_tenants()
+        except Exception as e:
+            await ctx.reply(f"Tenants file not reloaded, keeping the current setup: `{e}`")
+            return
+        await ctx.reply(f"✅ Reloaded tenants: {len(configured)} configured.")
+    
     return bot
\ No newline at end of file
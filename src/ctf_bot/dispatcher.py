@@ -0,0 +1,83 @@
+"""Per-document work queues for bot commands."""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple
+
+from .metrics import registry
+
+# Runs one payload; its result (or exception) goes to the caller
+Runner = Callable[[Any], Awaitable[Any]]
+
+
+class QueueFull(Exception):
+    """The backlog for a document is full; the caller should try again later."""
+
+
+class _Job:
+    def __init__(self, payload: Any, run: Runner, future: asyncio.Future):
+        self.payload = payload
+        self.run = run
+        self.future = future
+        self.queued_at = time.perf_counter()
+
+
+class _DocumentQueue:
+    def __init__(self):
+        self.jobs: Deque[_Job] = deque()
+        self.running = 0
+
+
+class DocumentDispatcher:
+    """
+    One ordered queue per target document.
+
+    Jobs for the same key run one after another in submission order; different
+    keys run in parallel, at most `max_parallel` at a time. Each queue holds at
+    most `max_backlog` jobs (including the one running).
+    """
+
+    def __init__(self, max_backlog: int, max_parallel: int):
+        self.max_backlog = max_backlog
+        self._parallel = asyncio.Semaphore(max_parallel)
+        self._queues: Dict[str, _DocumentQueue] = {}
+
+    def backlog(self, key: str) -> int:
+        """Number of jobs queued or running for `key`."""
+        queue = self._queues.get(key)
+        return len(queue.jobs) + queue.running if queue else 0
+
+    def submit(self, key: str, run: Runner, payload: Any) -> Tuple[int, asyncio.Future]:
+        """
+        Queue `run(payload)` for `key`. Returns (jobs ahead of it, future with
+        its result). Raises QueueFull if the backlog for `key` is full.
+        """
+        ahead = self.backlog(key)
+        if ahead >= self.max_backlog:
+            raise QueueFull(key)
+
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _DocumentQueue()
+            asyncio.ensure_future(self._work(key, queue))
+        queue.jobs.append(_Job(payload, run, future))
+        return ahead, future
+
+    async def _work(self, key: str, queue: _DocumentQueue) -> None:
+        async with self._parallel:
+            while queue.jobs:
+                job = queue.jobs.popleft()
+                registry.observe("dispatch_wait_seconds", time.perf_counter() - job.queued_at)
+                queue.running = 1
+                try:
+                    result = await job.run(job.payload)
+                except Exception as e:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    if not job.future.done():
+                        job.future.set_result(result)
+                finally:
+                    queue.running = 0
+        del self._queues[key]
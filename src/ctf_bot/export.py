@@ -0,0 +1,170 @@
+"""`ctf-bot export`: a local Markdown archive of a tenant's meeting docs."""
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .integrations.google_docs import (
+    DriveFile, GoogleDocsManager, find_agenda_table, list_meeting_docs, paragraph_text,
+)
+
+MANIFEST_NAME = "manifest.json"
+
+_TEXT_FIELDS = "paragraph(paragraphStyle(namedStyleType),elements(textRun(content)))"
+# Just the text and structure Markdown needs
+EXPORT_DOC_FIELDS = (
+    f"revisionId,title,body(content({_TEXT_FIELDS},"
+    f"table(tableRows(tableCells(content({_TEXT_FIELDS}))))))"
+)
+
+_HEADING_LEVELS = {
+    "TITLE": 1, "SUBTITLE": 2, **{f"HEADING_{n}": min(n + 1, 6) for n in range(1, 7)},
+}
+
+
+class ExportResult(NamedTuple):
+    exported: List[str]
+    unchanged: List[str]
+    failed: Dict[str, str]  # doc ID -> error
+
+
+def _cell_text(cell: dict) -> str:
+    text = " ".join(
+        paragraph_text(el["paragraph"]).strip()
+        for el in cell.get("content", []) if "paragraph" in el
+    )
+    return text.strip().replace("|", "\\|")
+
+
+def table_markdown(table: dict) -> List[str]:
+    """A Markdown table; the first row is the header."""
+    rows = [
+        [_cell_text(cell) for cell in row.get("tableCells", [])]
+        for row in table.get("tableRows", [])
+    ]
+    if not rows:
+        return []
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    lines = ["| " + " | ".join(rows[0]) + " |", "|" + " --- |" * width]
+    lines.extend("| " + " | ".join(row) + " |" for row in rows[1:])
+    return lines
+
+
+def doc_to_markdown(doc: dict, file: DriveFile) -> str:
+    """A documents.get resource (EXPORT_DOC_FIELDS) as Markdown, Drive details up front."""
+    found = find_agenda_table(doc)
+    lines = [
+        "---",
+        f"title: {json.dumps(file.name)}",
+        f"doc_id: {file.id}",
+        f"revision_id: {doc.get('revisionId', '')}",
+        f"modified: {file.modified_time}",
+        f"agenda_items: {len(found[0].get('tableRows', [])) - 1 if found else 0}",
+        "---",
+        "",
+    ]
+    for elem in doc.get("body", {}).get("content", []):
+        if "table" in elem:
+            lines.extend(table_markdown(elem["table"]) + [""])
+            continue
+        para = elem.get("paragraph")
+        if para is None:
+            continue
+        text = paragraph_text(para).strip()
+        if not text:
+            continue
+        style = para.get("paragraphStyle", {}).get("namedStyleType", "")
+        level = _HEADING_LEVELS.get(style)
+        lines.extend([f"{'#' * level} {text}" if level else text, ""])
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def export_filename(file: DriveFile) -> str:
+    """'Meeting 07: Quals' -> 'meeting-07-quals-<id prefix>.md' (names aren't unique in Drive)."""
+    slug = re.sub(r"[^a-z0-9]+", "-", file.name.lower()).strip("-") or "untitled"
+    return f"{slug[:80]}-{file.id[:8]}.md"
+
+
+def load_manifest(out_dir: Path) -> Dict[str, dict]:
+    try:
+        with open(out_dir / MANIFEST_NAME, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(out_dir: Path, manifest: Dict[str, dict]) -> None:
+    tmp = out_dir / f".{MANIFEST_NAME}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, out_dir / MANIFEST_NAME)
+
+
+def _unchanged(entry: Optional[dict], file: DriveFile, out_dir: Path) -> bool:
+    return (
+        entry is not None
+        and entry.get("modifiedTime") == file.modified_time
+        and (out_dir / entry.get("path", "")).is_file()
+    )
+
+
+def export_meeting_docs(
+    manager: GoogleDocsManager, out_dir: Path, workers: int = 8, full: bool = False
+) -> ExportResult:
+    """
+    Write every meeting doc in the manager's tenant folder to `out_dir` as
+    Markdown, `workers` downloads at a time. manifest.json records each doc's
+    modifiedTime and revisionId; docs whose modifiedTime hasn't moved since
+    are skipped unless `full`. Blocking.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {} if full else load_manifest(out_dir)
+    files = list_meeting_docs(
+        manager.drive_service, manager.tenant.folder_id,
+        (manager.tenant.target_doc_name, manager.tenant.template_doc_name),
+    )
+    todo = [f for f in files if not _unchanged(manifest.get(f.id), f, out_dir)]
+    pending = {f.id for f in todo}
+    result = ExportResult([], [f.id for f in files if f.id not in pending], {})
+    lock = threading.Lock()
+
+    def export(file: DriveFile) -> None:
+        doc = manager.docs_service.documents().get(
+            documentId=file.id, fields=EXPORT_DOC_FIELDS
+        ).execute()
+        path = export_filename(file)
+        tmp = out_dir / f".{path}.tmp"
+        tmp.write_text(doc_to_markdown(doc, file), encoding="utf-8")
+        os.replace(tmp, out_dir / path)
+        with lock:
+            old = manifest.get(file.id, {}).get("path")
+            if old and old != path:  # renamed in Drive
+                (out_dir / old).unlink(missing_ok=True)
+            manifest[file.id] = {
+                "name": file.name,
+                "modifiedTime": file.modified_time,
+                "revisionId": doc.get("revisionId"),
+                "path": path,
+            }
+            result.exported.append(file.id)
+
+    def attempt(file: DriveFile) -> Tuple[DriveFile, Optional[Exception]]:
+        try:
+            export(file)
+            return file, None
+        except Exception as e:
+            return file, e
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export") as pool:
+            for file, error in pool.map(attempt, todo):
+                if error is not None:
+                    result.failed[file.id] = f"{file.name}: {error}"
+    finally:
+        save_manifest(out_dir, manifest)
+    return result
@@ -0,0 +1,213 @@
+"""Coalescing of concurrent agenda writes into batched document updates."""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def _never(exc: Exception) -> bool:
+    return False
+
+
+class _Batch:
+    def __init__(self):
+        self.items: List[Tuple[str, Future]] = []
+
+
+class _AsyncBatch:
+    def __init__(self):
+        self.items: List[Tuple[str, asyncio.Future]] = []
+
+
+class AgendaWriteCoalescer:
+    """
+    Per-document write queue for agenda items.
+
+    The first caller for a document becomes the batch leader: it waits
+    `window` seconds for more items, then writes everything queued so far with
+    one `flush_many(doc_id, texts)` call. Writes to the same document never
+    overlap.
+
+    A batched write that fails because the doc changed underneath it
+    (`is_stale(exc)`) is retried once. If it fails with an error a single
+    item can cause (`is_item_error(exc)`, e.g. a 400), each item is retried on
+    its own with `flush_one(doc_id, text)` so every caller gets its own
+    outcome. Any other error (quota, 5xx, network) has been retried by the
+    scheduler where that is safe, so it is reported for every item as is.
+    """
+
+    def __init__(
+        self,
+        flush_one: Callable[[str, str], None],
+        flush_many: Callable[[str, List[str]], None],
+        window: float,
+        is_stale: Callable[[Exception], bool] = _never,
+        is_item_error: Callable[[Exception], bool] = _never,
+    ):
+        self._flush_one = flush_one
+        self._flush_many = flush_many
+        self.window = window
+        self._is_stale = is_stale
+        self._is_item_error = is_item_error
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _Batch] = {}
+        self._write_locks: Dict[str, threading.Lock] = {}
+
+    def submit(self, doc_id: str, text: str) -> None:
+        """Queue `text` for `doc_id` and block until it has been written."""
+        error = self.submit_many(doc_id, [text])[0]
+        if error is not None:
+            raise error
+
+    def submit_many(
+        self, doc_id: str, texts: List[str], window: Optional[float] = None
+    ) -> List[Optional[BaseException]]:
+        """
+        Queue several items for `doc_id` and block until all are written.
+        Returns the error for each item, or None where it succeeded. A caller
+        that already batches (the journal replayer) passes `window=0`.
+        """
+        futures: List[Future] = [Future() for _ in texts]
+        with self._lock:
+            batch = self._pending.get(doc_id)
+            leader = batch is None
+            if leader:
+                batch = self._pending[doc_id] = _Batch()
+            batch.items.extend(zip(texts, futures))
+            write_lock = self._write_locks.setdefault(doc_id, threading.Lock())
+
+        if leader:
+            window = self.window if window is None else window
+            if window > 0:
+                time.sleep(window)
+            # Items keep joining while we wait for an earlier batch to finish
+            with write_lock:
+                with self._lock:
+                    del self._pending[doc_id]
+                self._write(doc_id, batch)
+
+        return [future.exception() for future in futures]
+
+    def _flush_batch(self, doc_id: str, texts: List[str]) -> Optional[Exception]:
+        """flush_many, retried once if the doc was stale. Returns the error, if any."""
+        for _ in range(2):
+            try:
+                self._flush_many(doc_id, texts)
+                return None
+            except Exception as e:
+                error = e
+                if not self._is_stale(e):
+                    break
+        return error
+
+    def _write(self, doc_id: str, batch: _Batch) -> None:
+        if len(batch.items) > 1:
+            error = self._flush_batch(doc_id, [text for text, _ in batch.items])
+            if error is None or not self._is_item_error(error):
+                for _, future in batch.items:
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+                return
+
+        for text, future in batch.items:
+            try:
+                self._flush_one(doc_id, text)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+
+
+class AsyncAgendaWriteCoalescer:
+    """
+    asyncio counterpart of AgendaWriteCoalescer for the native async transport,
+    with the same retry rules for failed batches.
+
+    The batch is flushed by a separate task, so a caller being cancelled never
+    strands the other items queued with it.
+    """
+
+    def __init__(
+        self,
+        flush_one: Callable[[str, str], Awaitable[None]],
+        flush_many: Callable[[str, List[str]], Awaitable[None]],
+        window: float,
+        is_stale: Callable[[Exception], bool] = _never,
+        is_item_error: Callable[[Exception], bool] = _never,
+    ):
+        self._flush_one = flush_one
+        self._flush_many = flush_many
+        self.window = window
+        self._is_stale = is_stale
+        self._is_item_error = is_item_error
+        self._pending: Dict[str, _AsyncBatch] = {}
+        self._write_locks: Dict[str, asyncio.Lock] = {}
+
+    async def submit(self, doc_id: str, text: str) -> None:
+        """Queue `text` for `doc_id` and wait until it has been written."""
+        error = (await self.submit_many(doc_id, [text]))[0]
+        if error is not None:
+            raise error
+
+    async def submit_many(
+        self, doc_id: str, texts: List[str], window: Optional[float] = None
+    ) -> List[Optional[BaseException]]:
+        """
+        Queue several items for `doc_id` and wait until all are written.
+        Returns the error for each item, or None where it succeeded.
+        """
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in texts]
+        batch = self._pending.get(doc_id)
+        if batch is None:
+            batch = self._pending[doc_id] = _AsyncBatch()
+            asyncio.ensure_future(
+                self._run(doc_id, batch, self.window if window is None else window)
+            )
+        batch.items.extend(zip(texts, futures))
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    async def _run(self, doc_id: str, batch: _AsyncBatch, window: float) -> None:
+        if window > 0:
+            await asyncio.sleep(window)
+        write_lock = self._write_locks.setdefault(doc_id, asyncio.Lock())
+        async with write_lock:
+            del self._pending[doc_id]
+            await self._write(doc_id, batch)
+
+    async def _flush_batch(self, doc_id: str, texts: List[str]) -> Optional[Exception]:
+        for _ in range(2):
+            try:
+                await self._flush_many(doc_id, texts)
+                return None
+            except Exception as e:
+                error = e
+                if not self._is_stale(e):
+                    break
+        return error
+
+    async def _write(self, doc_id: str, batch: _AsyncBatch) -> None:
+        if len(batch.items) > 1:
+            error = await self._flush_batch(doc_id, [text for text, _ in batch.items])
+            if error is None or not self._is_item_error(error):
+                for _, future in batch.items:
+                    if future.done():
+                        continue
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+                return
+
+        for text, future in batch.items:
+            try:
+                await self._flush_one(doc_id, text)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(None)
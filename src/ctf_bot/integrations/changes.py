@@ -0,0 +1,79 @@
+"""Polling Drive's changes feed to keep cached document snapshots current."""
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional, Set, Tuple
+
+from .scheduler import background_priority
+
+
+class DriveChangeWatcher:
+    """
+    Background task that polls Drive `changes.list` every `poll_interval`
+    seconds and passes the IDs of changed files to `on_changed(ids)`.
+
+    `start_token()` returns the page token to start from and must drop
+    anything cached before it; `list_changes(token)` returns (changed IDs,
+    next token). The token only lives in memory, since the caches it vouches
+    for don't survive a restart either. `is_fresh()` says whether the last successful poll is
+    recent enough for cached snapshots to be served without a revision check.
+    All Google work runs under background_priority().
+    """
+
+    def __init__(
+        self,
+        start_token: Callable[[], Awaitable[str]],
+        list_changes: Callable[[str], Awaitable[Tuple[Set[str], str]]],
+        on_changed: Callable[[Set[str]], Awaitable[None]],
+        poll_interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._start_token = start_token
+        self._list_changes = list_changes
+        self._on_changed = on_changed
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self.page_token: Optional[str] = None
+        self.last_poll: Optional[float] = None
+        self._wake = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def is_fresh(self) -> bool:
+        """Whether a poll succeeded within the last two intervals."""
+        return (
+            self.last_poll is not None
+            and self._clock() - self.last_poll < 2 * self.poll_interval
+        )
+
+    async def run(self) -> None:
+        while True:
+            try:
+                with background_priority():
+                    await self.poll_once()
+            except Exception as e:
+                print(f"Drive changes poll failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def poll_once(self) -> Set[str]:
+        """Fetch changes since the saved token and report them. Returns the changed IDs."""
+        if self.page_token is None:
+            self.page_token = await self._start_token()
+            self.last_poll = self._clock()
+            return set()
+        changed, next_token = await self._list_changes(self.page_token)
+        if changed:
+            await self._on_changed(changed)
+        # Only move past these changes once the caches have taken them in
+        self.page_token = next_token
+        self.last_poll = self._clock()
+        return changed
@@ -0,0 +1,61 @@
+"""Caching of Google Doc name -> file ID resolution."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+
+class DocIdCache:
+    """
+    Thread-safe TTL + LRU cache mapping (folder_id, doc_name) to a Drive file ID.
+
+    Entries expire `ttl` seconds after they were stored, and the least recently
+    used entry is evicted once more than `max_size` are held.
+    """
+
+    def __init__(self, ttl: float, max_size: int, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, folder_id: str, doc_name: str) -> Optional[str]:
+        """Return the cached file ID, or None if missing or expired."""
+        key = (folder_id, doc_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            file_id, expires_at = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return file_id
+
+    def put(self, folder_id: str, doc_name: str, file_id: str) -> None:
+        key = (folder_id, doc_name)
+        with self._lock:
+            self._entries[key] = (file_id, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, folder_id: str, doc_name: str) -> None:
+        with self._lock:
+            self._entries.pop((folder_id, doc_name), None)
+
+    def invalidate_file(self, file_id: str) -> None:
+        """Drop every entry pointing at `file_id` (e.g. the doc was trashed)."""
+        with self._lock:
+            for key in [k for k, (fid, _) in self._entries.items() if fid == file_id]:
+                del self._entries[key]
+
+    def resolve(self, folder_id: str, doc_name: str, lookup: Callable[[], str]) -> str:
+        """Return the cached file ID, calling `lookup()` and caching on a miss."""
+        file_id = self.get(folder_id, doc_name)
+        if file_id is None:
+            file_id = lookup()
+            self.put(folder_id, doc_name, file_id)
+        return file_id
@@ -0,0 +1,71 @@
+"""Revision-aware cache of field-masked Google Docs snapshots."""
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+class DocSnapshotCache:
+    """
+    Caches the last fetched snapshot of each document, keyed by `revisionId`.
+
+    Fetches only `fields` (which must include `revisionId`). When a snapshot is
+    cached, `get` first asks Docs for the revision alone and reuses the cached
+    body if nothing changed. Callers that write to the doc should `store` the
+    patched snapshot with the revision their batchUpdate returned, or
+    `invalidate` it if they can't. With `parse`, a fetched body is decoded by
+    `parse(raw bytes)` instead of json.loads (see google_docs.locate_agenda).
+    """
+
+    def __init__(
+        self, fields: str, max_size: int, parse: Optional[Callable[[bytes], dict]] = None
+    ):
+        self.fields = fields
+        self.max_size = max_size
+        self.parse = parse
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def peek(self, doc_id: str) -> Optional[dict]:
+        """Return the cached snapshot without checking it is current."""
+        with self._lock:
+            doc = self._entries.get(doc_id)
+            if doc is not None:
+                self._entries.move_to_end(doc_id)
+            return doc
+
+    def get(self, docs_service, doc_id: str) -> dict:
+        """Return a current snapshot, re-downloading only if the revision moved."""
+        cached = self.peek(doc_id)
+        if cached is not None:
+            meta = docs_service.documents().get(
+                documentId=doc_id, fields="revisionId"
+            ).execute()
+            if meta.get("revisionId") == cached.get("revisionId"):
+                return cached
+
+        request = docs_service.documents().get(documentId=doc_id, fields=self.fields)
+        if self.parse is not None:
+            from .google_docs import parse_with
+
+            request = parse_with(request, self.parse)
+        doc = request.execute()
+        self.store(doc_id, doc)
+        return doc
+
+    def store(self, doc_id: str, doc: dict) -> None:
+        if not doc.get("revisionId"):
+            self.invalidate(doc_id)
+            return
+        with self._lock:
+            self._entries[doc_id] = doc
+            self._entries.move_to_end(doc_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, doc_id: str) -> None:
+        with self._lock:
+            self._entries.pop(doc_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,83 @@
+"""In-memory index of a folder's Google Docs, for slash command autocomplete."""
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from .google_docs import DriveFile
+from .provisioner import STAGED_NAME_PREFIX
+from .scheduler import background_priority
+
+# Discord shows at most 25 choices, each at most 100 characters
+MAX_CHOICES = 25
+MAX_CHOICE_LENGTH = 100
+
+
+class FolderIndex:
+    """
+    The Google Docs in a folder as of the last `list_docs()` (newest first).
+    A background task re-lists the folder every `refresh_interval` seconds,
+    or sooner when woken (e.g. by the Drive changes feed), so suggestions
+    never wait on Drive. Listing runs under background_priority(). Staged
+    template copies are left out: their meeting number is already filled in.
+    """
+
+    def __init__(
+        self,
+        list_docs: Callable[[], Awaitable[List[DriveFile]]],
+        refresh_interval: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._list_docs = list_docs
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self.docs: List[DriveFile] = []
+        self.updated_at: Optional[float] = None
+        self._wake = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                with background_priority():
+                    await self.refresh()
+            except Exception as e:
+                print(f"Folder index refresh failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def refresh(self) -> None:
+        self.docs = [
+            doc for doc in await self._list_docs()
+            if not doc.name.startswith(STAGED_NAME_PREFIX)
+        ]
+        self.updated_at = self._clock()
+
+    def suggest(self, current: str, template_name: Optional[str] = None) -> List[str]:
+        """
+        Doc names containing `current` (case-insensitive), those starting with
+        it first. With `template_name`, only templates: that doc and any doc
+        with 'template' in its name.
+        """
+        current = current.strip().lower()
+        names = []
+        for doc in self.docs:
+            name = doc.name
+            if name in names or len(name) > MAX_CHOICE_LENGTH or current not in name.lower():
+                continue
+            if template_name is not None and not (
+                name == template_name or "template" in name.lower()
+            ):
+                continue
+            names.append(name)
+        names.sort(key=lambda name: not name.lower().startswith(current))  # stable
+        return names[:MAX_CHOICES]
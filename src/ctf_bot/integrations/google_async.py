@@ -0,0 +1,726 @@
+"""Native asyncio client for the Google Docs/Drive calls the bot makes."""
+import asyncio
+import json
+import time
+from typing import (
+    Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Set, Tuple,
+)
+
+import aiohttp
+from googleapiclient.errors import HttpError
+
+from ..config import (
+    SCOPES, AGENDA_COALESCE_WINDOW, AGENDA_INDEX_ARITHMETIC, GOOGLE_HTTP_POOL_SIZE,
+    GOOGLE_TOKEN_REFRESH_MARGIN,
+)
+from ..metrics import timed
+from ..tenants import DEFAULT_TENANT_NAME, Tenant, default_tenant
+from .agenda_writer import AsyncAgendaWriteCoalescer
+from .doc_cache import DocIdCache
+from .google_docs import (
+    AGENDA_DOC_FIELDS,
+    DocsManagerBase,
+    DriveFile,
+    FolderLookup,
+    agenda_insert_body,
+    agenda_insert_landed,
+    agenda_rows,
+    apply_agenda_insert,
+    build_fill_last_row_request,
+    build_insert_row_request,
+    changes_list_params,
+    collect_changes,
+    collect_latest,
+    copy_body,
+    count_files,
+    doc_name_query,
+    docs_named_query,
+    drive_files,
+    files_list_params,
+    folder_docs_query,
+    is_missing_doc_error,
+    is_item_error,
+    is_revision_mismatch,
+    is_server_error,
+    locate_agenda,
+    meeting_docs_query,
+    move_request,
+    newest_template,
+    pinned_body,
+    staged_fill_requests,
+    staged_number_requests,
+    trash_request,
+    written_revision,
+)
+from .provisioner import StagedDoc, staged_name
+from .templating import TEMPLATE_TEXT_FIELDS, fill_requests, template_fields
+from .scheduler import GoogleRequestScheduler, get_scheduler
+from .tokens import TokenCache, default_token_cache, token_key
+
+DOCS_API_URL = "https://docs.googleapis.com/v1"
+DRIVE_API_URL = "https://www.googleapis.com/drive/v3"
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+# Refresh this many seconds before the token actually expires
+_TOKEN_REFRESH_MARGIN = 300
+
+
+class AsyncServiceAccountCredentials:
+    """
+    Service-account credentials that mint access tokens over aiohttp.
+
+    Signs a JWT bearer assertion locally and exchanges it at the token URI;
+    concurrent callers share one in-flight refresh. With a `cache`, tokens
+    are shared with other processes (see tokens.TokenCache).
+    """
+
+    def __init__(self, info: dict, scopes: List[str], cache: Optional[TokenCache] = None):
+        from google.auth import crypt  # pulls in the RSA backend; keep it off import
+
+        self._signer = crypt.RSASigner.from_service_account_info(info)
+        self.service_account_email = info["client_email"]
+        self.token_uri = info.get("token_uri", TOKEN_URI)
+        self.scopes = scopes
+        self.cache = cache
+        self.key = token_key(self.service_account_email, scopes)
+        self.token: Optional[str] = None
+        self.expiry = 0.0
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_service_account_file(
+        cls, path: str, scopes: List[str], cache: Optional[TokenCache] = None
+    ):
+        with open(path) as f:
+            return cls(json.load(f), scopes, cache)
+
+    @property
+    def valid(self) -> bool:
+        return self._expires_in() > _TOKEN_REFRESH_MARGIN
+
+    def _expires_in(self) -> float:
+        return self.expiry - time.time() if self.token is not None else 0.0
+
+    def _load_cached(self, margin: float) -> bool:
+        cached = self.cache.load(self.key) if self.cache is not None else None
+        if cached is None or cached[1] - time.time() <= margin:
+            return False
+        self.token, self.expiry = cached
+        return True
+
+    async def get_token(self, session: aiohttp.ClientSession) -> str:
+        if not self.valid:
+            await self.ensure_fresh(session, _TOKEN_REFRESH_MARGIN)
+        return self.token
+
+    async def ensure_fresh(
+        self, session: aiohttp.ClientSession, margin: float = GOOGLE_TOKEN_REFRESH_MARGIN
+    ) -> float:
+        """Refresh the token if it expires within `margin` seconds. Returns its expiry."""
+        if self._expires_in() <= margin:
+            async with self._lock:
+                if self._expires_in() <= margin and not self._load_cached(margin):
+                    await self._refresh(session)
+        return self.expiry
+
+    async def _refresh(self, session: aiohttp.ClientSession) -> None:
+        from google.auth import jwt
+
+        now = int(time.time())
+        assertion = jwt.encode(self._signer, {
+            "iss": self.service_account_email,
+            "scope": " ".join(self.scopes),
+            "aud": self.token_uri,
+            "iat": now,
+            "exp": now + 3600,
+        })
+        async with session.post(self.token_uri, data={
+            "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
+            "assertion": assertion.decode(),
+        }) as resp:
+            content = await resp.read()
+            if resp.status != 200:
+                raise RuntimeError(f"Token exchange failed ({resp.status}): {content[:200]!r}")
+        data = json.loads(content)
+        self.token = data["access_token"]
+        self.expiry = now + int(data.get("expires_in", 3600))
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.save, self.key, self.token, self.expiry)
+
+
+def _query_params(params: dict) -> dict:
+    """aiohttp only takes str values; Google wants lowercase booleans."""
+    return {
+        k: ("true" if v else "false") if isinstance(v, bool) else str(v)
+        for k, v in params.items()
+        if v is not None
+    }
+
+
+class AsyncGoogleClient:
+    """
+    Minimal async Docs/Drive client over one shared keep-alive connection pool.
+
+    Errors are raised as googleapiclient's HttpError so the same helpers
+    (is_missing_doc_error, is_revision_mismatch, ...) work for both transports.
+    The API base URLs can be pointed at a local fake server in tests. With a
+    `scheduler`, every request is rate limited and retried by it.
+    """
+
+    def __init__(
+        self,
+        credentials,
+        session: Optional[aiohttp.ClientSession] = None,
+        docs_url: str = DOCS_API_URL,
+        drive_url: str = DRIVE_API_URL,
+        scheduler: Optional[GoogleRequestScheduler] = None,
+    ):
+        self.credentials = credentials
+        self.docs_url = docs_url.rstrip("/")
+        self.drive_url = drive_url.rstrip("/")
+        self.scheduler = scheduler
+        self._session = session
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=GOOGLE_HTTP_POOL_SIZE, keepalive_timeout=60)
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    async def _request(
+        self, method_id: str, method: str, url: str, params: dict = None, body: dict = None,
+        parse: Callable[[bytes], dict] = json.loads,
+    ) -> dict:
+        if self.scheduler is None:
+            return await self._send(method_id, method, url, params, body, parse)
+        return await self.scheduler.execute_async(
+            method_id, lambda: self._send(method_id, method, url, params, body, parse)
+        )
+
+    async def _send(
+        self, method_id: str, method: str, url: str, params: dict = None, body: dict = None,
+        parse: Callable[[bytes], dict] = json.loads,
+    ) -> dict:
+        session = self.session
+        with timed("google_request_seconds", method=method_id, phase="auth"):
+            token = await self.credentials.get_token(session)
+        with timed("google_request_seconds", method=method_id, phase="request"):
+            async with session.request(
+                method,
+                url,
+                params=_query_params(params or {}),
+                json=body,
+                headers={"Authorization": f"Bearer {token}"},
+            ) as resp:
+                content = await resp.read()
+                if resp.status >= 400:
+                    import httplib2
+
+                    info = {k.lower(): v for k, v in resp.headers.items()}
+                    info["status"] = str(resp.status)
+                    raise HttpError(httplib2.Response(info), content, uri=str(resp.url))
+        with timed("google_request_seconds", method=method_id, phase="parse"):
+            return parse(content) if content else {}
+
+    async def files_list(self, **params) -> dict:
+        return await self._request("drive.files.list", "GET", f"{self.drive_url}/files", params)
+
+    async def files_copy(self, file_id: str, body: dict, **params) -> dict:
+        return await self._request(
+            "drive.files.copy", "POST", f"{self.drive_url}/files/{file_id}/copy", params, body
+        )
+
+    async def files_update(self, file_id: str, body: dict, **params) -> dict:
+        return await self._request(
+            "drive.files.update", "PATCH", f"{self.drive_url}/files/{file_id}", params, body
+        )
+
+    async def changes_start_page_token(self, **params) -> dict:
+        return await self._request(
+            "drive.changes.getStartPageToken", "GET",
+            f"{self.drive_url}/changes/startPageToken", params,
+        )
+
+    async def changes_list(self, **params) -> dict:
+        return await self._request("drive.changes.list", "GET", f"{self.drive_url}/changes", params)
+
+    async def documents_get(
+        self, document_id: str, fields: Optional[str] = None,
+        parse: Callable[[bytes], dict] = json.loads,
+    ) -> dict:
+        """documents.get; `parse` decodes the raw body (e.g. google_docs.locate_agenda)."""
+        return await self._request(
+            "docs.documents.get", "GET", f"{self.docs_url}/documents/{document_id}",
+            {"fields": fields}, parse=parse,
+        )
+
+    async def documents_batch_update(self, document_id: str, body: dict) -> dict:
+        return await self._request(
+            "docs.documents.batchUpdate", "POST",
+            f"{self.docs_url}/documents/{document_id}:batchUpdate", body=body,
+        )
+
+
+class AsyncGoogleDocsManager(DocsManagerBase):
+    """
+    GoogleDocsManager over AsyncGoogleClient. Requests are built and responses
+    parsed by the same google_docs helpers; only the transport differs.
+    """
+
+    def __init__(
+        self,
+        client: AsyncGoogleClient,
+        doc_id_cache: Optional[DocIdCache] = None,
+        tenant: Optional[Tenant] = None,
+    ):
+        # Drive is counted asynchronously before reconcile(), never from inside it
+        super().__init__(tenant, doc_id_cache, None)
+        self.client = client
+        self.agenda_writer = AsyncAgendaWriteCoalescer(
+            self._add_row_and_fill,
+            self._add_rows_and_fill,
+            AGENDA_COALESCE_WINDOW,
+            is_stale=is_revision_mismatch,
+            is_item_error=is_item_error,
+        )
+
+    # ----------------------------
+    # Drive
+    # ----------------------------
+    async def find_docs(self, doc_names: Sequence[str]) -> Dict[str, DriveFile]:
+        """See google_docs.find_docs_in_folder."""
+        found: Dict[str, DriveFile] = {}
+        page_token = None
+        while True:
+            resp = await self.client.files_list(**files_list_params(
+                docs_named_query(self.tenant.folder_id, doc_names), 100, page_token
+            ))
+            collect_latest(found, resp.get("files", []), doc_names)
+            page_token = resp.get("nextPageToken")
+            if not page_token or len(found) == len(set(doc_names)):
+                return found
+
+    async def lookup_folder(
+        self, doc_names: Sequence[str], count_meetings: bool = False
+    ) -> FolderLookup:
+        """See GoogleDocsManager.lookup_folder; both queries run concurrently."""
+        if not count_meetings:
+            return FolderLookup(await self.find_docs(doc_names))
+        files, count = await asyncio.gather(self.find_docs(doc_names), self.count_meeting_docs())
+        return FolderLookup(files, count)
+
+    async def find_doc(self, doc_name: str) -> str:
+        """
+        Same semantics as find_doc_in_folder, including creating a missing
+        draft, for which the template is looked up in the same query.
+        """
+        tenant = self.tenant
+        is_draft = doc_name == tenant.target_doc_name
+        names = [doc_name, tenant.template_doc_name] if is_draft else [doc_name]
+        found = (await self.lookup_folder(names)).files
+        if doc_name in found:
+            return found[doc_name].id
+        if is_draft:
+            if tenant.template_pool_size > 0:
+                doc_id = await self._take_staged_copy(doc_name)
+                if doc_id is not None:
+                    return doc_id
+            template = found.get(tenant.template_doc_name)
+            if template is None:
+                raise RuntimeError(f"Template '{tenant.template_doc_name}' not found in folder.")
+            self.doc_id_cache.put(tenant.folder_id, tenant.template_doc_name, template.id)
+            _, placeholders = await self._read_template(template.id)
+            return await self._copy_template(doc_name, template.id, placeholders)
+        raise RuntimeError(f"No Google Doc named '{doc_name}' found in the shared folder.")
+
+    async def template_id(self, template_name: str = None) -> str:
+        """See GoogleDocsManager.template_id."""
+        template_name = template_name or self.tenant.template_doc_name
+        template_id = self.doc_id_cache.get(self.tenant.folder_id, template_name)
+        if template_id is None:
+            template_id = await self.find_template(template_name)
+            self.doc_id_cache.put(self.tenant.folder_id, template_name, template_id)
+        return template_id
+
+    async def target_doc_id(self) -> str:
+        """See GoogleDocsManager.target_doc_id."""
+        return await self._resolve_target_doc()
+
+    async def find_template_version(self, template_name: str = None) -> Tuple[str, str]:
+        template_name = template_name or self.tenant.template_doc_name
+        resp = await self.client.files_list(**files_list_params(
+            doc_name_query(self.tenant.folder_id, template_name), 1,
+            fields="files(id,name,modifiedTime)",
+        ))
+        return newest_template(resp, template_name)
+
+    async def find_template(self, template_name: str) -> str:
+        """Template ID, reconciling the meeting numbers in the same round trip if needed."""
+        reconcile = await asyncio.to_thread(self.meeting_numbers.last_issued) is None
+        found = await self.lookup_folder([template_name], count_meetings=reconcile)
+        if found.meeting_docs is not None:
+            await asyncio.to_thread(self.meeting_numbers.reconcile, found.meeting_docs)
+        template = found.files.get(template_name)
+        if template is None:
+            raise RuntimeError(f"Template '{template_name}' not found in folder.")
+        return template.id
+
+    async def count_meeting_docs(self) -> int:
+        count = 0
+        page_token = None
+        while True:
+            resp = await self.client.files_list(**files_list_params(
+                meeting_docs_query(self.tenant.folder_id), 1000, page_token,
+                fields="nextPageToken,files(name)", newest_first=False,
+            ))
+            count += count_files(resp, self._not_meeting_docs)
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                return count
+
+    async def list_folder_docs(self) -> List[DriveFile]:
+        """See GoogleDocsManager.list_folder_docs."""
+        docs: List[DriveFile] = []
+        page_token = None
+        while True:
+            resp = await self.client.files_list(
+                **files_list_params(folder_docs_query(self.tenant.folder_id), 1000, page_token)
+            )
+            docs.extend(drive_files(resp))
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                return docs
+
+    async def reconcile_meeting_numbers(self) -> int:
+        existing = await self.count_meeting_docs()
+        return await asyncio.to_thread(self.meeting_numbers.reconcile, existing)
+
+    async def allocate_meeting_number(self) -> int:
+        if await asyncio.to_thread(self.meeting_numbers.last_issued) is None:
+            await self.reconcile_meeting_numbers()
+        return await asyncio.to_thread(self.meeting_numbers.allocate)
+
+    async def template_placeholders(self, template_id: str) -> FrozenSet[str]:
+        """See TemplateFieldCache.get."""
+        cached = self.template_fields.peek(template_id)
+        if cached is not None:
+            meta = await self.client.documents_get(template_id, fields="revisionId")
+            if meta.get("revisionId") == cached[0]:
+                return cached[1]
+        doc = await self.client.documents_get(template_id, fields=TEMPLATE_TEXT_FIELDS)
+        return self.template_fields.store(template_id, doc)
+
+    async def _read_template(self, template_id: str) -> Tuple[str, Optional[FrozenSet[str]]]:
+        """See GoogleDocsManager._read_template."""
+        try:
+            return template_id, await self.template_placeholders(template_id)
+        except Exception as e:
+            if is_missing_doc_error(e):
+                raise
+            return template_id, None
+
+    async def _copy_template(
+        self,
+        new_name: str,
+        template_id: str,
+        placeholders: Optional[FrozenSet[str]],
+        fields: Optional[Mapping[str, str]] = None,
+    ) -> str:
+        """See google_docs.copy_document_from_template."""
+        meeting_number = await self.allocate_meeting_number()
+        result = await self.client.files_copy(
+            template_id, copy_body(new_name, self.tenant.folder_id), supportsAllDrives=True
+        )
+        requests = fill_requests(placeholders, template_fields(new_name, meeting_number, fields))
+        try:
+            if requests:
+                await self.client.documents_batch_update(result["id"], {"requests": requests})
+        except Exception:
+            # Document was created but the replacement failed - still return it
+            pass
+        return result["id"]
+
+    async def _with_resolved(self, doc_name: str, lookup, action):
+        """See GoogleDocsManager._with_resolved."""
+        file_id = self.doc_id_cache.get(self.tenant.folder_id, doc_name)
+        if file_id is None:
+            file_id = await lookup()
+            self.doc_id_cache.put(self.tenant.folder_id, doc_name, file_id)
+        try:
+            return await action(file_id)
+        except HttpError as e:
+            if not is_missing_doc_error(e):
+                raise
+            self.doc_id_cache.invalidate_file(file_id)
+            file_id = await lookup()
+            self.doc_id_cache.put(self.tenant.folder_id, doc_name, file_id)
+            return await action(file_id)
+
+    # ----------------------------
+    # Docs
+    # ----------------------------
+    async def _fetch_agenda_doc(self, doc_id: str) -> dict:
+        return await self.client.documents_get(doc_id, AGENDA_DOC_FIELDS, parse=locate_agenda)
+
+    async def _snapshot(self, doc_id: str) -> dict:
+        cached = self.snapshots.peek(doc_id)
+        if cached is not None:
+            meta = await self.client.documents_get(doc_id, fields="revisionId")
+            if meta.get("revisionId") == cached.get("revisionId"):
+                return cached
+        doc = await self._fetch_agenda_doc(doc_id)
+        self.snapshots.store(doc_id, doc)
+        return doc
+
+    async def _add_rows_and_fill(self, doc_id: str, texts: List[str]) -> None:
+        doc = await self._snapshot(doc_id)
+        try:
+            resp = await self.client.documents_batch_update(doc_id, agenda_insert_body(doc, texts))
+        except HttpError as e:
+            self.snapshots.invalidate(doc_id)
+            # See google_docs.add_rows_and_fill: the rows may be in despite the 5xx
+            if not is_server_error(e):
+                raise
+            after = await self._fetch_agenda_doc(doc_id)
+            if not agenda_insert_landed(doc, after, texts):
+                raise
+            self.snapshots.store(doc_id, after)
+            return
+        self.snapshots.store(doc_id, apply_agenda_insert(doc, texts, written_revision(resp)))
+
+    async def _add_row_and_fill(self, doc_id: str, text: str) -> None:
+        if AGENDA_INDEX_ARITHMETIC:
+            try:
+                await self._add_rows_and_fill(doc_id, [text])
+                return
+            except HttpError as e:
+                if not is_revision_mismatch(e):
+                    raise
+        doc = await self._fetch_agenda_doc(doc_id)
+        await self.client.documents_batch_update(
+            doc_id, pinned_body(doc, [build_insert_row_request(doc)])
+        )
+        doc2 = await self._fetch_agenda_doc(doc_id)
+        await self.client.documents_batch_update(
+            doc_id, pinned_body(doc2, [build_fill_last_row_request(doc2, text)])
+        )
+        self.snapshots.invalidate(doc_id)
+
+    # ----------------------------
+    # Public API (mirrors GoogleDocsManager)
+    # ----------------------------
+    async def _resolve_target_doc(self) -> str:
+        doc_id = self.doc_id_cache.get(self.tenant.folder_id, self.tenant.target_doc_name)
+        if doc_id is None:
+            doc_id = await self.find_doc(self.tenant.target_doc_name)
+            self.doc_id_cache.put(self.tenant.folder_id, self.tenant.target_doc_name, doc_id)
+        return doc_id
+
+    async def add_agenda_items(
+        self, items: List[str], window: float = 0.0
+    ) -> List[Optional[BaseException]]:
+        """
+        Add several items to the agenda table, in one write where possible.
+        Returns the error for each item, or None where it was added. The
+        journal replayer already batches, so by default nothing waits for
+        more items to join (see AgendaWriteCoalescer).
+        """
+        doc_id = await self._resolve_target_doc()
+        errors = await self.agenda_writer.submit_many(doc_id, items, window)
+
+        retry = [i for i, e in enumerate(errors) if is_missing_doc_error(e)]
+        if retry:
+            self.doc_id_cache.invalidate_file(doc_id)
+            doc_id = await self._resolve_target_doc()
+            retried = await self.agenda_writer.submit_many(
+                doc_id, [items[i] for i in retry], window
+            )
+            for i, error in zip(retry, retried):
+                errors[i] = error
+        return errors
+
+    async def add_agenda_item(self, item: str) -> None:
+        """Add an item to the agenda table in the target document."""
+        error = (await self.add_agenda_items([item], self.agenda_writer.window))[0]
+        if error is not None:
+            raise error
+
+    async def agenda_items(self, trust_cache: bool = False) -> List[str]:
+        """See GoogleDocsManager.agenda_items."""
+        async def read(doc_id: str) -> List[str]:
+            doc = self.snapshots.peek(doc_id) if trust_cache else None
+            if doc is None:
+                doc = await self._snapshot(doc_id)
+            return agenda_rows(doc)
+
+        return await self._with_resolved(
+            self.tenant.target_doc_name, lambda: self.find_doc(self.tenant.target_doc_name), read
+        )
+
+    async def refresh_credentials(self) -> Optional[float]:
+        """See GoogleDocsManager.refresh_credentials."""
+        credentials = self.client.credentials
+        if not hasattr(credentials, "ensure_fresh"):  # e.g. a fixed test token
+            return None
+        return await credentials.ensure_fresh(self.client.session)
+
+    async def changes_start_token(self) -> str:
+        """See GoogleDocsManager.changes_start_token."""
+        resp = await self.client.changes_start_page_token(supportsAllDrives=True)
+        self.snapshots.clear()
+        return resp["startPageToken"]
+
+    async def changed_file_ids(self, page_token: str) -> Tuple[Set[str], str]:
+        """See GoogleDocsManager.changed_file_ids."""
+        changed: Set[str] = set()
+        gone: Set[str] = set()
+        while True:
+            resp = await self.client.changes_list(**changes_list_params(page_token))
+            collect_changes(resp.get("changes", []), changed, gone)
+            if "newStartPageToken" in resp:
+                break
+            page_token = resp["nextPageToken"]
+        self._forget_files(gone)
+        return changed, resp["newStartPageToken"]
+
+    async def refresh_snapshots(self, file_ids: Iterable[str]) -> None:
+        """See GoogleDocsManager.refresh_snapshots."""
+        for doc_id in file_ids:
+            if self.snapshots.peek(doc_id) is None:
+                continue
+            try:
+                await self._snapshot(doc_id)
+            except HttpError:
+                self.snapshots.invalidate(doc_id)
+
+    async def create_from_template(
+        self,
+        new_name: str,
+        template_name: str = None,
+        fields: Optional[Mapping[str, str]] = None,
+    ) -> str:
+        """Create a new document from template and return its ID."""
+        if template_name is None:
+            template_name = self.tenant.template_doc_name
+        if template_name == self.tenant.template_doc_name and self.tenant.template_pool_size > 0:
+            doc_id = await self._take_staged_copy(new_name, fields)
+            if doc_id is not None:
+                return doc_id
+        # See GoogleDocsManager.create_from_template: the copy itself is never repeated
+        template_id, placeholders = await self._with_resolved(
+            template_name, lambda: self.find_template(template_name), self._read_template
+        )
+        return await self._copy_template(new_name, template_id, placeholders, fields)
+
+    async def _take_staged_copy(
+        self, new_name: str, fields: Optional[Mapping[str, str]] = None
+    ) -> Optional[str]:
+        """See GoogleDocsManager._take_staged_copy."""
+        while True:
+            staged = await asyncio.to_thread(self.staged_docs.claim)
+            if staged is None:
+                return None
+            if not await asyncio.to_thread(self.meeting_numbers.is_unused, staged.meeting_number):
+                await self._discard_staged_copy(staged.doc_id)
+                continue
+            body, params = move_request(
+                new_name, self.tenant.folder_id, self.tenant.template_staging_folder_id
+            )
+            try:
+                await self.client.files_update(staged.doc_id, body, **params)
+            except HttpError as e:
+                if is_missing_doc_error(e):
+                    continue
+                await asyncio.to_thread(self.staged_docs.add, staged)
+                raise
+            await self._fill_staged_copy(staged, new_name, fields)
+            return staged.doc_id
+
+    async def _discard_staged_copy(self, doc_id: str) -> None:
+        try:
+            await self.trash_document(doc_id)
+        except HttpError as e:
+            print(f"Failed to trash staged copy {doc_id}: {e}")
+
+    async def _fill_staged_copy(
+        self, staged: StagedDoc, new_name: str, fields: Optional[Mapping[str, str]]
+    ) -> None:
+        try:
+            cached = self.template_fields.peek(staged.template_id)
+            if cached is not None:
+                placeholders = cached[1]
+            else:
+                placeholders = await self.template_placeholders(staged.template_id)
+            requests = staged_fill_requests(placeholders, staged, new_name, fields)
+            if requests:
+                await self.client.documents_batch_update(staged.doc_id, {"requests": requests})
+        except Exception:
+            pass
+
+    # ----------------------------
+    # Pre-provisioning (see provisioner.TemplateProvisioner)
+    # ----------------------------
+    async def stage_template_copy(self, template_id: str, meeting_number: int) -> str:
+        """Copy the template into the staging folder and fill in `meeting_number`."""
+        placeholders = await self.template_placeholders(template_id)
+        result = await self.client.files_copy(
+            template_id,
+            copy_body(staged_name(meeting_number), self.tenant.template_staging_folder_id),
+            fields="id",
+            supportsAllDrives=True,
+        )
+        requests = staged_number_requests(placeholders, meeting_number)
+        try:
+            if requests:
+                await self.client.documents_batch_update(result["id"], {"requests": requests})
+        except Exception:
+            await self.trash_document(result["id"])
+            raise
+        return result["id"]
+
+    async def trash_document(self, doc_id: str) -> None:
+        body, params = trash_request()
+        await self.client.files_update(doc_id, body, **params)
+
+
+_shared_async_managers: Dict[Tenant, AsyncGoogleDocsManager] = {}
+
+
+def warm_up() -> None:
+    """Import the JWT signing stack ahead of the first token refresh. Blocking."""
+    from google.auth import crypt, jwt  # noqa: F401
+
+
+def get_async_docs_manager(tenant: Optional[Tenant] = None) -> AsyncGoogleDocsManager:
+    """
+    Return the event loop's shared AsyncGoogleDocsManager for `tenant`
+    (default: the one configured by the environment), creating it on first
+    use. Each tenant gets its own credentials, connection pool and quota budget.
+    """
+    tenant = tenant if tenant is not None else default_tenant()
+    manager = _shared_async_managers.get(tenant)
+    if manager is None:
+        credentials = AsyncServiceAccountCredentials.from_service_account_file(
+            tenant.service_account_file, SCOPES, default_token_cache()
+        )
+        if tenant.name == DEFAULT_TENANT_NAME and not tenant.quotas:
+            scheduler = get_scheduler()
+        else:
+            scheduler = GoogleRequestScheduler.from_config(tenant.quotas)
+        manager = _shared_async_managers[tenant] = AsyncGoogleDocsManager(
+            AsyncGoogleClient(credentials, scheduler=scheduler), tenant=tenant
+        )
+    return manager
+
+
+async def drop_async_docs_managers(keep: Iterable[Tenant]) -> None:
+    """Close and forget the managers of tenants not in `keep`."""
+    keep = set(keep)
+    for tenant in [t for t in _shared_async_managers if t not in keep]:
+        await _shared_async_managers.pop(tenant).client.close()
@@ -1,49 +1,258 @@
 """Google Docs integration for CTF bot."""
-from typing import Optional, Tuple
+import contextvars
+import copy
+import functools
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import (
+    Callable, Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple,
+    Union,
+)
 
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+# Only the (light) errors module is imported up front; the discovery client,
+# httplib2 and the auth libraries load on first use or in warm_up()
+from googleapiclient.errors import HttpError
 
-from ..config import SERVICE_ACCOUNT_FILE, SCOPES, FOLDER_ID, TARGET_DOC_NAME, TEMPLATE_DOC_NAME
+from ..config import (
+    SERVICE_ACCOUNT_FILE, SCOPES, TARGET_DOC_NAME, TEMPLATE_DOC_NAME,
+    DOC_ID_CACHE_TTL, DOC_ID_CACHE_SIZE, AGENDA_COALESCE_WINDOW, AGENDA_INDEX_ARITHMETIC,
+    DOC_SNAPSHOT_CACHE_SIZE,
+)
+from ..tenants import DEFAULT_TENANT_NAME, Tenant, default_tenant
+from .agenda_writer import AgendaWriteCoalescer
+from .doc_cache import DocIdCache
+from .doc_snapshots import DocSnapshotCache
+from .meeting_numbers import MeetingNumberAllocator
+from .provisioner import StagedDoc, StagedDocPool, staged_name
+from .templating import (
+    MEETING_NUMBER_FIELD, TemplateFieldCache, fill_requests, split_meeting_number, template_fields,
+)
+from .scheduler import GoogleRequestScheduler, get_scheduler, is_rate_limited
+from .tokens import ServiceAccountTokens, service_account_tokens
+
+
+# Everything paragraph_text, find_agenda_table, get_first_cell_start_index and
+# the agenda index arithmetic read; passed as `fields` to documents().get so we
+# don't download text styles, inline objects etc. of large meeting docs.
+_PARAGRAPH_FIELDS = "paragraph(elements(startIndex,endIndex,textRun(content)))"
+AGENDA_DOC_FIELDS = (
+    "revisionId,body(content(startIndex,endIndex,"
+    f"{_PARAGRAPH_FIELDS},"
+    "table(rows,columns,tableRows(startIndex,endIndex,"
+    f"tableCells(startIndex,endIndex,content(startIndex,endIndex,{_PARAGRAPH_FIELDS}))))))"
+)
 
 
 # ----------------------------
 # Google API helpers
 # ----------------------------
-def make_creds():
+# Docs v1 / Drive v3 discovery documents shipped with the package, so building
+# a client never fetches or searches for one
+DISCOVERY_DIR = Path(__file__).parent / "discovery"
+
+
+def make_creds(service_account_file: str = SERVICE_ACCOUNT_FILE):
+    from google.oauth2 import service_account
+
     return service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=SCOPES
+        service_account_file, scopes=SCOPES
     )
 
 
-def make_docs_service(creds):
-    return build("docs", "v1", credentials=creds, cache_discovery=False)
+@functools.lru_cache(maxsize=None)
+def discovery_document(api: str, version: str) -> dict:
+    """The bundled discovery document for `api` `version`, parsed once per process."""
+    with open(DISCOVERY_DIR / f"{api}.{version}.json", encoding="utf-8") as f:
+        return json.load(f)
+
 
+def _request_builder(scheduler: Optional[GoogleRequestScheduler]) -> dict:
+    """build_from_document() kwargs routing every request through `scheduler`, if given."""
+    if scheduler is None:
+        return {}
+    from .scheduled_http import ScheduledHttpRequest
+
+    return {"requestBuilder": functools.partial(ScheduledHttpRequest, scheduler=scheduler)}
+
+
+def _build(api: str, version: str, creds, scheduler, endpoint):
+    from googleapiclient.discovery import build_from_document
+
+    return build_from_document(
+        discovery_document(api, version),
+        credentials=creds,
+        client_options=_client_options(endpoint),
+        **_request_builder(scheduler),
+    )
 
-def make_drive_service(creds):
-    return build("drive", "v3", credentials=creds, cache_discovery=False)
 
+def _client_options(endpoint: Optional[str]) -> Optional[dict]:
+    """Point a service at `endpoint` (e.g. a local fake server) instead of Google."""
+    return {"api_endpoint": endpoint} if endpoint else None
 
-def find_doc_in_folder(drive_service, folder_id: str, doc_name: str) -> str:
+
+def make_docs_service(
+    creds, scheduler: Optional[GoogleRequestScheduler] = None, endpoint: Optional[str] = None
+):
+    return _build("docs", "v1", creds, scheduler, endpoint)
+
+
+def make_drive_service(
+    creds, scheduler: Optional[GoogleRequestScheduler] = None, endpoint: Optional[str] = None
+):
+    return _build("drive", "v3", creds, scheduler, endpoint)
+
+
+def warm_up() -> None:
     """
-    Find a Google Doc with exact name `doc_name` inside `folder_id`.
-    If multiple matches exist, pick the most recently modified.
-    Returns the doc fileId.
+    Import the Google client stack and parse the bundled discovery documents
+    ahead of the first command. Blocking; run it in a thread.
     """
-    # Exact match on name. If you want "contains" matching later, we can adjust.
-    q = (
+    from google.oauth2 import service_account  # noqa: F401
+    from googleapiclient.discovery import build_from_document  # noqa: F401
+
+    from .scheduled_http import ScheduledHttpRequest  # noqa: F401
+
+    discovery_document("docs", "v1")
+    discovery_document("drive", "v3")
+
+
+class GoogleServicePool:
+    """
+    Process-wide pool of authorized Docs/Drive clients.
+
+    Credentials are loaded once and shared. Each worker thread lazily builds
+    its own Docs and Drive service (and with it its own httplib2 transport,
+    which is not thread-safe), then keeps reusing it so connections stay alive.
+    With a `scheduler`, every request made through these services is rate
+    limited and retried by it. The endpoints can be pointed at a local fake
+    server (see ctf_bot.testing.fake_google).
+    """
+
+    def __init__(
+        self,
+        creds=None,
+        scheduler: Optional[GoogleRequestScheduler] = None,
+        docs_endpoint: Optional[str] = None,
+        drive_endpoint: Optional[str] = None,
+    ):
+        self.creds = creds if creds is not None else make_creds()
+        self.scheduler = scheduler
+        self.docs_endpoint = docs_endpoint
+        self.drive_endpoint = drive_endpoint
+        self._local = threading.local()
+
+    @property
+    def docs_service(self):
+        service = getattr(self._local, "docs_service", None)
+        if service is None:
+            service = self._local.docs_service = make_docs_service(
+                self.creds, self.scheduler, endpoint=self.docs_endpoint
+            )
+        return service
+
+    @property
+    def drive_service(self):
+        service = getattr(self._local, "drive_service", None)
+        if service is None:
+            service = self._local.drive_service = make_drive_service(
+                self.creds, self.scheduler, endpoint=self.drive_endpoint
+            )
+        return service
+
+
+def is_missing_doc_error(exc: Exception) -> bool:
+    """
+    True if a Google API error means the file is gone or no longer shared with
+    us. A rate-limit 403 (see scheduler.is_rate_limited) is not.
+    """
+    return (
+        isinstance(exc, HttpError)
+        and exc.resp.status in (403, 404)
+        and not is_rate_limited(exc)
+    )
+
+
+def is_revision_mismatch(exc: Exception) -> bool:
+    """True if a batchUpdate was rejected because `requiredRevisionId` is stale."""
+    return (
+        isinstance(exc, HttpError)
+        and exc.resp.status == 400
+        and b"revision" in (exc.content or b"").lower()
+    )
+
+
+def is_item_error(exc: Exception) -> bool:
+    """
+    True for a rejected request that one bad agenda item could cause (400),
+    as opposed to a stale revision or a quota, server or network error.
+    """
+    return isinstance(exc, HttpError) and exc.resp.status == 400 and not is_revision_mismatch(exc)
+
+
+def is_server_error(exc: Exception) -> bool:
+    """True for a 5xx, which Google may send after the request was carried out."""
+    return isinstance(exc, HttpError) and exc.resp.status >= 500
+
+
+def doc_name_query(folder_id: str, doc_name: str) -> str:
+    """Drive query for non-trashed Google Docs named exactly `doc_name` in `folder_id`."""
+    return (
         f"'{folder_id}' in parents and "
         f"mimeType='application/vnd.google-apps.document' and "
         f"name='{doc_name}' and trashed=false"
     )
 
+
+def docs_named_query(folder_id: str, doc_names: Sequence[str]) -> str:
+    """Drive query for non-trashed Google Docs in `folder_id` named any of `doc_names`."""
+    names = " or ".join(f"name='{name}'" for name in doc_names)
+    return (
+        f"'{folder_id}' in parents and "
+        f"mimeType='application/vnd.google-apps.document' and "
+        f"({names}) and trashed=false"
+    )
+
+
+def meeting_docs_query(folder_id: str) -> str:
+    """Drive query for the meeting docs in `folder_id`."""
+    return (
+        f"'{folder_id}' in parents and "
+        f"mimeType='application/vnd.google-apps.document' and "
+        f"(name contains 'MEETING' or name contains 'meeting') and "
+        f"trashed=false"
+    )
+
+
+def folder_docs_query(folder_id: str) -> str:
+    """Drive query for every Google Doc in `folder_id`."""
+    return (
+        f"'{folder_id}' in parents and "
+        f"mimeType='application/vnd.google-apps.document' and "
+        f"trashed=false"
+    )
+
+
+def find_doc_in_folder(
+    drive_service,
+    folder_id: str,
+    doc_name: str,
+    docs_service=None,
+    allocator: Optional[MeetingNumberAllocator] = None,
+) -> str:
+    """
+    Find a Google Doc with exact name `doc_name` inside `folder_id`.
+    If multiple matches exist, pick the most recently modified.
+    Returns the doc fileId.
+    """
+    # Exact match on name. If you want "contains" matching later, we can adjust.
+    q = doc_name_query(folder_id, doc_name)
+
     resp = drive_service.files().list(
-        q=q,
-        fields="files(id,name,modifiedTime)",
-        orderBy="modifiedTime desc",
-        pageSize=10,
-        supportsAllDrives=True,
-        includeItemsFromAllDrives=True,
+        **files_list_params(q, 10, fields="files(id,name,modifiedTime)")
     ).execute()
 
     files = resp.get("files", [])
@@ -52,7 +261,8 @@ def find_doc_in_folder(drive_service, folder_id: str, doc_name: str) -> str:
         # But only do this for the TARGET_DOC_NAME, not for templates
         if doc_name == TARGET_DOC_NAME:
             return copy_document_from_template(
-                drive_service, TEMPLATE_DOC_NAME, doc_name, folder_id
+                drive_service, TEMPLATE_DOC_NAME, doc_name, folder_id, docs_service,
+                allocator=allocator,
             )
         else:
             raise RuntimeError(
@@ -61,6 +271,164 @@ def find_doc_in_folder(drive_service, folder_id: str, doc_name: str) -> str:
     return files[0]["id"]
 
 
+class DriveFile(NamedTuple):
+    id: str
+    name: str
+    modified_time: str
+
+
+class FolderLookup(NamedTuple):
+    """The newest doc for each name looked up, and the meeting doc count if asked for."""
+    files: Dict[str, DriveFile]
+    meeting_docs: Optional[int] = None
+
+
+def collect_latest(found: Dict[str, DriveFile], files: List[dict], doc_names: Sequence[str]) -> None:
+    """Add the first (newest) file seen for each of `doc_names` to `found`."""
+    for f in files:
+        name = f["name"]
+        if name in doc_names and name not in found:
+            found[name] = DriveFile(f["id"], name, f.get("modifiedTime", ""))
+
+
+# ----------------------------
+# Request bodies and response parsing shared by both transports: the asyncio
+# manager (google_async.AsyncGoogleDocsManager) only differs in how it sends them
+# ----------------------------
+LISTED_FILE_FIELDS = "nextPageToken,files(id,name,modifiedTime)"
+
+
+def files_list_params(
+    query: str,
+    page_size: int,
+    page_token: Optional[str] = None,
+    fields: str = LISTED_FILE_FIELDS,
+    newest_first: bool = True,
+) -> dict:
+    """files.list arguments for the Drive `query`, across shared drives."""
+    params = {"q": query, "fields": fields}
+    if newest_first:
+        params["orderBy"] = "modifiedTime desc"
+    params["pageSize"] = page_size
+    if page_token is not None:
+        params["pageToken"] = page_token
+    params.update(supportsAllDrives=True, includeItemsFromAllDrives=True)
+    return params
+
+
+def drive_files(resp: dict, exclude_names: Tuple[str, ...] = ()) -> List[DriveFile]:
+    """The files of a files.list page, minus those named in `exclude_names`."""
+    return [
+        DriveFile(f["id"], f["name"], f.get("modifiedTime", ""))
+        for f in resp.get("files", [])
+        if f["name"] not in exclude_names
+    ]
+
+
+def count_files(resp: dict, exclude_names: Tuple[str, ...]) -> int:
+    """How many files of a files.list page are not named in `exclude_names`."""
+    return sum(1 for f in resp.get("files", []) if f["name"] not in exclude_names)
+
+
+def newest_template(resp: dict, template_name: str) -> Tuple[str, str]:
+    """(fileId, modifiedTime) of the first file listed, the newest `template_name`."""
+    files = resp.get("files", [])
+    if not files:
+        raise RuntimeError(f"Template '{template_name}' not found in folder.")
+    return files[0]["id"], files[0].get("modifiedTime", "")
+
+
+def changes_list_params(page_token: str) -> dict:
+    """changes.list arguments for the page at `page_token` (see collect_changes)."""
+    return {
+        "pageToken": page_token,
+        "fields": CHANGES_FIELDS,
+        "pageSize": 1000,
+        "supportsAllDrives": True,
+        "includeItemsFromAllDrives": True,
+    }
+
+
+def copy_body(new_name: str, folder_id: str) -> dict:
+    """files.copy body placing the copy in `folder_id` as `new_name`."""
+    return {"name": new_name, "parents": [folder_id]}
+
+
+def move_request(new_name: str, folder_id: str, from_folder_id: str) -> Tuple[dict, dict]:
+    """files.update (body, params) renaming a file and moving it between folders."""
+    params = {"fields": "id", "supportsAllDrives": True}
+    if folder_id != from_folder_id:
+        params.update(addParents=folder_id, removeParents=from_folder_id)
+    return {"name": new_name}, params
+
+
+def trash_request() -> Tuple[dict, dict]:
+    """files.update (body, params) moving a file to the trash."""
+    return {"trashed": True}, {"fields": "id", "supportsAllDrives": True}
+
+
+def pinned_body(doc: dict, requests: List[dict]) -> dict:
+    """batchUpdate body for `requests`, rejected if the doc moved on from the snapshot `doc`."""
+    body = {"requests": requests}
+    if doc.get("revisionId"):
+        body["writeControl"] = {"requiredRevisionId": doc["revisionId"]}
+    return body
+
+
+def agenda_insert_body(doc: dict, texts: List[str]) -> dict:
+    """batchUpdate body appending `texts` to the agenda of the snapshot `doc` (see pinned_body)."""
+    return pinned_body(doc, build_agenda_insert_requests(doc, texts))
+
+
+def agenda_insert_landed(before: dict, after: dict, texts: List[str]) -> bool:
+    """
+    Whether an agenda insert of `texts` against the snapshot `before` that
+    failed with a 5xx was applied anyway: `after`, re-read since, has them
+    right below the rows `before` had.
+    """
+    old = len(agenda_rows(before))
+    return agenda_rows(after)[old:old + len(texts)] == [text.strip() for text in texts]
+
+
+def written_revision(resp: dict) -> Optional[str]:
+    """The doc's revision after a batchUpdate, from its response."""
+    return (resp.get("writeControl") or {}).get("requiredRevisionId")
+
+
+def staged_fill_requests(
+    placeholders: FrozenSet[str], staged: StagedDoc, new_name: str,
+    fields: Optional[Mapping[str, str]],
+) -> List[dict]:
+    """Requests filling a staged copy's placeholders other than its (already filled) number."""
+    _, rest = split_meeting_number(placeholders)
+    return fill_requests(rest, template_fields(new_name, staged.meeting_number, fields))
+
+
+def staged_number_requests(placeholders: FrozenSet[str], meeting_number: int) -> List[dict]:
+    """Requests filling only the meeting number into a copy being staged."""
+    number, _ = split_meeting_number(placeholders)
+    return fill_requests(number, {MEETING_NUMBER_FIELD: f"{meeting_number:02d}"})
+
+
+def find_docs_in_folder(
+    drive_service, folder_id: str, doc_names: Sequence[str]
+) -> Dict[str, DriveFile]:
+    """
+    Find the most recently modified doc for each of `doc_names` with a single
+    files.list. Names with no doc are left out of the result.
+    """
+    found: Dict[str, DriveFile] = {}
+    page_token = None
+    while True:
+        resp = drive_service.files().list(
+            **files_list_params(docs_named_query(folder_id, doc_names), 100, page_token)
+        ).execute()
+        collect_latest(found, resp.get("files", []), doc_names)
+        page_token = resp.get("nextPageToken")
+        if not page_token or len(found) == len(set(doc_names)):
+            return found
+
+
 def paragraph_text(paragraph: dict) -> str:
     """Concatenate visible text from a paragraph."""
     parts = []
@@ -71,6 +439,12 @@ def paragraph_text(paragraph: dict) -> str:
     return "".join(parts)
 
 
+def is_agenda_heading(elem: dict) -> bool:
+    """Whether a body element is the 'Agenda items:' paragraph."""
+    para = elem.get("paragraph")
+    return bool(para) and paragraph_text(para).strip().lower().startswith("agenda items:")
+
+
 def find_agenda_table(doc: dict) -> Optional[Tuple[dict, int]]:
     """
     Find the first TABLE that appears AFTER a paragraph containing 'Agenda'
@@ -81,11 +455,7 @@ def find_agenda_table(doc: dict) -> Optional[Tuple[dict, int]]:
 
     # 1) find 'Agenda' paragraph
     for i, elem in enumerate(content):
-        para = elem.get("paragraph")
-        if not para:
-            continue
-        txt = paragraph_text(para).strip().lower()
-        if "agenda items:" == txt or txt.startswith("agenda items:"):
+        if is_agenda_heading(elem):
             agenda_idx = i
             break
 
@@ -101,6 +471,131 @@ def find_agenda_table(doc: dict) -> Optional[Tuple[dict, int]]:
     return None
 
 
+_json_decoder = json.JSONDecoder()
+_BODY_CONTENT_RE = re.compile(r'"body"\s*:\s*\{\s*"content"\s*:\s*\[')
+_REVISION_ID_RE = re.compile(r'"revisionId"\s*:\s*("(?:[^"\\]|\\.)*")')
+_SEPARATOR_RE = re.compile(r"\s*,?\s*")
+
+
+def _compact_table(elem: dict) -> dict:
+    """The table element with only the first column's text kept; other cells keep their indices."""
+    for row in elem["table"].get("tableRows", []):
+        row["tableCells"] = row.get("tableCells", [])[:1] + [
+            {key: cell[key] for key in ("startIndex", "endIndex") if key in cell}
+            for cell in row.get("tableCells", [])[1:]
+        ]
+    return elem
+
+
+def _revision_id(text: str, body_start: int) -> Optional[str]:
+    # Docs puts revisionId after the body; text inside the body can't match
+    # since its quotes are escaped
+    match = _REVISION_ID_RE.search(text, 0, body_start)
+    if match is None:
+        at = text.rfind('"revisionId"')
+        match = _REVISION_ID_RE.match(text, at) if at > body_start else None
+    return json.loads(match.group(1)) if match else None
+
+
+def locate_agenda(raw: Union[bytes, str]) -> dict:
+    """
+    Parse a documents.get response (AGENDA_DOC_FIELDS) only as far as the
+    agenda table, decoding body elements one at a time and stopping after
+    the table. Returns a doc the agenda helpers accept: its revisionId and a
+    body whose content ends with the table, with every element before it
+    other than the 'Agenda items:' paragraph left as an empty placeholder so
+    find_agenda_table returns the same table index.
+    """
+    text = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+    match = _BODY_CONTENT_RE.search(text)
+    if match is None:  # not laid out the way Docs sends it
+        return json.loads(text)
+
+    content: List[dict] = []
+    heading_seen = False
+    pos = _SEPARATOR_RE.match(text, match.end()).end()
+    while pos < len(text) and text[pos] != "]":
+        elem, pos = _json_decoder.raw_decode(text, pos)
+        pos = _SEPARATOR_RE.match(text, pos).end()
+        if not heading_seen and is_agenda_heading(elem):
+            heading_seen = True
+            content.append(elem)
+        elif heading_seen and "table" in elem:
+            content.append(_compact_table(elem))
+            break
+        else:
+            content.append({})
+    doc = {"body": {"content": content}}
+    revision_id = _revision_id(text, match.start())
+    if revision_id is not None:
+        doc["revisionId"] = revision_id
+    return doc
+
+
+def parse_with(request, parse: Callable[[bytes], dict]):
+    """Make a googleapiclient request's execute() return `parse(raw body)`."""
+    postproc = lambda resp, content: parse(content)  # noqa: E731
+    set_postproc = getattr(request, "set_postproc", None)
+    if set_postproc is not None:
+        set_postproc(postproc)  # ScheduledHttpRequest, which times the parse
+    else:
+        request.postproc = postproc
+    return request
+
+
+def fetch_agenda_doc(docs_service, doc_id: str) -> dict:
+    """The doc's agenda snapshot, parsed by locate_agenda."""
+    return parse_with(
+        docs_service.documents().get(documentId=doc_id, fields=AGENDA_DOC_FIELDS), locate_agenda
+    ).execute()
+
+
+def agenda_rows(doc: dict) -> List[str]:
+    """Text of the first cell of each agenda table row, header row excluded."""
+    found = find_agenda_table(doc)
+    if not found:
+        raise RuntimeError("Couldn't find an 'Agenda' heading followed by a table.")
+    table, _ = found
+    rows = []
+    for row in table.get("tableRows", [])[1:]:
+        cells = row.get("tableCells", [])
+        content = cells[0].get("content", []) if cells else []
+        rows.append("".join(
+            paragraph_text(el["paragraph"]) for el in content if "paragraph" in el
+        ).strip())
+    return rows
+
+
+CHANGES_FIELDS = "nextPageToken,newStartPageToken,changes(fileId,removed,file(trashed))"
+
+
+def collect_changes(changes: List[dict], changed: Set[str], gone: Set[str]) -> None:
+    """Add a changes.list page's file IDs to `changed`, and trashed or deleted ones to `gone`."""
+    for change in changes:
+        file_id = change.get("fileId")
+        if not file_id:
+            continue
+        changed.add(file_id)
+        if change.get("removed") or (change.get("file") or {}).get("trashed"):
+            gone.add(file_id)
+
+
+def changed_file_ids(drive_service, page_token: str) -> Tuple[Set[str], Set[str], str]:
+    """
+    IDs of files changed since `page_token` (from changes.getStartPageToken or
+    a previous call), those of them now trashed or deleted, and the token to
+    pass next time.
+    """
+    changed: Set[str] = set()
+    gone: Set[str] = set()
+    while True:
+        resp = drive_service.changes().list(**changes_list_params(page_token)).execute()
+        collect_changes(resp.get("changes", []), changed, gone)
+        if "newStartPageToken" in resp:
+            return changed, gone, resp["newStartPageToken"]
+        page_token = resp["nextPageToken"]
+
+
 def get_first_cell_start_index(table: dict, row_index: int, col_index: int) -> int:
     """
     Returns the startIndex where we can insert text for a given cell.
@@ -122,14 +617,78 @@ def get_first_cell_start_index(table: dict, row_index: int, col_index: int) -> i
     return si
 
 
-def add_row_and_fill(docs_service, doc_id: str, text: str) -> None:
+def build_insert_row_request(doc: dict) -> dict:
+    """insertTableRow request adding one row below the last row of the agenda table."""
+    found = find_agenda_table(doc)
+    if not found:
+        raise RuntimeError("Couldn't find an 'Agenda' heading followed by a table.")
+
+    table, table_body_index = found
+    rows = table.get("tableRows", [])
+    if not rows:
+        raise RuntimeError("Agenda table has no rows.")
+
+    insert_below_row = len(rows) - 1
+
+    return {
+        "insertTableRow": {
+            "tableCellLocation": {
+                "tableStartLocation": {
+                    "index": doc["body"]["content"][table_body_index]["startIndex"]
+                },
+                "rowIndex": insert_below_row,
+                "columnIndex": 0,
+            },
+            "insertBelow": True,
+        }
+    }
+
+
+def build_fill_last_row_request(doc: dict, text: str) -> dict:
+    """insertText request filling the first cell of the agenda table's last row."""
+    found = find_agenda_table(doc)
+    if not found:
+        raise RuntimeError("Agenda table disappeared after row insert (unexpected).")
+    table, _ = found
+
+    new_row_index = len(table["tableRows"]) - 1
+    cell_start = get_first_cell_start_index(table, new_row_index, 0)
+
+    return {
+        "insertText": {
+            "location": {"index": cell_start},
+            "text": text.strip(),
+        }
+    }
+
+
+def add_row_and_fill_refetch(docs_service, doc_id: str, text: str) -> None:
     """
     1) Locate the table under 'Agenda'
     2) Insert a new row at the bottom
     3) Re-fetch doc (indices shift)
     4) Insert text into first cell of new row
     """
-    doc = docs_service.documents().get(documentId=doc_id).execute()
+    doc = fetch_agenda_doc(docs_service, doc_id)
+    requests = [build_insert_row_request(doc)]
+
+    docs_service.documents().batchUpdate(
+        documentId=doc_id, body=pinned_body(doc, requests)
+    ).execute()
+
+    doc2 = fetch_agenda_doc(docs_service, doc_id)
+    requests2 = [build_fill_last_row_request(doc2, text)]
+
+    docs_service.documents().batchUpdate(
+        documentId=doc_id, body=pinned_body(doc2, requests2)
+    ).execute()
+
+
+def _agenda_table_geometry(doc: dict) -> Tuple[dict, int, int, int]:
+    """
+    Returns (table, table_start_index, last_row_end_index, column_count) for
+    the agenda table in `doc`.
+    """
     found = find_agenda_table(doc)
     if not found:
         raise RuntimeError("Couldn't find an 'Agenda' heading followed by a table.")
@@ -139,79 +698,232 @@ def add_row_and_fill(docs_service, doc_id: str, text: str) -> None:
     if not rows:
         raise RuntimeError("Agenda table has no rows.")
 
-    insert_below_row = len(rows) - 1
+    table_elem = doc["body"]["content"][table_body_index]
+    columns = table.get("columns") or len(rows[-1].get("tableCells", []))
+    last_row_end = rows[-1].get("endIndex")
+    if last_row_end is None:
+        last_row_end = table_elem["endIndex"] - 1
+    return table, table_elem["startIndex"], last_row_end, columns
+
+
+def build_agenda_insert_requests(doc: dict, texts: List[str]) -> List[dict]:
+    """
+    Build one batchUpdate that appends len(texts) rows to the agenda table and
+    fills the first cell of each, using indices from a single snapshot.
+
+    A freshly inserted row of C empty cells is 1 + 2*C characters long (row
+    marker, then a cell marker and an empty paragraph per cell), so row k lands
+    at last_row_end + k * (1 + 2*C) and its first cell's text goes 2 past that.
+    Text is inserted bottom-up so earlier insertions don't shift later ones.
+    """
+    table, table_start, last_row_end, columns = _agenda_table_geometry(doc)
+    rows = table["tableRows"]
+    row_length = 1 + 2 * columns
 
     requests = [
         {
             "insertTableRow": {
                 "tableCellLocation": {
-                    "tableStartLocation": {
-                        "index": doc["body"]["content"][table_body_index]["startIndex"]
-                    },
-                    "rowIndex": insert_below_row,
+                    "tableStartLocation": {"index": table_start},
+                    "rowIndex": len(rows) - 1 + k,
                     "columnIndex": 0,
                 },
                 "insertBelow": True,
             }
         }
+        for k in range(len(texts))
     ]
+    for k in reversed(range(len(texts))):
+        requests.append(
+            {
+                "insertText": {
+                    "location": {"index": last_row_end + k * row_length + 2},
+                    "text": texts[k].strip(),
+                }
+            }
+        )
+    return requests
 
-    docs_service.documents().batchUpdate(
-        documentId=doc_id, body={"requests": requests}
-    ).execute()
 
-    doc2 = docs_service.documents().get(documentId=doc_id).execute()
-    found2 = find_agenda_table(doc2)
-    if not found2:
-        raise RuntimeError("Agenda table disappeared after row insert (unexpected).")
-    table2, _ = found2
+def _shift_indices(node, position: int, delta: int) -> None:
+    """Shift every start/end index at or past `position` by `delta`, in place."""
+    if isinstance(node, list):
+        for child in node:
+            _shift_indices(child, position, delta)
+    elif isinstance(node, dict):
+        if node.get("startIndex", -1) >= position:
+            node["startIndex"] += delta
+        if node.get("endIndex", -1) > position:
+            node["endIndex"] += delta
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                _shift_indices(value, position, delta)
 
-    new_row_index = len(table2["tableRows"]) - 1
-    cell_start = get_first_cell_start_index(table2, new_row_index, 0)
 
-    requests2 = [
-        {
-            "insertText": {
-                "location": {"index": cell_start},
-                "text": text.strip(),
-            }
-        }
-    ]
+def _paragraph_node(start: int, text: str) -> dict:
+    end = start + len(text)
+    return {
+        "startIndex": start,
+        "endIndex": end,
+        "paragraph": {
+            "elements": [{"startIndex": start, "endIndex": end, "textRun": {"content": text}}]
+        },
+    }
 
-    docs_service.documents().batchUpdate(
-        documentId=doc_id, body={"requests": requests2}
-    ).execute()
 
+def apply_agenda_insert(doc: dict, texts: List[str], revision_id: Optional[str]) -> dict:
+    """
+    Return a copy of the (field-masked) snapshot `doc` as it looks after
+    build_agenda_insert_requests(doc, texts) was applied, tagged `revision_id`.
+    Lets us keep a snapshot current after our own writes without re-fetching.
+    """
+    doc = copy.deepcopy(doc)
+    table, _, last_row_end, columns = _agenda_table_geometry(doc)
 
-def count_meeting_docs(drive_service, folder_id: str) -> int:
+    new_rows = []
+    row_start = last_row_end
+    for text in texts:
+        text = text.strip()
+        first_cell_end = row_start + 1 + 1 + len(text) + 1
+        cells = [{
+            "startIndex": row_start + 1,
+            "endIndex": first_cell_end,
+            "content": [_paragraph_node(row_start + 2, text + "\n")],
+        }]
+        for c in range(1, columns):
+            cell_start = first_cell_end + 2 * (c - 1)
+            cells.append({
+                "startIndex": cell_start,
+                "endIndex": cell_start + 2,
+                "content": [_paragraph_node(cell_start + 1, "\n")],
+            })
+        row_end = cells[-1]["endIndex"]
+        new_rows.append({"startIndex": row_start, "endIndex": row_end, "tableCells": cells})
+        row_start = row_end
+
+    _shift_indices(doc["body"]["content"], last_row_end, row_start - last_row_end)
+    table["tableRows"].extend(new_rows)
+    if "rows" in table:
+        table["rows"] = len(table["tableRows"])
+    doc["revisionId"] = revision_id
+    return doc
+
+
+def add_rows_and_fill(
+    docs_service, doc_id: str, texts: List[str], snapshots: Optional[DocSnapshotCache] = None
+) -> None:
     """
-    Count the number of documents in the folder that match the meeting pattern.
-    Returns the count of documents containing 'MEETING' or 'meeting' in the name.
+    Append one agenda row per entry in `texts` with a single document fetch
+    and a single batchUpdate. The update is pinned to the fetched revision, so
+    if anyone edits the doc in between it fails instead of landing at stale
+    indices (see is_revision_mismatch).
+
+    With `snapshots`, the fetch is skipped when the doc's revision is unchanged
+    and the snapshot is patched with our own insert afterwards.
+
+    A 5xx isn't retried (see scheduler.NON_IDEMPOTENT_METHODS), as the rows may
+    have gone in; the doc is re-read and the error only raised if they didn't.
     """
-    q = (
-        f"'{folder_id}' in parents and "
-        f"mimeType='application/vnd.google-apps.document' and "
-        f"(name contains 'MEETING' or name contains 'meeting') and "
-        f"trashed=false"
-    )
+    if snapshots is not None:
+        doc = snapshots.get(docs_service, doc_id)
+    else:
+        doc = fetch_agenda_doc(docs_service, doc_id)
+    try:
+        resp = docs_service.documents().batchUpdate(
+            documentId=doc_id, body=agenda_insert_body(doc, texts)
+        ).execute()
+    except HttpError as e:
+        if snapshots is not None:
+            snapshots.invalidate(doc_id)
+        if not is_server_error(e):
+            raise
+        after = fetch_agenda_doc(docs_service, doc_id)
+        if not agenda_insert_landed(doc, after, texts):
+            raise
+        if snapshots is not None:
+            snapshots.store(doc_id, after)
+        return
+
+    if snapshots is not None:
+        snapshots.store(doc_id, apply_agenda_insert(doc, texts, written_revision(resp)))
 
-    resp = drive_service.files().list(
-        q=q,
-        fields="files(id,name)",
-        pageSize=1000,
-        supportsAllDrives=True,
-        includeItemsFromAllDrives=True,
-    ).execute()
 
-    return len(resp.get("files", []))-2
+def add_row_and_fill(
+    docs_service,
+    doc_id: str,
+    text: str,
+    index_arithmetic: bool = AGENDA_INDEX_ARITHMETIC,
+    snapshots: Optional[DocSnapshotCache] = None,
+) -> None:
+    """
+    Append one agenda row containing `text`.
 
+    With `index_arithmetic`, this is one get plus one revision-guarded
+    batchUpdate; if the revision moved underneath us we fall back to the
+    re-fetching path in add_row_and_fill_refetch.
+    """
+    if index_arithmetic:
+        try:
+            add_rows_and_fill(docs_service, doc_id, [text], snapshots)
+            return
+        except HttpError as e:
+            if not is_revision_mismatch(e):
+                raise
+    add_row_and_fill_refetch(docs_service, doc_id, text)
+    if snapshots is not None:
+        snapshots.invalidate(doc_id)
 
-def replace_meeting_number(docs_service, doc_id: str, meeting_number: int) -> None:
+
+def count_meeting_docs(
+    drive_service,
+    folder_id: str,
+    exclude_names: Tuple[str, ...] = (TARGET_DOC_NAME, TEMPLATE_DOC_NAME),
+) -> int:
     """
-    Find and replace 'XX' with the meeting number in the document.
+    Count the number of documents in the folder that match the meeting pattern.
+    Returns the count of documents containing 'MEETING' or 'meeting' in the name,
+    not counting the draft/template docs named in `exclude_names`.
     """
-    # Simple replace all approach
-    requests = [{
+    q = meeting_docs_query(folder_id)
+
+    count = 0
+    page_token = None
+    while True:
+        resp = drive_service.files().list(**files_list_params(
+            q, 1000, page_token, fields="nextPageToken,files(name)", newest_first=False
+        )).execute()
+        count += count_files(resp, exclude_names)
+        page_token = resp.get("nextPageToken")
+        if not page_token:
+            return count
+
+
+def list_docs(
+    drive_service, query: str, exclude_names: Tuple[str, ...] = ()
+) -> List[DriveFile]:
+    """Every file matching the Drive `query`, newest first, minus those named in `exclude_names`."""
+    docs: List[DriveFile] = []
+    page_token = None
+    while True:
+        resp = drive_service.files().list(**files_list_params(query, 1000, page_token)).execute()
+        docs.extend(drive_files(resp, exclude_names))
+        page_token = resp.get("nextPageToken")
+        if not page_token:
+            return docs
+
+
+def list_meeting_docs(
+    drive_service,
+    folder_id: str,
+    exclude_names: Tuple[str, ...] = (TARGET_DOC_NAME, TEMPLATE_DOC_NAME),
+) -> List[DriveFile]:
+    """Every meeting doc in the folder (see count_meeting_docs), newest first."""
+    return list_docs(drive_service, meeting_docs_query(folder_id), exclude_names)
+
+
+def meeting_number_request(meeting_number: int) -> dict:
+    """replaceAllText request swapping the template's 'XX' for the meeting number."""
+    return {
         'replaceAllText': {
             'containsText': {
                 'text': 'XX',
@@ -219,7 +931,15 @@ def replace_meeting_number(docs_service, doc_id: str, meeting_number: int) -> No
             },
             'replaceText': f'{meeting_number:02d}'
         }
-    }]
+    }
+
+
+def replace_meeting_number(docs_service, doc_id: str, meeting_number: int) -> None:
+    """
+    Find and replace 'XX' with the meeting number in the document.
+    """
+    # Simple replace all approach
+    requests = [meeting_number_request(meeting_number)]
     
     # Apply the replacement
     docs_service.documents().batchUpdate(
@@ -227,80 +947,524 @@ def replace_meeting_number(docs_service, doc_id: str, meeting_number: int) -> No
     ).execute()
 
 
-def copy_document_from_template(drive_service, template_name: str, new_name: str, folder_id: str) -> str:
+def find_template_version(drive_service, folder_id: str, template_name: str) -> Tuple[str, str]:
     """
-    Copy a document from a template and place it in the specified folder.
-    Returns the new document ID.
+    Find the most recently modified template doc named `template_name`.
+    Searches directly (unlike find_doc_in_folder) so a missing template never
+    triggers a copy. Returns the template's (fileId, modifiedTime).
     """
-    # Count existing meeting docs BEFORE creating the new one
-    meeting_count = count_meeting_docs(drive_service, folder_id)
-    meeting_number = meeting_count + 1  # Next meeting number
-    
-    # Find the template document (but avoid recursion by searching directly)
-    template_q = (
-        f"'{folder_id}' in parents and "
-        f"mimeType='application/vnd.google-apps.document' and "
-        f"name='{template_name}' and trashed=false"
-    )
-    
+    template_q = doc_name_query(folder_id, template_name)
+
     template_resp = drive_service.files().list(
-        q=template_q,
-        fields="files(id,name,modifiedTime)",
-        orderBy="modifiedTime desc",
-        pageSize=1,
-        supportsAllDrives=True,
-        includeItemsFromAllDrives=True,
+        **files_list_params(template_q, 1, fields="files(id,name,modifiedTime)")
     ).execute()
+    return newest_template(template_resp, template_name)
+
+
+def find_template_in_folder(drive_service, folder_id: str, template_name: str) -> str:
+    """Like find_template_version, but returns only the template fileId."""
+    return find_template_version(drive_service, folder_id, template_name)[0]
+
+
+def move_document(
+    drive_service, doc_id: str, new_name: str, folder_id: str, from_folder_id: str
+) -> None:
+    """Rename `doc_id` to `new_name` and move it from `from_folder_id` to `folder_id`."""
+    body, params = move_request(new_name, folder_id, from_folder_id)
+    drive_service.files().update(fileId=doc_id, body=body, **params).execute()
+
+
+def trash_document(drive_service, doc_id: str) -> None:
+    """Move `doc_id` to the Drive trash."""
+    body, params = trash_request()
+    drive_service.files().update(fileId=doc_id, body=body, **params).execute()
+
+
+def copy_document_from_template(
+    drive_service,
+    template_name: str,
+    new_name: str,
+    folder_id: str,
+    docs_service=None,
+    template_id: Optional[str] = None,
+    allocator: Optional[MeetingNumberAllocator] = None,
+    fields: Optional[Mapping[str, str]] = None,
+    field_cache: Optional[TemplateFieldCache] = None,
+    placeholders: Optional[FrozenSet[str]] = None,
+) -> str:
+    """
+    Copy a document from a template and place it in the specified folder,
+    filling in its placeholders (see templating.template_fields; `fields`
+    adds or overrides values) with one batchUpdate.
+    Pass `docs_service` to reuse an existing client for the replacements,
+    `template_id` to skip the template lookup, `allocator` to take the
+    meeting number from it instead of counting the folder, and `field_cache`
+    (or `placeholders`, if already detected) to only send replacements for
+    placeholders the template actually uses.
+    Returns the new document ID.
+    """
+    # Reserve the number BEFORE creating the new doc so it isn't counted.
+    # If the copy then fails the number is skipped rather than reused.
+    if allocator is not None:
+        meeting_number = allocator.allocate()
+    else:
+        meeting_number = count_meeting_docs(drive_service, folder_id) + 1
     
-    template_files = template_resp.get("files", [])
-    if not template_files:
-        raise RuntimeError(f"Template '{template_name}' not found in folder.")
-    
-    template_id = template_files[0]["id"]
-    
+    if template_id is None:
+        template_id = find_template_in_folder(drive_service, folder_id, template_name)
+
+    # Build a docs service only if the caller didn't give us one
+    try:
+        if docs_service is None:
+            docs_service = make_docs_service(service_account_tokens(SERVICE_ACCOUNT_FILE).creds)
+        if field_cache is not None:
+            placeholders = field_cache.get(docs_service, template_id)
+    except Exception:
+        # Not detected: send a replacement for every field we have a value for
+        pass
+
     # Copy the template
-    copy_body = {
-        'name': new_name,
-        'parents': [folder_id]
-    }
-    
     result = drive_service.files().copy(
         fileId=template_id,
-        body=copy_body,
+        body=copy_body(new_name, folder_id),
         supportsAllDrives=True
     ).execute()
 
-    # Create docs service with same credentials to replace XX
+    requests = fill_requests(placeholders, template_fields(new_name, meeting_number, fields))
     try:
-        creds = make_creds()  # Use the same credential function
-        docs_service = make_docs_service(creds)
-        replace_meeting_number(docs_service, result['id'], meeting_number)
+        if requests:
+            docs_service.documents().batchUpdate(
+                documentId=result['id'], body={'requests': requests}
+            ).execute()
     except Exception as replace_error:
-        # Document was created but XX replacement failed - still return the document
-        # The user can manually fix the XX if needed
+        # Document was created but the replacement failed - still return the document
+        # The user can manually fix the placeholders if needed
         pass
     
     return result['id']
 
-class GoogleDocsManager:
-    """High-level interface for Google Docs operations."""
+class DocsManagerBase:
+    """
+    State shared by GoogleDocsManager and google_async.AsyncGoogleDocsManager:
+    the tenant's name cache, snapshots, meeting numbers and staged copies.
+    `count_meeting_docs` is handed to the MeetingNumberAllocator.
+    """
+
+    def __init__(
+        self,
+        tenant: Optional[Tenant],
+        doc_id_cache: Optional[DocIdCache],
+        count_meeting_docs: Optional[Callable[[], int]],
+    ):
+        self.tenant = tenant if tenant is not None else default_tenant()
+        if doc_id_cache is None:
+            doc_id_cache = DocIdCache(DOC_ID_CACHE_TTL, DOC_ID_CACHE_SIZE)
+        self.doc_id_cache = doc_id_cache
+        self.snapshots = DocSnapshotCache(
+            AGENDA_DOC_FIELDS, DOC_SNAPSHOT_CACHE_SIZE, parse=locate_agenda
+        )
+        self.meeting_numbers = MeetingNumberAllocator(
+            self.tenant.meeting_numbers_db, self.tenant.folder_id, count_meeting_docs
+        )
+        self.staged_docs = StagedDocPool(self.tenant.staged_docs_db, self.tenant.folder_id)
+        self.template_fields = TemplateFieldCache()
+
+    @property
+    def _not_meeting_docs(self) -> Tuple[str, str]:
+        """The draft and template, which match meeting_docs_query but aren't meetings."""
+        return self.tenant.target_doc_name, self.tenant.template_doc_name
+
+    def _forget_files(self, file_ids: Iterable[str]) -> None:
+        for file_id in file_ids:
+            self.doc_id_cache.invalidate_file(file_id)
+            self.snapshots.invalidate(file_id)
+
+
+class GoogleDocsManager(DocsManagerBase):
+    """High-level interface for Google Docs operations on one tenant's folder."""
     
-    def __init__(self):
-        self.creds = make_creds()
-        self.drive_service = make_drive_service(self.creds)
-        self.docs_service = make_docs_service(self.creds)
+    def __init__(
+        self,
+        pool: Optional[GoogleServicePool] = None,
+        doc_id_cache: Optional[DocIdCache] = None,
+        tenant: Optional[Tenant] = None,
+        tokens: Optional[ServiceAccountTokens] = None,
+    ):
+        super().__init__(tenant, doc_id_cache, self._count_meeting_docs)
+        if pool is None:
+            tokens = tokens or service_account_tokens(self.tenant.service_account_file)
+            pool = GoogleServicePool(tokens.creds)
+        self.pool = pool
+        self.tokens = tokens
+        self.creds = self.pool.creds
+        self.agenda_writer = AgendaWriteCoalescer(
+            lambda doc_id, text: add_row_and_fill(
+                self.docs_service, doc_id, text, snapshots=self.snapshots
+            ),
+            lambda doc_id, texts: add_rows_and_fill(
+                self.docs_service, doc_id, texts, self.snapshots
+            ),
+            AGENDA_COALESCE_WINDOW,
+            is_stale=is_revision_mismatch,
+            is_item_error=is_item_error,
+        )
+
+    @property
+    def docs_service(self):
+        return self.pool.docs_service
+
+    @property
+    def drive_service(self):
+        return self.pool.drive_service
+
+    def _count_meeting_docs(self) -> int:
+        return count_meeting_docs(self.drive_service, self.tenant.folder_id, self._not_meeting_docs)
+
+    def _with_resolved(self, doc_name: str, lookup, action):
+        """
+        Run `action(file_id)` with a cached name -> ID resolution. If Google says
+        the file is gone (404/403), drop the cache entry and retry once fresh,
+        so `action` must be safe to run twice.
+        """
+        file_id = self.doc_id_cache.resolve(self.tenant.folder_id, doc_name, lookup)
+        try:
+            return action(file_id)
+        except HttpError as e:
+            if not is_missing_doc_error(e):
+                raise
+            self.doc_id_cache.invalidate_file(file_id)
+            file_id = self.doc_id_cache.resolve(self.tenant.folder_id, doc_name, lookup)
+            return action(file_id)
     
+    def lookup_folder(self, doc_names: Sequence[str], count_meetings: bool = False) -> FolderLookup:
+        """
+        Look up `doc_names` with one files.list and, if asked, count the
+        meeting docs at the same time on another thread's connection, so the
+        whole lookup costs one round trip.
+        """
+        counted = None
+        if count_meetings:
+            context = contextvars.copy_context()  # keeps background_priority()
+            counted = _lookup_executor().submit(context.run, self._count_meeting_docs)
+        files = find_docs_in_folder(self.drive_service, self.tenant.folder_id, doc_names)
+        return FolderLookup(files, counted.result() if counted is not None else None)
+
+    def _lookup_template(self, template_name: str) -> str:
+        """Template ID, reconciling the meeting numbers in the same round trip if needed."""
+        found = self.lookup_folder(
+            [template_name], count_meetings=self.meeting_numbers.last_issued() is None
+        )
+        if found.meeting_docs is not None:
+            self.meeting_numbers.reconcile(found.meeting_docs)
+        template = found.files.get(template_name)
+        if template is None:
+            raise RuntimeError(f"Template '{template_name}' not found in folder.")
+        return template.id
+
+    def _find_target_doc(self) -> str:
+        """
+        Same as find_doc_in_folder for the tenant's draft, but looks for the
+        template in the same query in case the draft has to be created.
+        """
+        tenant = self.tenant
+        found = self.lookup_folder([tenant.target_doc_name, tenant.template_doc_name])
+        if tenant.target_doc_name in found.files:
+            return found.files[tenant.target_doc_name].id
+        # A staged copy already holds the next meeting number; copying the
+        # template would allocate the one after it
+        if tenant.template_pool_size > 0:
+            doc_id = self._take_staged_copy(tenant.target_doc_name)
+            if doc_id is not None:
+                return doc_id
+        template = found.files.get(tenant.template_doc_name)
+        if template is None:
+            raise RuntimeError(f"Template '{tenant.template_doc_name}' not found in folder.")
+        self.doc_id_cache.put(tenant.folder_id, tenant.template_doc_name, template.id)
+        return copy_document_from_template(
+            self.drive_service, tenant.template_doc_name, tenant.target_doc_name, tenant.folder_id,
+            self.docs_service, template_id=template.id, allocator=self.meeting_numbers,
+            field_cache=self.template_fields,
+        )
+
+    def _resolve_target_doc(self) -> str:
+        return self.doc_id_cache.resolve(
+            self.tenant.folder_id, self.tenant.target_doc_name, self._find_target_doc
+        )
+
+    def add_agenda_items(
+        self, items: List[str], window: float = 0.0
+    ) -> List[Optional[BaseException]]:
+        """
+        Add several items to the agenda table, in one write where possible.
+        Returns the error for each item, or None where it was added. The
+        journal replayer already batches, so by default nothing waits for
+        more items to join (see AgendaWriteCoalescer).
+        """
+        doc_id = self._resolve_target_doc()
+        errors = self.agenda_writer.submit_many(doc_id, items, window)
+
+        # Same as _with_resolved: if the doc is gone, look it up again once
+        retry = [i for i, e in enumerate(errors) if is_missing_doc_error(e)]
+        if retry:
+            self.doc_id_cache.invalidate_file(doc_id)
+            doc_id = self._resolve_target_doc()
+            retried = self.agenda_writer.submit_many(
+                doc_id, [items[i] for i in retry], window
+            )
+            for i, error in zip(retry, retried):
+                errors[i] = error
+        return errors
+
     def add_agenda_item(self, item: str) -> None:
         """Add an item to the agenda table in the target document."""
-        doc_id = find_doc_in_folder(self.drive_service, FOLDER_ID, TARGET_DOC_NAME)
-        add_row_and_fill(self.docs_service, doc_id, item)
+        error = self.add_agenda_items([item], self.agenda_writer.window)[0]
+        if error is not None:
+            raise error
+
+    def agenda_items(self, trust_cache: bool = False) -> List[str]:
+        """
+        The agenda table's rows. With `trust_cache` (a DriveChangeWatcher is
+        keeping the snapshot current) a cached snapshot is used without any
+        API call; otherwise its revision is checked first.
+        """
+        def read(doc_id: str) -> List[str]:
+            doc = self.snapshots.peek(doc_id) if trust_cache else None
+            if doc is None:
+                doc = self.snapshots.get(self.docs_service, doc_id)
+            return agenda_rows(doc)
+
+        return self._with_resolved(self.tenant.target_doc_name, self._find_target_doc, read)
+
+    def list_folder_docs(self) -> List[DriveFile]:
+        """Every Google Doc in the tenant's folder, newest first (see folder_index.FolderIndex)."""
+        return list_docs(self.drive_service, folder_docs_query(self.tenant.folder_id))
+
+    def refresh_credentials(self) -> Optional[float]:
+        """
+        Refresh the access token if it is about to expire (see
+        tokens.TokenRefresher). Returns its expiry, or None without a service account.
+        """
+        return self.tokens.ensure_fresh() if self.tokens is not None else None
+
+    def changes_start_token(self) -> str:
+        """
+        Page token to watch Drive changes from. Snapshots cached before it can't
+        be vouched for by the changes feed, so they are dropped.
+        """
+        token = self.drive_service.changes().getStartPageToken(
+            supportsAllDrives=True
+        ).execute()["startPageToken"]
+        self.snapshots.clear()
+        return token
+
+    def changed_file_ids(self, page_token: str) -> Tuple[Set[str], str]:
+        """
+        Files changed since `page_token`, and the next token. Docs that were
+        trashed or deleted are dropped from the name cache: Docs keeps serving
+        a trashed doc, so nothing else would notice.
+        """
+        changed, gone, next_token = changed_file_ids(self.drive_service, page_token)
+        self._forget_files(gone)
+        return changed, next_token
+
+    def refresh_snapshots(self, file_ids: Iterable[str]) -> None:
+        """Re-check cached snapshots of changed files, re-fetching those whose revision moved."""
+        for doc_id in file_ids:
+            if self.snapshots.peek(doc_id) is None:
+                continue
+            try:
+                self.snapshots.get(self.docs_service, doc_id)
+            except HttpError:
+                self.snapshots.invalidate(doc_id)
     
-    def create_from_template(self, new_name: str, template_name: str = None) -> str:
-        """Create a new document from template and return its ID."""
+    def create_from_template(
+        self,
+        new_name: str,
+        template_name: str = None,
+        fields: Optional[Mapping[str, str]] = None,
+    ) -> str:
+        """
+        Create a new document from template and return its ID. `fields` fills
+        `{{name}}` placeholders on top of title, meeting_number and date.
+        """
         if template_name is None:
-            template_name = TEMPLATE_DOC_NAME
+            template_name = self.tenant.template_doc_name
+        if template_name == self.tenant.template_doc_name and self.tenant.template_pool_size > 0:
+            doc_id = self._take_staged_copy(new_name, fields)
+            if doc_id is not None:
+                return doc_id
         
-        doc_id = copy_document_from_template(
-            self.drive_service, template_name, new_name, FOLDER_ID
+        # Only the template read is retried against a fresh lookup; running the
+        # copy twice would take a second meeting number and could make two docs
+        template_id, placeholders = self._with_resolved(
+            template_name, lambda: self._lookup_template(template_name), self._read_template
+        )
+        return copy_document_from_template(
+            self.drive_service, template_name, new_name, self.tenant.folder_id,
+            self.docs_service, template_id=template_id, allocator=self.meeting_numbers,
+            fields=fields, placeholders=placeholders,
         )
-        return doc_id
+
+    def _read_template(self, template_id: str) -> Tuple[str, Optional[FrozenSet[str]]]:
+        """
+        (template_id, its placeholders), or None for those if they couldn't be
+        detected. Raises only if the template is gone (see _with_resolved).
+        """
+        try:
+            return template_id, self.template_fields.get(self.docs_service, template_id)
+        except Exception as e:
+            if is_missing_doc_error(e):
+                raise
+            return template_id, None
+
+    def _take_staged_copy(
+        self, new_name: str, fields: Optional[Mapping[str, str]] = None
+    ) -> Optional[str]:
+        """
+        Rename a pre-provisioned copy to `new_name`, move it into the folder
+        and fill in the placeholders other than the meeting number. Returns
+        its ID, or None if no copy is staged.
+        """
+        while True:
+            staged = self.staged_docs.claim()
+            if staged is None:
+                return None
+            if not self.meeting_numbers.is_unused(staged.meeting_number):
+                # Drive has caught up with its number since it was staged
+                self._discard_staged_copy(staged.doc_id)
+                continue
+            try:
+                move_document(
+                    self.drive_service, staged.doc_id, new_name, self.tenant.folder_id,
+                    self.tenant.template_staging_folder_id,
+                )
+            except HttpError as e:
+                if is_missing_doc_error(e):
+                    # Deleted by hand; its meeting number is skipped
+                    continue
+                self.staged_docs.add(staged)
+                raise
+            self._fill_staged_copy(staged, new_name, fields)
+            return staged.doc_id
+
+    def _discard_staged_copy(self, doc_id: str) -> None:
+        try:
+            trash_document(self.drive_service, doc_id)
+        except HttpError as e:
+            # It stays in the staging folder, where nothing counts it
+            print(f"Failed to trash staged copy {doc_id}: {e}")
+
+    def _fill_staged_copy(
+        self, staged: StagedDoc, new_name: str, fields: Optional[Mapping[str, str]]
+    ) -> None:
+        try:
+            # Staging scanned this template; its copies are rebuilt when it changes
+            cached = self.template_fields.peek(staged.template_id)
+            if cached is not None:
+                placeholders = cached[1]
+            else:
+                placeholders = self.template_fields.get(self.docs_service, staged.template_id)
+            requests = staged_fill_requests(placeholders, staged, new_name, fields)
+            if requests:
+                self.docs_service.documents().batchUpdate(
+                    documentId=staged.doc_id, body={"requests": requests}
+                ).execute()
+        except Exception:
+            # Same as copy_document_from_template: the doc exists, fix it by hand
+            pass
+
+    # ----------------------------
+    # Pre-provisioning (see provisioner.TemplateProvisioner)
+    # ----------------------------
+    def reconcile_meeting_numbers(self) -> int:
+        """Re-count the meeting docs in Drive and fix the counter; returns the last number."""
+        return self.meeting_numbers.reconcile()
+
+    def allocate_meeting_number(self) -> int:
+        return self.meeting_numbers.allocate()
+
+    def template_id(self, template_name: str = None) -> str:
+        """File ID of `template_name` (default: the tenant's template), from the cache if known."""
+        template_name = template_name or self.tenant.template_doc_name
+        return self.doc_id_cache.resolve(
+            self.tenant.folder_id, template_name, lambda: self._lookup_template(template_name)
+        )
+
+    def target_doc_id(self) -> str:
+        """File ID of the tenant's draft, creating it from the template if it's missing."""
+        return self._resolve_target_doc()
+
+    def find_template_version(self, template_name: str = None) -> Tuple[str, str]:
+        return find_template_version(
+            self.drive_service, self.tenant.folder_id,
+            template_name or self.tenant.template_doc_name,
+        )
+
+    def stage_template_copy(self, template_id: str, meeting_number: int) -> str:
+        """Copy the template into the staging folder and fill in `meeting_number`."""
+        placeholders = self.template_fields.get(self.docs_service, template_id)
+        result = self.drive_service.files().copy(
+            fileId=template_id,
+            body=copy_body(staged_name(meeting_number), self.tenant.template_staging_folder_id),
+            fields="id",
+            supportsAllDrives=True,
+        ).execute()
+        requests = staged_number_requests(placeholders, meeting_number)
+        try:
+            if requests:
+                self.docs_service.documents().batchUpdate(
+                    documentId=result["id"], body={"requests": requests}
+                ).execute()
+        except Exception:
+            trash_document(self.drive_service, result["id"])
+            raise
+        return result["id"]
+
+    def trash_document(self, doc_id: str) -> None:
+        trash_document(self.drive_service, doc_id)
+
+
+_shared_managers: Dict[Tenant, GoogleDocsManager] = {}
+_shared_manager_lock = threading.Lock()
+_lookup_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _lookup_executor() -> ThreadPoolExecutor:
+    """Threads for Drive lookups run alongside the caller's (see lookup_folder)."""
+    global _lookup_pool
+    if _lookup_pool is None:
+        with _shared_manager_lock:
+            if _lookup_pool is None:
+                _lookup_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="drive-lookup")
+    return _lookup_pool
+
+
+def get_docs_manager(tenant: Optional[Tenant] = None) -> GoogleDocsManager:
+    """
+    Return the process-wide GoogleDocsManager for `tenant` (default: the one
+    configured by the environment), creating it on first use. Each tenant
+    gets its own credentials, connections and quota budget.
+    """
+    tenant = tenant if tenant is not None else default_tenant()
+    manager = _shared_managers.get(tenant)
+    if manager is None:
+        with _shared_manager_lock:
+            manager = _shared_managers.get(tenant)
+            if manager is None:
+                if tenant.name == DEFAULT_TENANT_NAME and not tenant.quotas:
+                    scheduler = get_scheduler()
+                else:
+                    scheduler = GoogleRequestScheduler.from_config(tenant.quotas)
+                tokens = service_account_tokens(tenant.service_account_file)
+                manager = _shared_managers[tenant] = GoogleDocsManager(
+                    GoogleServicePool(tokens.creds, scheduler), tenant=tenant, tokens=tokens,
+                )
+    return manager
+
+
+def drop_docs_managers(keep: Iterable[Tenant]) -> None:
+    """Forget the managers of tenants not in `keep` (after the tenants file changed)."""
+    keep = set(keep)
+    with _shared_manager_lock:
+        for tenant in [t for t in _shared_managers if t not in keep]:
+            del _shared_managers[tenant]
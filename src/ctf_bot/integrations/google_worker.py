@@ -0,0 +1,216 @@
+"""
+Run a tenant's GoogleDocsManager in a child process, so downloading and
+walking large documents never holds the GIL the Discord event loop needs.
+
+The bot sends (job ID, method, args, background) over a pipe; the child runs each job on
+its own threads and sends back only the method's return value (doc IDs, row
+texts, counts, per-item errors). Snapshots and other caches live in the child.
+"""
+import asyncio
+import contextlib
+import itertools
+import multiprocessing
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from ..metrics import registry
+from ..tenants import Tenant
+from .scheduler import background_priority, is_background
+
+# Safe to run again if the worker died before answering
+READ_ONLY_METHODS = frozenset({
+    "agenda_items", "changes_start_token", "changed_file_ids", "refresh_snapshots",
+    "find_template_version", "reconcile_meeting_numbers", "list_folder_docs", "template_id",
+})
+
+
+class WorkerCrashed(RuntimeError):
+    """The Google worker process exited before answering."""
+
+
+def portable_error(exc: BaseException) -> BaseException:
+    """`exc` if it survives pickling, else a RuntimeError carrying its message."""
+    try:
+        pickle.loads(pickle.dumps(exc))
+        return exc
+    except Exception:
+        return RuntimeError(f"{type(exc).__name__}: {exc}")
+
+
+def _portable_result(value):
+    # add_agenda_items returns one error (or None) per item
+    if isinstance(value, list):
+        return [portable_error(v) if isinstance(v, BaseException) else v for v in value]
+    return value
+
+
+def _default_factory(tenant: Tenant):
+    from .google_docs import get_docs_manager, warm_up
+
+    warm_up()
+    return get_docs_manager(tenant)
+
+
+def _worker_main(conn, tenant: Tenant, threads: int, factory: Callable) -> None:
+    """Child process: run jobs from `conn` on `threads` threads until the bot goes away."""
+    manager = factory(tenant)
+    send_lock = threading.Lock()
+
+    def run(job_id: int, method: str, args: tuple, background: bool) -> None:
+        try:
+            with background_priority() if background else contextlib.nullcontext():
+                result = getattr(manager, method)(*args)
+            reply = (job_id, True, _portable_result(result))
+        except BaseException as e:
+            reply = (job_id, False, portable_error(e))
+        with send_lock:
+            conn.send(reply)
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="google-job") as pool:
+        while True:
+            try:
+                job = conn.recv()
+            except (EOFError, OSError):
+                return
+            pool.submit(run, *job)
+
+
+class GoogleWorkerProcess:
+    """
+    One child process running `factory(tenant)` (by default the tenant's
+    GoogleDocsManager), with `threads` jobs in flight at once.
+
+    If the child dies, every job waiting on it fails with WorkerCrashed and
+    the next call starts a new one (at most once per `restart_delay`
+    seconds). Read-only jobs (READ_ONLY_METHODS) are retried once on the new
+    child; writes are not, since they may already have gone through.
+    """
+
+    def __init__(
+        self,
+        tenant: Tenant,
+        threads: int = 8,
+        factory: Callable = _default_factory,
+        restart_delay: float = 1.0,
+    ):
+        self.tenant = tenant
+        self.threads = threads
+        self.factory = factory
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self._context = multiprocessing.get_context("spawn")
+        self._conn = None
+        self._job_ids = itertools.count()
+        self._pending: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._lock = threading.Lock()
+        self._started_at = 0.0
+
+    def _alive(self) -> bool:
+        return self.process is not None and self.process.is_alive() and self._conn is not None
+
+    async def _ensure_started(self) -> None:
+        if self._alive():
+            return
+        wait = self._started_at + self.restart_delay - time.monotonic()
+        if self.process is not None and wait > 0:
+            await asyncio.sleep(wait)
+        # Spawning re-imports the bot in the child; keep that off the event loop
+        await asyncio.to_thread(self._start)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._alive():
+                return
+            if self.process is not None:
+                self.restarts += 1
+                registry.inc("google_worker_restarts_total", tenant=self.tenant.name)
+            parent, child = self._context.Pipe()
+            self.process = self._context.Process(
+                target=_worker_main,
+                args=(child, self.tenant, self.threads, self.factory),
+                name=f"google-worker-{self.tenant.name}",
+                daemon=True,
+            )
+            self.process.start()
+            child.close()
+            self._conn = parent
+            self._started_at = time.monotonic()
+            threading.Thread(
+                target=self._read_replies, args=(parent,), daemon=True,
+                name=f"google-worker-reader-{self.tenant.name}",
+            ).start()
+
+    def _read_replies(self, conn) -> None:
+        """Reader thread: resolve futures as replies arrive; fail them all if the child dies."""
+        while True:
+            try:
+                job_id, ok, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                waiting = self._pending.pop(job_id, None)
+            if waiting is not None:
+                loop, future = waiting
+                loop.call_soon_threadsafe(_settle, future, ok, payload)
+
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+            orphaned = list(self._pending.values())
+            self._pending.clear()
+        for loop, future in orphaned:
+            loop.call_soon_threadsafe(
+                _settle, future, False,
+                WorkerCrashed(f"Google worker for '{self.tenant.name}' exited"),
+            )
+
+    async def call(self, method: str, *args):
+        """Run `method(*args)` on the child's manager and return its result."""
+        try:
+            return await self._call_once(method, args)
+        except WorkerCrashed:
+            if method not in READ_ONLY_METHODS:
+                raise
+            return await self._call_once(method, args)
+
+    async def _call_once(self, method: str, args: tuple):
+        await self._ensure_started()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job_id = next(self._job_ids)
+        with self._lock:
+            conn = self._conn
+            if conn is None:
+                raise WorkerCrashed(f"Google worker for '{self.tenant.name}' exited")
+            self._pending[job_id] = (loop, future)
+        try:
+            conn.send((job_id, method, args, is_background()))
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self._pending.pop(job_id, None)
+            raise WorkerCrashed(f"Google worker for '{self.tenant.name}' exited") from e
+        return await future
+
+    def close(self) -> None:
+        """Stop the child; jobs still waiting fail with WorkerCrashed."""
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+        if self.process is not None:
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.kill()
+
+
+def _settle(future: asyncio.Future, ok: bool, payload) -> None:
+    if future.done():
+        return
+    if ok:
+        future.set_result(payload)
+    else:
+        future.set_exception(payload)
@@ -0,0 +1,138 @@
+"""Persistent allocation of meeting numbers for new meeting docs."""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+
+class MeetingNumberAllocator:
+    """
+    Hands out meeting numbers from a local SQLite database.
+
+    The last issued number per folder is stored on disk and incremented inside
+    an IMMEDIATE transaction, so concurrent callers (threads or processes)
+    never get the same number. Drive is only consulted by `reconcile`, which
+    runs `count_existing()` (the number of meeting docs already in the folder)
+    and moves the counter forward if Drive is ahead of us. A folder we have no
+    record of is reconciled automatically on first allocation.
+    """
+
+    def __init__(
+        self, db_path: Path, folder_id: str, count_existing: Optional[Callable[[], int]]
+    ):
+        self.db_path = Path(db_path)
+        self.folder_id = folder_id
+        self._count_existing = count_existing
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                    with sqlite3.connect(self.db_path) as conn:
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS meeting_numbers ("
+                            " folder_id TEXT PRIMARY KEY,"
+                            " last_number INTEGER NOT NULL,"
+                            " reconciled_at REAL)"
+                        )
+                        # Most meeting docs any reconcile has counted in Drive
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS meeting_docs_seen ("
+                            " folder_id TEXT PRIMARY KEY,"
+                            " most_seen INTEGER NOT NULL)"
+                        )
+                    self._initialized = True
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def last_issued(self) -> Optional[int]:
+        """The last number handed out for this folder, or None if never reconciled."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT last_number FROM meeting_numbers WHERE folder_id = ?",
+                (self.folder_id,),
+            ).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def reconcile(self, existing: Optional[int] = None) -> int:
+        """
+        Scan Drive and make sure the counter is at least the number of existing
+        meeting docs. Pass `existing` if you have already counted them.
+        Returns the resulting last issued number.
+        """
+        if existing is None:
+            existing = self._count_existing()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO meeting_numbers (folder_id, last_number, reconciled_at)"
+                " VALUES (?, ?, ?)"
+                " ON CONFLICT(folder_id) DO UPDATE SET"
+                " last_number = MAX(last_number, excluded.last_number),"
+                " reconciled_at = excluded.reconciled_at",
+                (self.folder_id, existing, time.time()),
+            )
+            conn.execute(
+                "INSERT INTO meeting_docs_seen (folder_id, most_seen) VALUES (?, ?)"
+                " ON CONFLICT(folder_id) DO UPDATE SET"
+                " most_seen = MAX(most_seen, excluded.most_seen)",
+                (self.folder_id, existing),
+            )
+            (last,) = conn.execute(
+                "SELECT last_number FROM meeting_numbers WHERE folder_id = ?",
+                (self.folder_id,),
+            ).fetchone()
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return last
+
+    def is_unused(self, number: int) -> bool:
+        """
+        Whether `number`, handed out earlier and held back (e.g. by a staged
+        template copy), is still ahead of Drive. Once a reconcile has counted
+        that many meeting docs, one of them may already carry it.
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT most_seen FROM meeting_docs_seen WHERE folder_id = ?",
+                (self.folder_id,),
+            ).fetchone()
+        finally:
+            conn.close()
+        return row is None or number > row[0]
+
+    def allocate(self) -> int:
+        """Atomically reserve and return the next meeting number."""
+        if self.last_issued() is None:
+            self.reconcile()
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE meeting_numbers SET last_number = last_number + 1 WHERE folder_id = ?",
+                (self.folder_id,),
+            )
+            (number,) = conn.execute(
+                "SELECT last_number FROM meeting_numbers WHERE folder_id = ?",
+                (self.folder_id,),
+            ).fetchone()
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return number
@@ -0,0 +1,262 @@
+"""Pre-built copies of the meeting template, ready to be renamed into place."""
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List, NamedTuple, Optional, Tuple
+
+from .scheduler import background_priority
+
+# Staged copies must not contain "meeting", or count_meeting_docs would count them
+STAGED_NAME_PREFIX = "~staged template copy"
+
+
+def staged_name(meeting_number: int) -> str:
+    """Drive name of a staged copy while it waits in the staging folder."""
+    return f"{STAGED_NAME_PREFIX} {meeting_number:02d}"
+
+
+class StagedDoc(NamedTuple):
+    doc_id: str
+    meeting_number: int
+    template_id: str
+    template_modified: str
+
+
+class StagedDocPool:
+    """
+    Local SQLite record of the staged copies for a folder, and of the meeting
+    numbers allocated for copies not built yet (`reserve`), so neither is
+    lost on a restart.
+
+    `claim` removes and returns the copy with the lowest meeting number inside
+    an IMMEDIATE transaction, so two commands never get the same doc and
+    meeting numbers are handed out in order.
+    """
+
+    def __init__(self, db_path: Path, folder_id: str):
+        self.db_path = Path(db_path)
+        self.folder_id = folder_id
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                    with sqlite3.connect(self.db_path) as conn:
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS staged_docs ("
+                            " doc_id TEXT PRIMARY KEY,"
+                            " folder_id TEXT NOT NULL,"
+                            " meeting_number INTEGER NOT NULL,"
+                            " template_id TEXT NOT NULL,"
+                            " template_modified TEXT NOT NULL,"
+                            " created_at REAL NOT NULL)"
+                        )
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS reserved_numbers ("
+                            " folder_id TEXT NOT NULL,"
+                            " meeting_number INTEGER NOT NULL,"
+                            " PRIMARY KEY (folder_id, meeting_number))"
+                        )
+                    self._initialized = True
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def docs(self) -> List[StagedDoc]:
+        """Staged copies for this folder, lowest meeting number first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT doc_id, meeting_number, template_id, template_modified"
+                " FROM staged_docs WHERE folder_id = ? ORDER BY meeting_number",
+                (self.folder_id,),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [StagedDoc(*row) for row in rows]
+
+    def add(self, doc: StagedDoc) -> None:
+        """Record a staged copy; its meeting number is no longer just reserved."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO staged_docs VALUES (?, ?, ?, ?, ?, ?)",
+                (doc.doc_id, self.folder_id, doc.meeting_number, doc.template_id,
+                 doc.template_modified, time.time()),
+            )
+            conn.execute(
+                "DELETE FROM reserved_numbers WHERE folder_id = ? AND meeting_number = ?",
+                (self.folder_id, doc.meeting_number),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def reserve(self, meeting_number: int) -> None:
+        """Hold `meeting_number` for a copy about to be built."""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO reserved_numbers VALUES (?, ?)",
+                (self.folder_id, meeting_number),
+            )
+        finally:
+            conn.close()
+
+    def reserved(self) -> List[int]:
+        """Reserved numbers with no copy built yet, lowest first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT meeting_number FROM reserved_numbers WHERE folder_id = ?"
+                " ORDER BY meeting_number",
+                (self.folder_id,),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def claim(self) -> Optional[StagedDoc]:
+        """Remove and return the staged copy with the lowest meeting number."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT doc_id, meeting_number, template_id, template_modified"
+                " FROM staged_docs WHERE folder_id = ? ORDER BY meeting_number LIMIT 1",
+                (self.folder_id,),
+            ).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM staged_docs WHERE doc_id = ?", (row[0],))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return StagedDoc(*row) if row else None
+
+    def replace(self, old_doc_id: str, new: StagedDoc) -> bool:
+        """
+        Swap `old_doc_id` for `new`, unless it was claimed in the meantime.
+        Returns whether the swap happened.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            removed = conn.execute(
+                "DELETE FROM staged_docs WHERE doc_id = ?", (old_doc_id,)
+            ).rowcount
+            if removed:
+                conn.execute(
+                    "INSERT INTO staged_docs VALUES (?, ?, ?, ?, ?, ?)",
+                    (new.doc_id, self.folder_id, new.meeting_number, new.template_id,
+                     new.template_modified, time.time()),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return bool(removed)
+
+
+class TemplateProvisioner:
+    """
+    Background task that keeps `size` staged copies of the template.
+
+    Each copy is made with `build(template_id, meeting_number)`, which returns
+    the new doc's ID with the number already filled in; numbers come from
+    `allocate()`. `version()` returns the template's (file ID, modifiedTime):
+    copies of an older version are rebuilt with the same meeting number and
+    the old copy is thrown away with `discard(doc_id)`. A copy whose number
+    has been overtaken by Drive since is thrown away when it's claimed (see
+    MeetingNumberAllocator.is_unused). Call `wake()` after a
+    copy has been claimed so the pool refills right away instead of at the
+    next poll. All Google work runs under background_priority().
+    """
+
+    def __init__(
+        self,
+        pool: StagedDocPool,
+        size: int,
+        version: Callable[[], Awaitable[Tuple[str, str]]],
+        build: Callable[[str, int], Awaitable[str]],
+        discard: Callable[[str], Awaitable[None]],
+        allocate: Callable[[], Awaitable[int]],
+        poll_interval: float = 300.0,
+    ):
+        self.pool = pool
+        self.size = size
+        self._version = version
+        self._build = build
+        self._discard = discard
+        self._allocate = allocate
+        self.poll_interval = poll_interval
+        self._wake = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                with background_priority():
+                    await self.refill_once()
+            except Exception as e:
+                print(f"Template pre-provisioning failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def refill_once(self) -> Tuple[int, int]:
+        """Recycle stale copies, then top the pool up. Returns (recycled, built)."""
+        template_id, modified = await self._version()
+        staged = await asyncio.to_thread(self.pool.docs)
+
+        recycled = 0
+        for doc in staged:
+            if (doc.template_id, doc.template_modified) == (template_id, modified):
+                continue
+            fresh = StagedDoc(
+                await self._build(template_id, doc.meeting_number),
+                doc.meeting_number, template_id, modified,
+            )
+            if await asyncio.to_thread(self.pool.replace, doc.doc_id, fresh):
+                await self._discard(doc.doc_id)
+                recycled += 1
+            else:
+                # The stale copy was handed out meanwhile, along with its number
+                await self._discard(fresh.doc_id)
+
+        # Numbers reserved for copies that failed to build (here or before a
+        # restart) are used first; a failed build leaves its reservation
+        spare = await asyncio.to_thread(self.pool.reserved)
+        built = 0
+        for _ in range(self.size - len(staged)):
+            if spare:
+                number = spare.pop(0)
+            else:
+                number = await self._allocate()
+                await asyncio.to_thread(self.pool.reserve, number)
+            doc_id = await self._build(template_id, number)
+            await asyncio.to_thread(
+                self.pool.add, StagedDoc(doc_id, number, template_id, modified)
+            )
+            built += 1
+        return recycled, built
@@ -0,0 +1,58 @@
+"""googleapiclient requests routed through the GoogleRequestScheduler."""
+import time
+from typing import Optional
+
+import google_auth_httplib2
+from googleapiclient.http import HttpRequest
+
+from ..metrics import registry, timed
+from .scheduler import GoogleRequestScheduler
+
+
+class ScheduledHttpRequest(HttpRequest):
+    """
+    googleapiclient request whose execute() goes through a scheduler, timing
+    the auth, request and parse phases of each attempt.
+    """
+
+    def __init__(self, *args, scheduler: GoogleRequestScheduler, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler
+        self._parse = self.postproc
+        self.postproc = self._timed_parse
+        self._sent_at: Optional[float] = None
+
+    def execute(self, http=None, num_retries=0):
+        return self.scheduler.execute(self.methodId, lambda: self._attempt(http))
+
+    def _attempt(self, http):
+        http = http if http is not None else self.http
+        creds = getattr(http, "credentials", None)
+        if creds is not None:
+            # Refresh up front (AuthorizedHttp would do it inline) so it can be timed
+            with timed("google_request_seconds", method=self.methodId, phase="auth"):
+                if not creds.valid:
+                    creds.refresh(google_auth_httplib2.Request(http.http))
+
+        self._sent_at = time.perf_counter()
+        try:
+            return HttpRequest.execute(self, http=http, num_retries=0)
+        finally:
+            if self._sent_at is not None:  # failed before there was anything to parse
+                self._observe_request()
+
+    def _observe_request(self) -> None:
+        registry.observe(
+            "google_request_seconds", time.perf_counter() - self._sent_at,
+            method=self.methodId, phase="request",
+        )
+        self._sent_at = None
+
+    def set_postproc(self, postproc) -> None:
+        """Replace the response parser (model.response by default); it stays timed."""
+        self._parse = postproc
+
+    def _timed_parse(self, resp, content):
+        self._observe_request()
+        with timed("google_request_seconds", method=self.methodId, phase="parse"):
+            return self._parse(resp, content)
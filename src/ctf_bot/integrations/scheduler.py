@@ -0,0 +1,255 @@
+"""Quota-aware scheduling of Google API requests."""
+import asyncio
+import contextlib
+import contextvars
+import email.utils
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple, TypeVar
+
+from googleapiclient.errors import HttpError
+
+from ..config import (
+    DRIVE_READS_PER_MINUTE, DRIVE_WRITES_PER_MINUTE, DOCS_READS_PER_MINUTE,
+    DOCS_WRITES_PER_MINUTE, GOOGLE_MAX_RETRIES,
+)
+from ..metrics import registry
+
+T = TypeVar("T")
+
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# Discovery method names that only read (the last part of the method ID)
+_READ_METHODS = frozenset({"get", "list", "export", "getStartPageToken"})
+# A 5xx may arrive after these went through, so retrying could make a second
+# file or insert the same agenda rows twice. A 429 or a rate-limit 403 is a
+# refusal and is safe to retry.
+NON_IDEMPOTENT_METHODS = frozenset({
+    "drive.files.copy", "drive.files.create", "docs.documents.batchUpdate",
+})
+
+# Interactive (someone is waiting in Discord) unless marked otherwise
+_background = contextvars.ContextVar("google_background_priority", default=False)
+
+
+@contextlib.contextmanager
+def background_priority():
+    """Mark Google calls made in this context as background work."""
+    token = _background.set(True)
+    try:
+        yield
+    finally:
+        _background.reset(token)
+
+
+def is_background() -> bool:
+    """Whether Google calls made in this context are background work."""
+    return _background.get()
+
+
+def bucket_for(method_id: str) -> str:
+    """
+    Map a discovery method ID to its quota bucket, e.g.
+    'docs.documents.batchUpdate' -> 'docs_write', 'drive.files.list' -> 'drive_read'.
+    """
+    api = method_id.split(".", 1)[0]
+    method = method_id.rsplit(".", 1)[-1]
+    return f"{api}_{'read' if method in _READ_METHODS else 'write'}"
+
+
+class TokenBucket:
+    """
+    Thread- and asyncio-safe token bucket refilled at `per_minute` tokens a
+    minute, holding at most `burst` tokens. Background callers only get a
+    token when no interactive caller is waiting for one.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, self.rate * 10)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._interactive_waiting = 0
+        self._lock = threading.Lock()
+
+    def _try_take(self, interactive: bool) -> float:
+        """Take a token and return 0, or return how long to wait before retrying."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1 and (interactive or self._interactive_waiting == 0):
+                self._tokens -= 1
+                return 0.0
+            return max((1 - self._tokens) / self.rate, 0.01)
+
+    @contextlib.contextmanager
+    def _waiting(self, interactive: bool):
+        if interactive:
+            with self._lock:
+                self._interactive_waiting += 1
+        try:
+            yield
+        finally:
+            if interactive:
+                with self._lock:
+                    self._interactive_waiting -= 1
+
+    def acquire(self, interactive: bool = True) -> float:
+        """Block until a token is available. Returns seconds spent waiting."""
+        start = self._clock()
+        wait = self._try_take(interactive)
+        if wait:
+            with self._waiting(interactive):
+                while wait:
+                    time.sleep(wait)
+                    wait = self._try_take(interactive)
+        return self._clock() - start
+
+    async def acquire_async(self, interactive: bool = True) -> float:
+        start = self._clock()
+        wait = self._try_take(interactive)
+        if wait:
+            with self._waiting(interactive):
+                while wait:
+                    await asyncio.sleep(wait)
+                    wait = self._try_take(interactive)
+        return self._clock() - start
+
+
+def is_rate_limited(exc: Exception) -> bool:
+    """True for a 403 that is Drive reporting a per-user rate limit, not a permission problem."""
+    return (
+        isinstance(exc, HttpError)
+        and exc.resp.status == 403
+        and b"ratelimitexceeded" in (exc.content or b"").lower()
+    )
+
+
+def is_retryable(exc: Exception, method_id: str = "") -> bool:
+    """True for quota and transient server errors worth retrying for `method_id`."""
+    if not isinstance(exc, HttpError):
+        return False
+    if exc.resp.status >= 500 and method_id in NON_IDEMPOTENT_METHODS:
+        return False
+    return exc.resp.status in RETRYABLE_STATUSES or is_rate_limited(exc)
+
+
+def retry_after(exc: HttpError) -> Optional[float]:
+    """Seconds requested by a Retry-After header, if any."""
+    value = exc.resp.get("retry-after") if hasattr(exc.resp, "get") else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class GoogleRequestScheduler:
+    """
+    Central gate every Google request goes through.
+
+    Each request takes a token from its quota bucket (see bucket_for), and
+    429/5xx responses are retried with exponential backoff and full jitter,
+    honouring Retry-After when Google sends one. NON_IDEMPOTENT_METHODS are
+    not retried after a 5xx.
+    """
+
+    def __init__(self, buckets: Dict[str, TokenBucket], max_retries: int = GOOGLE_MAX_RETRIES,
+                 base_delay: float = 1.0, max_delay: float = 32.0):
+        self.buckets = buckets
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_config(cls, quotas: Iterable[Tuple[str, float]] = ()) -> "GoogleRequestScheduler":
+        """Buckets at the configured rates, with (bucket, per minute) overrides from `quotas`."""
+        rates = {
+            "drive_read": DRIVE_READS_PER_MINUTE,
+            "drive_write": DRIVE_WRITES_PER_MINUTE,
+            "docs_read": DOCS_READS_PER_MINUTE,
+            "docs_write": DOCS_WRITES_PER_MINUTE,
+        }
+        rates.update(quotas)
+        return cls({bucket: TokenBucket(rate) for bucket, rate in rates.items()})
+
+    def _backoff(self, attempt: int, exc: HttpError) -> float:
+        requested = retry_after(exc)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _should_retry(self, method_id: str, attempt: int, exc: Exception) -> bool:
+        """Decide whether to retry `exc`, counting the retry or the final error."""
+        status = exc.resp.status if isinstance(exc, HttpError) else type(exc).__name__
+        if attempt < self.max_retries and is_retryable(exc, method_id):
+            registry.inc("google_retries_total", method=method_id, status=status)
+            return True
+        registry.inc("google_errors_total", method=method_id, status=status)
+        return False
+
+    def execute(self, method_id: str, call: Callable[[], T]) -> T:
+        """Run the blocking `call()` for `method_id` under quota, with retries."""
+        bucket = self.buckets.get(bucket_for(method_id))
+        interactive = not _background.get()
+        attempt = 0
+        while True:
+            if bucket is not None:
+                waited = bucket.acquire(interactive)
+                registry.observe("google_request_seconds", waited, method=method_id, phase="queue")
+            try:
+                return call()
+            except Exception as e:
+                if not self._should_retry(method_id, attempt, e):
+                    raise
+                time.sleep(self._backoff(attempt, e))
+                attempt += 1
+
+    async def execute_async(self, method_id: str, call: Callable[[], Awaitable[T]]) -> T:
+        """async version of execute; `call` returns a fresh awaitable each time."""
+        bucket = self.buckets.get(bucket_for(method_id))
+        interactive = not _background.get()
+        attempt = 0
+        while True:
+            if bucket is not None:
+                waited = await bucket.acquire_async(interactive)
+                registry.observe("google_request_seconds", waited, method=method_id, phase="queue")
+            try:
+                return await call()
+            except Exception as e:
+                if not self._should_retry(method_id, attempt, e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+                attempt += 1
+
+
+_shared_scheduler: Optional[GoogleRequestScheduler] = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> GoogleRequestScheduler:
+    """Return the process-wide scheduler built from config."""
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        with _shared_scheduler_lock:
+            if _shared_scheduler is None:
+                _shared_scheduler = GoogleRequestScheduler.from_config()
+    return _shared_scheduler
+
+
+def __getattr__(name: str):
+    # ScheduledHttpRequest subclasses googleapiclient's HttpRequest, which pulls
+    # in the whole client stack; only import it when someone asks for it
+    if name == "ScheduledHttpRequest":
+        from .scheduled_http import ScheduledHttpRequest
+        return ScheduledHttpRequest
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
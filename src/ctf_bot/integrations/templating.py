@@ -0,0 +1,142 @@
+"""Placeholders in meeting templates and the replaceAllText requests that fill them."""
+import datetime
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+# `{{name}}` in a template is replaced by the value of field `name`. The
+# original templates use a bare XX for the meeting number, which still works.
+PLACEHOLDER_RE = re.compile(r"\{\{([A-Za-z0-9_]+)\}\}")
+LEGACY_PLACEHOLDERS = {"XX": "meeting_number"}
+MEETING_NUMBER_FIELD = "meeting_number"
+
+_PARAGRAPH_TEXT = "paragraph(elements(textRun(content)))"
+# Just enough of a template to find its placeholders. replaceAllText also
+# reaches headers, footers and footnotes, so they are scanned too; they are
+# maps keyed by ID, which a field mask can only take whole.
+TEMPLATE_TEXT_FIELDS = (
+    f"revisionId,body(content({_PARAGRAPH_TEXT},"
+    f"table(tableRows(tableCells(content({_PARAGRAPH_TEXT})))))),"
+    f"headers,footers,footnotes"
+)
+
+
+def _content_text(content: list) -> Iterator[str]:
+    for element in content or []:
+        for run in element.get("paragraph", {}).get("elements", []):
+            yield run.get("textRun", {}).get("content", "")
+        for row in element.get("table", {}).get("tableRows", []):
+            for cell in row.get("tableCells", []):
+                yield from _content_text(cell.get("content"))
+
+
+def _doc_text(doc: dict) -> Iterator[str]:
+    yield from _content_text(doc.get("body", {}).get("content"))
+    for segments in ("headers", "footers", "footnotes"):
+        for segment in (doc.get(segments) or {}).values():
+            yield from _content_text(segment.get("content"))
+
+
+def find_placeholders(doc: dict) -> FrozenSet[str]:
+    """The placeholder strings (e.g. '{{date}}', 'XX') used anywhere in `doc`."""
+    text = "".join(_doc_text(doc))
+    found = {match.group(0) for match in PLACEHOLDER_RE.finditer(text)}
+    found.update(legacy for legacy in LEGACY_PLACEHOLDERS if legacy in text)
+    return frozenset(found)
+
+
+def field_name(placeholder: str) -> str:
+    """'{{date}}' -> 'date'; legacy placeholders map to their field."""
+    if placeholder in LEGACY_PLACEHOLDERS:
+        return LEGACY_PLACEHOLDERS[placeholder]
+    return placeholder[2:-2]
+
+
+def split_meeting_number(placeholders: Iterable[str]) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """Split placeholders into (meeting number ones, everything else)."""
+    number = frozenset(p for p in placeholders if field_name(p) == MEETING_NUMBER_FIELD)
+    return number, frozenset(placeholders) - number
+
+
+def template_fields(
+    new_name: str, meeting_number: int, extra: Optional[Mapping[str, str]] = None
+) -> Dict[str, str]:
+    """Field values for a new meeting doc: title, meeting_number and date, plus `extra`."""
+    fields = {
+        "title": new_name,
+        MEETING_NUMBER_FIELD: f"{meeting_number:02d}",
+        "date": datetime.date.today().isoformat(),
+    }
+    fields.update(extra or {})
+    return fields
+
+
+def fill_requests(
+    placeholders: Optional[Iterable[str]], fields: Mapping[str, str]
+) -> List[dict]:
+    """
+    replaceAllText requests for every placeholder that has a value in
+    `fields`. With `placeholders=None` (not detected) every field and legacy
+    placeholder is sent; those missing from the doc are no-ops.
+    """
+    if placeholders is None:
+        placeholders = [f"{{{{{name}}}}}" for name in fields] + list(LEGACY_PLACEHOLDERS)
+    return [
+        {
+            "replaceAllText": {
+                "containsText": {"text": placeholder, "matchCase": True},
+                "replaceText": str(fields[field_name(placeholder)]),
+            }
+        }
+        for placeholder in sorted(set(placeholders))
+        if field_name(placeholder) in fields
+    ]
+
+
+class TemplateFieldCache:
+    """
+    Placeholders found in each template, keyed by the template's revisionId.
+
+    Works like DocSnapshotCache: once a template has been scanned, `get` only
+    asks Docs for its revision and rescans when it has moved.
+    """
+
+    def __init__(self, max_size: int = 8):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[str, FrozenSet[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def peek(self, template_id: str) -> Optional[Tuple[str, FrozenSet[str]]]:
+        """(revisionId, placeholders) last seen for the template, without checking it."""
+        with self._lock:
+            entry = self._entries.get(template_id)
+            if entry is not None:
+                self._entries.move_to_end(template_id)
+            return entry
+
+    def get(self, docs_service, template_id: str) -> FrozenSet[str]:
+        """Placeholders in the template's current revision."""
+        cached = self.peek(template_id)
+        if cached is not None:
+            meta = docs_service.documents().get(
+                documentId=template_id, fields="revisionId"
+            ).execute()
+            if meta.get("revisionId") == cached[0]:
+                return cached[1]
+
+        doc = docs_service.documents().get(
+            documentId=template_id, fields=TEMPLATE_TEXT_FIELDS
+        ).execute()
+        return self.store(template_id, doc)
+
+    def store(self, template_id: str, doc: dict) -> FrozenSet[str]:
+        """Scan a fetched template (TEMPLATE_TEXT_FIELDS) and cache its placeholders."""
+        placeholders = find_placeholders(doc)
+        if doc.get("revisionId"):
+            with self._lock:
+                self._entries[template_id] = (doc["revisionId"], placeholders)
+                self._entries.move_to_end(template_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return placeholders
@@ -0,0 +1,211 @@
+"""
+Access tokens for service accounts: refreshed in the background before they
+expire, and shared through an on-disk cache so a restarted bot or a Google
+worker process reuses a token that is still valid instead of minting one.
+"""
+import asyncio
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from ..config import SCOPES, GOOGLE_TOKEN_CACHE, GOOGLE_TOKEN_REFRESH_MARGIN
+
+
+def token_key(service_account_email: str, scopes: Iterable[str]) -> str:
+    """Cache key for a service account's tokens with `scopes`."""
+    return f"{service_account_email} {' '.join(sorted(scopes))}"
+
+
+# Serialises TokenCache saves across instances sharing a file in this process
+_save_lock = threading.Lock()
+
+
+class TokenCache:
+    """
+    JSON file of access tokens and their expiry (epoch seconds), keyed by
+    token_key. Only the owner can read it (0600, in a 0700 directory if the
+    cache creates it); writes replace the file atomically so readers never
+    see half of one. Saving is best effort: the token works without it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def load(self, key: str) -> Optional[Tuple[str, float]]:
+        """(token, expiry) saved under `key`, or None."""
+        entry = self._read().get(key)
+        if not isinstance(entry, dict) or not entry.get("access_token"):
+            return None
+        return entry["access_token"], float(entry.get("expiry", 0))
+
+    def save(self, key: str, token: str, expiry: float) -> None:
+        """Save `token` under `key`. Failures are logged, not raised."""
+        try:
+            self._save(key, token, expiry)
+        except OSError as e:
+            print(f"Couldn't save Google tokens to {self.path}: {e}")
+
+    def _save(self, key: str, token: str, expiry: float) -> None:
+        with _save_lock:
+            data = self._read()
+            now = time.time()
+            data = {k: v for k, v in data.items() if float(v.get("expiry", 0)) > now}
+            data[key] = {"access_token": token, "expiry": expiry}
+            try:
+                self.path.parent.mkdir(mode=0o700, parents=True)
+            except FileExistsError:
+                pass  # someone else's directory, maybe shared: leave its mode alone
+            else:
+                os.chmod(self.path.parent, 0o700)  # mkdir's mode is subject to the umask
+            # mkstemp makes a unique 0600 file, so other processes' saves never collide
+            fd, tmp = tempfile.mkstemp(
+                dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+
+def default_token_cache() -> Optional[TokenCache]:
+    """The cache at GOOGLE_TOKEN_CACHE, or None if it is turned off."""
+    return TokenCache(GOOGLE_TOKEN_CACHE) if GOOGLE_TOKEN_CACHE else None
+
+
+def _epoch(expiry: Optional[datetime.datetime]) -> float:
+    # google-auth keeps expiry as a naive UTC datetime
+    return expiry.replace(tzinfo=datetime.timezone.utc).timestamp() if expiry else 0.0
+
+
+class ServiceAccountTokens:
+    """
+    One google-auth credentials object for a service account, shared by every
+    thread using it. `ensure_fresh()` refreshes the token when it expires
+    within `margin` seconds and saves it to `cache`; a token already in the
+    cache is picked up instead of minting a new one.
+    """
+
+    def __init__(
+        self,
+        creds,
+        cache: Optional[TokenCache] = None,
+        margin: float = GOOGLE_TOKEN_REFRESH_MARGIN,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.creds = creds
+        self.cache = cache
+        self.margin = margin
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.key = token_key(creds.service_account_email, creds.scopes or SCOPES)
+        self._load_cached()
+
+    @property
+    def expiry(self) -> float:
+        return _epoch(self.creds.expiry) if self.creds.token else 0.0
+
+    def _expiring(self) -> bool:
+        return self.expiry - self._clock() < self.margin
+
+    def _load_cached(self) -> bool:
+        cached = self.cache.load(self.key) if self.cache is not None else None
+        if cached is None or cached[1] - self._clock() < self.margin:
+            return False
+        self.creds.token = cached[0]
+        self.creds.expiry = datetime.datetime.fromtimestamp(
+            cached[1], datetime.timezone.utc
+        ).replace(tzinfo=None)
+        return True
+
+    def ensure_fresh(self) -> float:
+        """Refresh the token if it is close to expiring. Returns its expiry. Blocking."""
+        if not self._expiring():
+            return self.expiry
+        with self._lock:
+            if self._expiring() and not self._load_cached():
+                import google_auth_httplib2
+                import httplib2
+
+                self.creds.refresh(google_auth_httplib2.Request(httplib2.Http()))
+                if self.cache is not None:
+                    self.cache.save(self.key, self.creds.token, self.expiry)
+        return self.expiry
+
+
+_shared_tokens: Dict[str, ServiceAccountTokens] = {}
+_shared_tokens_lock = threading.Lock()
+
+
+def service_account_tokens(service_account_file: str) -> ServiceAccountTokens:
+    """The process-wide ServiceAccountTokens for a service account key file."""
+    with _shared_tokens_lock:
+        tokens = _shared_tokens.get(service_account_file)
+        if tokens is None:
+            from .google_docs import make_creds
+
+            tokens = _shared_tokens[service_account_file] = ServiceAccountTokens(
+                make_creds(service_account_file), default_token_cache()
+            )
+        return tokens
+
+
+class TokenRefresher:
+    """
+    Background task keeping a token fresh so no command waits for one.
+
+    `refresh()` refreshes the token if it is about to expire and returns its
+    expiry (epoch seconds), or None if there is nothing to refresh; the task
+    then sleeps until `margin` seconds before that expiry. Failures are
+    retried every `retry_interval` seconds, while the old token still works.
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[], Awaitable[Optional[float]]],
+        margin: float = GOOGLE_TOKEN_REFRESH_MARGIN,
+        retry_interval: float = 30.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._refresh = refresh
+        self.margin = margin
+        self.retry_interval = retry_interval
+        self._clock = clock
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+
+    async def run(self) -> None:
+        while True:
+            delay = await self.refresh_once()
+            if delay is None:
+                return
+            await asyncio.sleep(delay)
+
+    async def refresh_once(self) -> Optional[float]:
+        """Refresh if needed. Returns seconds until the next check, or None to stop."""
+        try:
+            expiry = await self._refresh()
+        except Exception as e:
+            print(f"Google token refresh failed: {e}")
+            return self.retry_interval
+        if expiry is None:
+            return None
+        return max(self.retry_interval, expiry - self.margin - self._clock())
@@ -0,0 +1,296 @@
+"""Durable write-ahead journal for agenda items."""
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .metrics import registry, timed
+
+
+class JournalEntry(NamedTuple):
+    id: int
+    text: str
+    attempts: int
+    channel_id: Optional[int]
+    message_id: Optional[int]
+
+
+# on_settled(channel_id, message_id, failed): every item recorded from one
+# message is done or given up on; `failed` holds (text, error) for the latter
+SettledCallback = Callable[[Optional[int], Optional[int], List[Tuple[str, str]]], Awaitable[None]]
+
+
+class AgendaJournal:
+    """
+    Append-only SQLite (WAL mode) log of accepted agenda items.
+
+    Items are recorded as 'pending' before any Google call is made, and only
+    marked 'done' once written to the doc, so an outage or restart never loses
+    them. Items that keep failing are parked as 'failed' after `max_attempts`.
+    """
+
+    def __init__(self, db_path: Path, max_attempts: int = 8):
+        self.db_path = Path(db_path)
+        self.max_attempts = max_attempts
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                    with sqlite3.connect(self.db_path) as conn:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS agenda_items ("
+                            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                            " text TEXT NOT NULL,"
+                            " status TEXT NOT NULL DEFAULT 'pending',"
+                            " attempts INTEGER NOT NULL DEFAULT 0,"
+                            " last_error TEXT,"
+                            " channel_id INTEGER,"
+                            " message_id INTEGER,"
+                            " created_at REAL NOT NULL,"
+                            " next_attempt_at REAL NOT NULL)"
+                        )
+                        conn.execute(
+                            "CREATE INDEX IF NOT EXISTS agenda_items_pending"
+                            " ON agenda_items (status, next_attempt_at)"
+                        )
+                        conn.execute(
+                            "CREATE INDEX IF NOT EXISTS agenda_items_message"
+                            " ON agenda_items (message_id)"
+                        )
+                    self._initialized = True
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        # WAL + FULL: a committed append survives power loss
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def append(self, text: str, channel_id: int = None, message_id: int = None) -> int:
+        """Durably record an item. Returns its journal ID."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                cur = conn.execute(
+                    "INSERT INTO agenda_items (text, channel_id, message_id, created_at, next_attempt_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (text, channel_id, message_id, now, now),
+                )
+            return cur.lastrowid
+        finally:
+            conn.close()
+
+    def append_many(
+        self, texts: Iterable[str], channel_id: int = None, message_id: int = None
+    ) -> List[int]:
+        """Durably record several items in one transaction. Returns their journal IDs."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            ids = []
+            with conn:
+                for text in texts:
+                    cur = conn.execute(
+                        "INSERT INTO agenda_items (text, channel_id, message_id, created_at, next_attempt_at)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (text, channel_id, message_id, now, now),
+                    )
+                    ids.append(cur.lastrowid)
+            return ids
+        finally:
+            conn.close()
+
+    def pending_count(self) -> int:
+        conn = self._connect()
+        try:
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM agenda_items WHERE status = 'pending'"
+            ).fetchone()
+            return count
+        finally:
+            conn.close()
+
+    def due(self, limit: int) -> List[JournalEntry]:
+        """Oldest pending items whose retry time has come, in insertion order."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, text, attempts, channel_id, message_id FROM agenda_items"
+                " WHERE status = 'pending' AND next_attempt_at <= ?"
+                " ORDER BY id LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+            return [JournalEntry(*row) for row in rows]
+        finally:
+            conn.close()
+
+    def mark_done(self, ids: List[int]) -> None:
+        if not ids:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "UPDATE agenda_items SET status = 'done', last_error = NULL WHERE id = ?",
+                    [(i,) for i in ids],
+                )
+        finally:
+            conn.close()
+
+    def mark_attempt_failed(self, entry: JournalEntry, error: str, retry_in: float) -> bool:
+        """
+        Record a failed write. Returns True if the item was given up on
+        ('failed'), False if it will be retried after `retry_in` seconds.
+        """
+        attempts = entry.attempts + 1
+        give_up = attempts >= self.max_attempts
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE agenda_items SET status = ?, attempts = ?, last_error = ?,"
+                    " next_attempt_at = ? WHERE id = ?",
+                    ("failed" if give_up else "pending", attempts, error,
+                     time.time() + retry_in, entry.id),
+                )
+        finally:
+            conn.close()
+        return give_up
+
+    def message_outcome(self, message_id: int) -> Optional[List[Tuple[str, str]]]:
+        """
+        None while any item recorded from `message_id` is pending; afterwards
+        (text, error) for each of them that was given up on.
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT status, text, last_error FROM agenda_items"
+                " WHERE message_id = ? ORDER BY id",
+                (message_id,),
+            ).fetchall()
+        finally:
+            conn.close()
+        if any(status == "pending" for status, _, _ in rows):
+            return None
+        return [(text, error or "") for status, text, error in rows if status == "failed"]
+
+    def seconds_until_due(self) -> Optional[float]:
+        """How long until the next pending item is due, or None if nothing is pending."""
+        conn = self._connect()
+        try:
+            (next_at,) = conn.execute(
+                "SELECT MIN(next_attempt_at) FROM agenda_items WHERE status = 'pending'"
+            ).fetchone()
+        finally:
+            conn.close()
+        return None if next_at is None else max(0.0, next_at - time.time())
+
+
+class JournalReplayer:
+    """
+    Background task that drains the journal into the agenda doc.
+
+    Due items are written in batches of up to `batch_size` with one
+    `write(texts)` call, which returns one error (or None) per item. Failed
+    items are retried with exponential backoff. Call `wake()` after appending
+    so new items go out right away instead of at the next poll.
+
+    `on_settled` is called once per Discord message, when the last of its
+    items is written or given up on, so a pasted list gets one reaction or
+    one failure report rather than one per item.
+    """
+
+    def __init__(
+        self,
+        journal: AgendaJournal,
+        write: Callable[[List[str]], Awaitable[List[Optional[BaseException]]]],
+        batch_size: int = 50,
+        poll_interval: float = 30.0,
+        on_settled: Optional[SettledCallback] = None,
+    ):
+        self.journal = journal
+        self._write = write
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._on_settled = on_settled
+        self._wake = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                drained = await self.replay_once()
+            except Exception as e:
+                print(f"Agenda journal replay failed: {e}")
+                drained = 0
+            if drained:
+                continue
+
+            wait = await asyncio.to_thread(self.journal.seconds_until_due)
+            timeout = self.poll_interval if wait is None else min(wait, self.poll_interval)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def replay_once(self) -> int:
+        """Write one batch of due items. Returns how many were attempted."""
+        entries = await asyncio.to_thread(self.journal.due, self.batch_size)
+        if not entries:
+            return 0
+
+        try:
+            with timed("agenda_replay_seconds"):
+                errors = await self._write([entry.text for entry in entries])
+        except Exception as e:
+            errors = [e] * len(entries)
+
+        done = [entry for entry, error in zip(entries, errors) if error is None]
+        await asyncio.to_thread(self.journal.mark_done, [entry.id for entry in done])
+        registry.inc("agenda_items_total", len(done), outcome="written")
+
+        finished = list(done)
+        for entry, error in zip(entries, errors):
+            if error is None:
+                continue
+            retry_in = min(600.0, 5.0 * 2 ** entry.attempts)
+            gave_up = await asyncio.to_thread(
+                self.journal.mark_attempt_failed, entry, str(error), retry_in
+            )
+            registry.inc("agenda_items_total", outcome="failed" if gave_up else "retry")
+            if gave_up:
+                finished.append(entry)
+        if self._on_settled is not None:
+            await self._report_settled(finished, dict(zip((e.id for e in entries), errors)))
+        return len(entries)
+
+    async def _report_settled(
+        self, finished: List[JournalEntry], errors: Dict[int, Optional[BaseException]]
+    ) -> None:
+        """Call on_settled for each message whose last item just finished."""
+        messages: Dict[Tuple[Optional[int], int], None] = {}  # ordered set
+        for entry in finished:
+            if entry.message_id is None:
+                error = errors[entry.id]
+                failed = [] if error is None else [(entry.text, str(error))]
+                await self._on_settled(entry.channel_id, None, failed)
+            else:
+                messages[entry.channel_id, entry.message_id] = None
+        for channel_id, message_id in messages:
+            failed = await asyncio.to_thread(self.journal.message_outcome, message_id)
+            if failed is not None:
+                await self._on_settled(channel_id, message_id, failed)
@@ -0,0 +1,230 @@
+"""In-process latency histograms and counters, exported in Prometheus text format."""
+import bisect
+import contextlib
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers a cache hit up to a Google call stuck in backoff
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "command_seconds": "Time from a Discord command being invoked to its reply.",
+    "dispatch_wait_seconds": "Time a command spent queued behind others for the same document.",
+    "agenda_replay_seconds": "Time to write one batch of journaled agenda items.",
+    "agenda_items_total": "Journaled agenda items by replay outcome.",
+    "google_request_seconds": (
+        "Google API call time by phase: queue (rate limiter), auth (token refresh), "
+        "request (HTTP round trip) and parse (JSON decoding)."
+    ),
+    "google_retries_total": "Google API calls retried after a 429/5xx.",
+    "google_errors_total": "Google API calls that failed after any retries.",
+    "google_worker_restarts_total": "Google worker processes restarted after exiting.",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, safe to observe from any thread."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate the q-quantile by linear interpolation inside its bucket, the
+        way Prometheus' histogram_quantile does.
+        """
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Named, labelled histograms and counters; metric names get `prefix`."""
+
+    def __init__(self, prefix: str = "ctf_bot"):
+        self.prefix = prefix
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Dict[str, object]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+        return histogram
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        self.histogram(name, **labels).observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(self._key(labels), 0.0)
+
+    def histograms(self, name: str) -> Dict[LabelKey, Histogram]:
+        with self._lock:
+            return dict(self._histograms.get(name, {}))
+
+    def counters(self, name: str) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._counters.get(name, {}))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+
+        for name in sorted(counters):
+            full = f"{self.prefix}_{name}"
+            lines += _header(full, name, "counter")
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{full}{_labels(key)} {_number(value)}")
+
+        for name in sorted(histograms):
+            full = f"{self.prefix}_{name}"
+            lines += _header(full, name, "histogram")
+            for key, histogram in sorted(histograms[name].items()):
+                with histogram._lock:
+                    counts, total, sum_ = list(histogram.counts), histogram.count, histogram.sum
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, counts):
+                    cumulative += count
+                    lines.append(f"{full}_bucket{_labels(key, le=_number(bound))} {cumulative}")
+                lines.append(f"{full}_bucket{_labels(key, le='+Inf')} {total}")
+                lines.append(f"{full}_sum{_labels(key)} {_number(sum_)}")
+                lines.append(f"{full}_count{_labels(key)} {total}")
+        return "\n".join(lines) + "\n"
+
+
+def _header(full_name: str, name: str, kind: str) -> List[str]:
+    lines = [f"# HELP {full_name} {HELP[name]}"] if name in HELP else []
+    return lines + [f"# TYPE {full_name} {kind}"]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: LabelKey, **extra: str) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+registry = MetricsRegistry()
+
+
+@contextlib.contextmanager
+def timed(name: str, **labels) -> Iterator[None]:
+    """Observe the wall time of the `with` body into histogram `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, time.perf_counter() - start, **labels)
+
+
+def format_stats(reg: Optional[MetricsRegistry] = None) -> str:
+    """Short human-readable summary for the !bot-stats command."""
+    reg = reg if reg is not None else registry
+    lines = ["Commands (count, p50, p95):"]
+    commands = sorted(reg.histograms("command_seconds").items())
+    for key, histogram in commands:
+        labels = dict(key)
+        lines.append(
+            f"  {labels.get('command', '?'):<16} {labels.get('outcome', ''):<8} "
+            f"{histogram.count:>6}  {_ms(histogram.quantile(0.5))}  {_ms(histogram.quantile(0.95))}"
+        )
+    if not commands:
+        lines.append("  (none yet)")
+
+    lines.append("Google calls by phase (count, p50, p95):")
+    calls = sorted(reg.histograms("google_request_seconds").items())
+    for key, histogram in calls:
+        labels = dict(key)
+        lines.append(
+            f"  {labels.get('method', '?'):<28} {labels.get('phase', ''):<8} "
+            f"{histogram.count:>6}  {_ms(histogram.quantile(0.5))}  {_ms(histogram.quantile(0.95))}"
+        )
+    if not calls:
+        lines.append("  (none yet)")
+
+    retries = sum(reg.counters("google_retries_total").values())
+    errors = sum(reg.counters("google_errors_total").values())
+    lines.append(f"Google retries: {int(retries)}  errors: {int(errors)}")
+    return "\n".join(lines)
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:>8.1f}ms"
+
+
+async def start_metrics_server(host: str, port: int, reg: Optional[MetricsRegistry] = None):
+    """
+    Serve `GET /metrics` on host:port. Returns the aiohttp AppRunner; call
+    its cleanup() to stop.
+    """
+    from aiohttp import web
+
+    reg = reg if reg is not None else registry
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            body=reg.render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,190 @@
+"""Everything one tenant's commands run on, kept apart from other tenants'."""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from .config import (
+    GOOGLE_TRANSPORT, AGENDA_REPLAY_BATCH_SIZE, AGENDA_JOURNAL_MAX_ATTEMPTS,
+    TEMPLATE_POOL_CHECK_INTERVAL, AGENDA_CHANGES_POLL_INTERVAL, FOLDER_INDEX_REFRESH_INTERVAL,
+)
+from .dispatcher import DocumentDispatcher
+from .journal import AgendaJournal, JournalReplayer, SettledCallback
+from .integrations.changes import DriveChangeWatcher
+from .integrations.folder_index import FolderIndex
+from .integrations.google_async import get_async_docs_manager
+from .integrations.google_docs import get_docs_manager
+from .integrations.google_worker import GoogleWorkerProcess
+from .integrations.provisioner import StagedDocPool, TemplateProvisioner
+from .integrations.scheduler import background_priority
+from .integrations.tokens import TokenRefresher
+from .tenants import Tenant
+
+
+class TenantRuntime:
+    """
+    One tenant's share of the bot: its per-document command queues, agenda
+    journal and replayer, template pool, change watcher, token refresher,
+    folder index for autocomplete, and the worker threads ("thread"
+    transport) or process ("process") its Google calls run on. Its docs
+    manager has its own credentials, connections and quota budget, so a busy
+    tenant only ever waits on itself.
+    """
+
+    def __init__(
+        self,
+        tenant: Tenant,
+        on_settled: Optional[SettledCallback] = None,
+    ):
+        self.tenant = tenant
+        self.dispatcher = DocumentDispatcher(tenant.max_backlog, tenant.max_parallel)
+        self.journal = AgendaJournal(tenant.agenda_journal_db, AGENDA_JOURNAL_MAX_ATTEMPTS)
+        self.replayer = JournalReplayer(
+            self.journal,
+            self.add_agenda_items,
+            batch_size=AGENDA_REPLAY_BATCH_SIZE,
+            on_settled=on_settled,
+        )
+        self.provisioner = self._make_provisioner() if tenant.template_pool_size > 0 else None
+        self.change_watcher = (
+            self._make_change_watcher() if AGENDA_CHANGES_POLL_INTERVAL > 0 else None
+        )
+        self.token_refresher = TokenRefresher(lambda: self.call("refresh_credentials"))
+        self.folder_index = FolderIndex(
+            lambda: self.call("list_folder_docs"), FOLDER_INDEX_REFRESH_INTERVAL
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._worker: Optional[GoogleWorkerProcess] = None
+        self.started = False
+
+    # ----------------------------
+    # Google calls on the configured transport
+    # ----------------------------
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.tenant.worker_threads,
+                thread_name_prefix=f"google-{self.tenant.name}",
+            )
+        return self._executor
+
+    @property
+    def worker(self) -> GoogleWorkerProcess:
+        if self._worker is None:
+            self._worker = GoogleWorkerProcess(self.tenant, self.tenant.worker_threads)
+        return self._worker
+
+    async def call(self, method: str, *args):
+        """Call `method` on this tenant's docs manager."""
+        if GOOGLE_TRANSPORT == "asyncio":
+            return await getattr(get_async_docs_manager(self.tenant), method)(*args)
+        if GOOGLE_TRANSPORT == "process":
+            return await self.worker.call(method, *args)
+        # Blocking Google work goes on this tenant's threads; clients are shared
+        context = contextvars.copy_context()  # keeps background_priority()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            context.run,
+            lambda: getattr(get_docs_manager(self.tenant), method)(*args),
+        )
+
+    async def add_agenda_items(self, items: List[str]) -> List[Optional[BaseException]]:
+        """Replayer writer: each batch waits its turn in the draft's dispatcher queue."""
+        doc_id = await self.call("target_doc_id")
+        _, result = self.dispatcher.submit(doc_id, self._write_agenda_items, items)
+        return await result
+
+    async def _write_agenda_items(self, items: List[str]) -> List[Optional[BaseException]]:
+        return await self.call("add_agenda_items", items)
+
+    async def create_doc_key(self, template: Optional[str] = None) -> str:
+        """
+        Dispatcher key for a create-doc job: the template's file ID. Copies of
+        one template share it and the meeting number counter, whatever the
+        new doc is called.
+        """
+        return await self.call("template_id", template)
+
+    async def create_from_template(
+        self, name: str, fields: Optional[Dict[str, str]] = None, template: Optional[str] = None
+    ) -> str:
+        return await self.call("create_from_template", name, template, fields)
+
+    async def create_doc(self, job: Tuple[str, Dict[str, str], Optional[str]]) -> str:
+        """Dispatcher runner for create-doc jobs: (name, fields, template)."""
+        doc_id = await self.create_from_template(*job)
+        self.folder_index.wake()
+        return doc_id
+
+    async def reconcile_meeting_numbers(self) -> int:
+        return await self.call("reconcile_meeting_numbers")
+
+    def _make_provisioner(self) -> TemplateProvisioner:
+        """Keeps the tenant's template_pool_size staged template copies for !create-doc."""
+        return TemplateProvisioner(
+            StagedDocPool(self.tenant.staged_docs_db, self.tenant.folder_id),
+            self.tenant.template_pool_size,
+            version=lambda: self.call("find_template_version"),
+            build=lambda template_id, number: self.call(
+                "stage_template_copy", template_id, number
+            ),
+            discard=lambda doc_id: self.call("trash_document", doc_id),
+            allocate=lambda: self.call("allocate_meeting_number"),
+            poll_interval=TEMPLATE_POOL_CHECK_INTERVAL,
+        )
+
+    def _make_change_watcher(self) -> DriveChangeWatcher:
+        """Keeps the docs manager's snapshots current for !agenda."""
+        return DriveChangeWatcher(
+            start_token=lambda: self.call("changes_start_token"),
+            list_changes=lambda token: self.call("changed_file_ids", token),
+            on_changed=self._folder_changed,
+            poll_interval=AGENDA_CHANGES_POLL_INTERVAL,
+        )
+
+    async def _folder_changed(self, file_ids: Set[str]) -> None:
+        await self.call("refresh_snapshots", file_ids)
+        self.folder_index.wake()
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    async def start(self) -> None:
+        """Start refreshing tokens and sync the meeting numbers, then start the other tasks."""
+        if self.started:
+            return
+        self.started = True
+        self.token_refresher.start()
+        self.replayer.start()
+        self.folder_index.start()
+        try:
+            with background_priority():
+                await self.reconcile_meeting_numbers()
+        except Exception as e:
+            print(f"Meeting number sync for tenant '{self.tenant.name}' failed: {e}")
+        if self.provisioner is not None:
+            self.provisioner.start()
+        if self.change_watcher is not None:
+            self.change_watcher.start()
+
+    async def stop(self) -> None:
+        """Cancel the background tasks and let the worker threads finish what they're doing."""
+        tasks = [
+            task for task in (
+                self.token_refresher.task,
+                self.replayer.task,
+                self.folder_index.task,
+                self.provisioner.task if self.provisioner is not None else None,
+                self.change_watcher.task if self.change_watcher is not None else None,
+            )
+            if task is not None
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self._worker is not None:
+            await asyncio.to_thread(self._worker.close)
+        self.started = False
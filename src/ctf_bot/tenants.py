@@ -0,0 +1,177 @@
+"""Per-guild tenants: which Drive folder, docs and credentials each Discord server uses."""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from .config import (
+    FOLDER_ID, TARGET_DOC_NAME, TEMPLATE_DOC_NAME, SERVICE_ACCOUNT_FILE, TEMPLATE_STAGING_FOLDER_ID,
+    TEMPLATE_POOL_SIZE, STATE_DIR, DISPATCH_MAX_BACKLOG, DISPATCH_MAX_PARALLEL, GOOGLE_WORKER_THREADS,
+    project_root,
+)
+
+DEFAULT_TENANT_NAME = "default"
+QUOTA_BUCKETS = ("drive_read", "drive_write", "docs_read", "docs_write")
+
+
+class Tenant(NamedTuple):
+    """
+    One team's setup. `guild_ids` are the Discord servers it serves; the
+    tenant with none serves every server no other tenant claims. `quotas`
+    overrides the per-minute request budget of some quota buckets (see
+    scheduler.bucket_for) for this tenant alone.
+    """
+
+    name: str
+    folder_id: str
+    target_doc_name: str = TARGET_DOC_NAME
+    template_doc_name: str = TEMPLATE_DOC_NAME
+    service_account_file: str = SERVICE_ACCOUNT_FILE
+    staging_folder_id: Optional[str] = None
+    state_dir: Path = STATE_DIR
+    guild_ids: FrozenSet[int] = frozenset()
+    max_parallel: int = DISPATCH_MAX_PARALLEL
+    max_backlog: int = DISPATCH_MAX_BACKLOG
+    worker_threads: int = GOOGLE_WORKER_THREADS
+    template_pool_size: int = TEMPLATE_POOL_SIZE
+    quotas: Tuple[Tuple[str, float], ...] = ()
+
+    @property
+    def template_staging_folder_id(self) -> str:
+        return self.staging_folder_id or self.folder_id
+
+    @property
+    def meeting_numbers_db(self) -> Path:
+        return self.state_dir / "meeting_numbers.sqlite3"
+
+    @property
+    def staged_docs_db(self) -> Path:
+        return self.state_dir / "staged_docs.sqlite3"
+
+    @property
+    def agenda_journal_db(self) -> Path:
+        return self.state_dir / "agenda_journal.sqlite3"
+
+
+def default_tenant() -> Tenant:
+    """The tenant described by the environment (GOOGLE_FOLDER_ID etc.)."""
+    return Tenant(
+        DEFAULT_TENANT_NAME, FOLDER_ID, staging_folder_id=TEMPLATE_STAGING_FOLDER_ID,
+    )
+
+
+def _path(value: str) -> str:
+    return value if os.path.isabs(value) else str(project_root / value)
+
+
+def parse_tenant(entry: dict) -> Tenant:
+    """Build a Tenant from one entry of the tenants file. Raises RuntimeError if invalid."""
+    name = entry.get("name")
+    if not name or not isinstance(name, str) or "/" in name or name.startswith("."):
+        raise RuntimeError(f"Tenant name must be a plain non-empty string, got {name!r}.")
+    if not entry.get("folder_id"):
+        raise RuntimeError(f"Tenant '{name}' has no folder_id.")
+    unknown = set(entry.get("quotas", {})) - set(QUOTA_BUCKETS)
+    if unknown:
+        raise RuntimeError(f"Tenant '{name}' has unknown quota buckets: {', '.join(sorted(unknown))}.")
+    try:
+        return Tenant(
+            name=name,
+            folder_id=entry["folder_id"],
+            target_doc_name=entry.get("doc_name", TARGET_DOC_NAME),
+            template_doc_name=entry.get("template_name", TEMPLATE_DOC_NAME),
+            service_account_file=_path(entry["service_account_json"])
+            if entry.get("service_account_json") else SERVICE_ACCOUNT_FILE,
+            staging_folder_id=entry.get("staging_folder_id"),
+            state_dir=Path(_path(entry["state_dir"])) if entry.get("state_dir")
+            else STATE_DIR / "tenants" / name,
+            guild_ids=frozenset(int(g) for g in entry.get("guilds", [])),
+            max_parallel=int(entry.get("max_parallel", DISPATCH_MAX_PARALLEL)),
+            max_backlog=int(entry.get("max_backlog", DISPATCH_MAX_BACKLOG)),
+            worker_threads=int(entry.get("worker_threads", GOOGLE_WORKER_THREADS)),
+            template_pool_size=int(entry.get("template_pool_size", TEMPLATE_POOL_SIZE)),
+            quotas=tuple(sorted(
+                (bucket, float(limit)) for bucket, limit in entry.get("quotas", {}).items()
+            )),
+        )
+    except (TypeError, ValueError) as e:
+        raise RuntimeError(f"Tenant '{name}' is invalid: {e}") from e
+
+
+def load_tenants(path: Path, default: Optional[Tenant] = None) -> List[Tenant]:
+    """
+    Read a tenants file:
+
+        {"tenants": [{"name": "team-a", "guilds": [123], "folder_id": "...", ...}],
+         "default_tenant": true}
+
+    With "default_tenant" (the default) `default` serves every guild not
+    listed. Raises RuntimeError if the file is invalid.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RuntimeError(f"Couldn't read tenants file {path}: {e}") from e
+    if not isinstance(data, dict) or not isinstance(data.get("tenants", []), list):
+        raise RuntimeError(f"Tenants file {path} must hold an object with a 'tenants' list.")
+
+    tenants = [parse_tenant(entry) for entry in data.get("tenants", [])]
+    if default is not None and data.get("default_tenant", True):
+        tenants.append(default)
+
+    names = set()
+    claimed: Dict[int, str] = {}
+    catch_all = [t.name for t in tenants if not t.guild_ids]
+    if len(catch_all) > 1:
+        raise RuntimeError(f"Only one tenant may leave out guilds: {', '.join(catch_all)}.")
+    for tenant in tenants:
+        if tenant.name in names:
+            raise RuntimeError(f"Tenant '{tenant.name}' is defined twice.")
+        names.add(tenant.name)
+        for guild_id in tenant.guild_ids:
+            if guild_id in claimed:
+                raise RuntimeError(
+                    f"Guild {guild_id} belongs to both '{claimed[guild_id]}' and '{tenant.name}'."
+                )
+            claimed[guild_id] = tenant.name
+    return tenants
+
+
+class TenantRegistry:
+    """
+    Maps guilds to tenants. Without a `path` the `default` tenant serves
+    every guild. `reload()` re-reads the file and swaps the whole mapping at
+    once, keeping the old one if the file is invalid.
+    """
+
+    def __init__(self, path: Optional[Path] = None, default: Optional[Tenant] = None):
+        self.path = Path(path) if path else None
+        self.default = default
+        self._lock = threading.Lock()
+        self._tenants: List[Tenant] = []
+        self._by_guild: Dict[int, Tenant] = {}
+        self._catch_all: Optional[Tenant] = None
+        self.reload()
+
+    def reload(self) -> List[Tenant]:
+        """Re-read the tenants file. Returns the tenants now configured."""
+        if self.path is None or not self.path.exists():
+            tenants = [self.default] if self.default is not None else []
+        else:
+            tenants = load_tenants(self.path, self.default)
+        with self._lock:
+            self._tenants = tenants
+            self._by_guild = {g: t for t in tenants for g in t.guild_ids}
+            self._catch_all = next((t for t in tenants if not t.guild_ids), None)
+        return list(tenants)
+
+    def tenants(self) -> List[Tenant]:
+        with self._lock:
+            return list(self._tenants)
+
+    def for_guild(self, guild_id: Optional[int]) -> Optional[Tenant]:
+        """The tenant serving `guild_id` (None for DMs), or None if no tenant does."""
+        with self._lock:
+            return self._by_guild.get(guild_id, self._catch_all)
@@ -0,0 +1 @@
+"""Offline test and benchmark helpers (not used by the running bot)."""
@@ -0,0 +1,249 @@
+"""
+Load benchmark for the bot's Google work, run against FakeGoogle.
+
+    python -m ctf_bot.testing.benchmark --command add-agenda --concurrency 8 --count 200
+
+Drives GoogleDocsManager ("thread" transport) or AsyncGoogleDocsManager
+("asyncio") exactly as the commands do and reports latency percentiles, API
+calls and bytes per command. Settings such as AGENDA_COALESCE_WINDOW are read
+from the environment as usual.
+"""
+import os
+import tempfile
+
+# config reads these at import time; the benchmark never talks to Discord or Google
+os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+os.environ.setdefault("GOOGLE_FOLDER_ID", "benchmark-folder")
+os.environ.setdefault("GOOGLE_SERVICE_ACCOUNT_JSON", "unused.json")
+os.environ.setdefault("BOT_STATE_DIR", tempfile.mkdtemp(prefix="ctf-bot-bench-"))
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import time  # noqa: E402
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
+from typing import Dict, List, Optional  # noqa: E402
+
+from ..config import FOLDER_ID, GOOGLE_TRANSPORT, TARGET_DOC_NAME, TEMPLATE_DOC_NAME  # noqa: E402
+from ..integrations.google_async import AsyncGoogleDocsManager  # noqa: E402
+from ..integrations.google_docs import GoogleDocsManager  # noqa: E402
+from ..integrations.scheduler import GoogleRequestScheduler  # noqa: E402
+from .fake_google import FakeGoogle, agenda_content  # noqa: E402
+
+COMMANDS = ("add-agenda", "create-doc")
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `samples` (0 for no samples)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def seed_folder(
+    fake: FakeGoogle,
+    folder_id: str = FOLDER_ID,
+    agenda_rows: int = 20,
+    notes: int = 200,
+    meeting_docs: int = 30,
+) -> None:
+    """Fill `folder_id` with a draft, a template and some past meeting docs."""
+    fake.add_document(
+        TARGET_DOC_NAME,
+        agenda_content([f"Existing item {n}" for n in range(agenda_rows)], notes=notes,
+                       title="Meeting draft"),
+        folder_id,
+    )
+    fake.add_document(TEMPLATE_DOC_NAME, agenda_content(notes=notes, title="Meeting XX"), folder_id)
+    for n in range(1, meeting_docs + 1):
+        fake.add_document(f"meeting {n:02d}", agenda_content(title=f"Meeting {n:02d}"), folder_id)
+
+
+def _manager(fake: FakeGoogle, transport: str, scheduler: Optional[GoogleRequestScheduler]):
+    if transport == "asyncio":
+        return AsyncGoogleDocsManager(fake.async_client(scheduler))
+    return GoogleDocsManager(fake.service_pool(scheduler))
+
+
+async def run_benchmark(
+    fake: FakeGoogle,
+    command: str,
+    transport: str = GOOGLE_TRANSPORT,
+    concurrency: int = 4,
+    count: int = 100,
+    warmup: int = 1,
+    scheduler: Optional[GoogleRequestScheduler] = None,
+) -> Dict:
+    """
+    Run `count` commands, `concurrency` at a time, after `warmup` untimed
+    ones. `fake` must be started and seeded (see seed_folder). Returns the
+    report printed by main().
+    """
+    if command not in COMMANDS:
+        raise ValueError(f"Unknown command {command!r}; expected one of {COMMANDS}")
+    if scheduler is None:
+        # Retry 429/5xx like production, but without client-side rate limits
+        scheduler = GoogleRequestScheduler({}, base_delay=0.05, max_delay=1.0)
+
+    manager = _manager(fake, transport, scheduler)
+    executor = ThreadPoolExecutor(max_workers=concurrency) if transport != "asyncio" else None
+    loop = asyncio.get_running_loop()
+
+    async def run_one(n: int):
+        if command == "add-agenda":
+            name, args = "add_agenda_item", (f"Benchmark item {n}",)
+        else:
+            name, args = "create_from_template", (f"Benchmark meeting {n}",)
+        method = getattr(manager, name)
+        if executor is None:
+            return await method(*args)
+        return await loop.run_in_executor(executor, lambda: method(*args))
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    next_n = iter(range(warmup, warmup + count))
+
+    async def worker():
+        for n in next_n:
+            start = time.perf_counter()
+            try:
+                await run_one(n)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    try:
+        for n in range(warmup):
+            await run_one(n)
+        fake.reset_stats()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+        if transport == "asyncio":
+            await manager.client.close()
+
+    stats = fake.stats()
+    report = {
+        "command": command,
+        "transport": transport,
+        "concurrency": concurrency,
+        "count": count,
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(count / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            name: round(value * 1000, 2)
+            for name, value in (
+                ("p50", percentile(latencies, 50)),
+                ("p95", percentile(latencies, 95)),
+                ("p99", percentile(latencies, 99)),
+                ("max", max(latencies, default=0.0)),
+            )
+        },
+        "api_calls_per_command": round(stats["total_calls"] / count, 3),
+        "api_calls": stats["calls"],
+        "bytes_per_command": round((stats["bytes_sent"] + stats["bytes_received"]) / count, 1),
+        "request_bytes": stats["bytes_received"],
+        "response_bytes": stats["bytes_sent"],
+        "throttled": stats["throttled"],
+    }
+    if errors:
+        report["first_error"] = errors[0]
+    if command == "add-agenda":
+        # Every item must have landed in its own row's first cell
+        written = {row[0] for row in fake.find(TARGET_DOC_NAME).tables()[0]}
+        report["missing_rows"] = sum(
+            1 for n in range(warmup, warmup + count) if f"Benchmark item {n}\n" not in written
+        )
+    return report
+
+
+def _format(report: Dict) -> str:
+    latency = report["latency_ms"]
+    lines = [
+        f"{report['command']} ({report['transport']} transport, "
+        f"{report['concurrency']} concurrent, {report['count']} commands)",
+        f"  latency ms   p50 {latency['p50']}  p95 {latency['p95']}  "
+        f"p99 {latency['p99']}  max {latency['max']}",
+        f"  throughput   {report['throughput_per_s']}/s over {report['elapsed_s']}s",
+        f"  API calls    {report['api_calls_per_command']} per command "
+        + ", ".join(f"{k}={v}" for k, v in sorted(report["api_calls"].items())),
+        f"  bytes        {report['bytes_per_command']} per command "
+        f"(requests {report['request_bytes']}, responses {report['response_bytes']})",
+        f"  errors       {report['errors']}  throttled {report['throttled']}",
+    ]
+    if "missing_rows" in report:
+        lines.append(f"  missing rows {report['missing_rows']}")
+    if "first_error" in report:
+        lines.append(f"  first error  {report['first_error']}")
+    return "\n".join(lines)
+
+
+def _rate_limit(value: str):
+    bucket, _, per_minute = value.partition("=")
+    return bucket, float(per_minute)
+
+
+async def _main(args: argparse.Namespace) -> List[Dict]:
+    fake = FakeGoogle(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        rate_limits=dict(args.server_quota),
+        seed=args.seed,
+    )
+    reports = []
+    async with fake:
+        seed_folder(fake, agenda_rows=args.agenda_rows, notes=args.notes,
+                    meeting_docs=args.meeting_docs)
+        for command in COMMANDS if args.command == "all" else (args.command,):
+            reports.append(await run_benchmark(
+                fake,
+                command,
+                transport=args.transport,
+                concurrency=args.concurrency,
+                count=args.count,
+                warmup=args.warmup,
+                scheduler=GoogleRequestScheduler.from_config() if args.client_quotas else None,
+            ))
+    return reports
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--command", choices=COMMANDS + ("all",), default="add-agenda")
+    parser.add_argument("--transport", choices=("thread", "asyncio"), default=GOOGLE_TRANSPORT)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--count", type=int, default=100, help="timed commands per run")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed commands first")
+    parser.add_argument("--latency", type=float, default=50.0, help="server latency in ms")
+    parser.add_argument("--jitter", type=float, default=20.0, help="extra random latency in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of requests failing with a 429")
+    parser.add_argument("--server-quota", type=_rate_limit, action="append", default=[],
+                        metavar="BUCKET=N",
+                        help="server-side requests/minute, e.g. docs_write=60 (repeatable)")
+    parser.add_argument("--client-quotas", action="store_true",
+                        help="also apply the bot's *_PER_MINUTE client-side limits")
+    parser.add_argument("--agenda-rows", type=int, default=20)
+    parser.add_argument("--notes", type=int, default=200, help="filler paragraphs per doc")
+    parser.add_argument("--meeting-docs", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a summary")
+    args = parser.parse_args(argv)
+
+    reports = asyncio.run(_main(args))
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print("\n\n".join(_format(report) for report in reports))
+
+
+if __name__ == "__main__":
+    main()
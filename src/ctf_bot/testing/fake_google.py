@@ -0,0 +1,802 @@
+"""In-process fake of the Google Docs and Drive endpoints the bot uses."""
+import asyncio
+import copy
+import functools
+import random
+import re
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from aiohttp import web
+from google.auth.credentials import AnonymousCredentials
+
+from ..integrations.google_async import AsyncGoogleClient
+from ..integrations.google_docs import GoogleDocsManager, GoogleServicePool
+from ..integrations.scheduler import GoogleRequestScheduler, bucket_for
+from ..tenants import Tenant
+
+DOCUMENT_MIME_TYPE = "application/vnd.google-apps.document"
+
+# A paragraph is its text (always ending in "\n"); a table is a list of rows,
+# a row a list of cells, and a cell a list of paragraphs.
+Table = List[List[List[str]]]
+Element = Union[str, Table]
+
+# Style blobs the real API returns with every full documents.get, so
+# unmasked responses are about as heavy as Google's
+_PARAGRAPH_STYLE = {
+    "namedStyleType": "NORMAL_TEXT",
+    "direction": "LEFT_TO_RIGHT",
+    "lineSpacing": 115,
+    "spaceAbove": {"unit": "PT"},
+    "spaceBelow": {"unit": "PT"},
+}
+_TEXT_STYLE = {
+    "weightedFontFamily": {"fontFamily": "Arial", "weight": 400},
+    "fontSize": {"magnitude": 11, "unit": "PT"},
+    "foregroundColor": {"color": {"rgbColor": {}}},
+}
+_TABLE_CELL_STYLE = {
+    "rowSpan": 1,
+    "columnSpan": 1,
+    "backgroundColor": {},
+    "paddingLeft": {"magnitude": 5, "unit": "PT"},
+    "paddingRight": {"magnitude": 5, "unit": "PT"},
+    "paddingTop": {"magnitude": 5, "unit": "PT"},
+    "paddingBottom": {"magnitude": 5, "unit": "PT"},
+    "contentAlignment": "TOP",
+}
+_DOCUMENT_STYLE = {
+    "background": {"color": {}},
+    "pageNumberStart": 1,
+    "marginTop": {"magnitude": 72, "unit": "PT"},
+    "marginBottom": {"magnitude": 72, "unit": "PT"},
+    "marginRight": {"magnitude": 72, "unit": "PT"},
+    "marginLeft": {"magnitude": 72, "unit": "PT"},
+    "pageSize": {"height": {"magnitude": 792, "unit": "PT"}, "width": {"magnitude": 612, "unit": "PT"}},
+}
+_NAMED_STYLES = {"styles": [
+    {"namedStyleType": name, "textStyle": _TEXT_STYLE, "paragraphStyle": _PARAGRAPH_STYLE}
+    for name in (
+        "NORMAL_TEXT", "TITLE", "SUBTITLE", "HEADING_1", "HEADING_2",
+        "HEADING_3", "HEADING_4", "HEADING_5", "HEADING_6",
+    )
+]}
+
+
+class FakeApiError(Exception):
+    """An error response in Google's JSON error format."""
+
+    _STATUS_NAMES = {
+        400: "INVALID_ARGUMENT", 403: "PERMISSION_DENIED", 404: "NOT_FOUND",
+        429: "RESOURCE_EXHAUSTED", 503: "UNAVAILABLE",
+    }
+
+    def __init__(self, code: int, message: str, reason: Optional[str] = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.reason = reason
+
+    def response(self) -> web.Response:
+        error = {
+            "code": self.code,
+            "message": self.message,
+            "status": self._STATUS_NAMES.get(self.code, "UNKNOWN"),
+        }
+        if self.reason:
+            error["errors"] = [{"reason": self.reason, "message": self.message, "domain": "global"}]
+        return web.json_response({"error": error}, status=self.code)
+
+
+# ----------------------------
+# Partial responses (`fields`)
+# ----------------------------
+def parse_field_mask(fields: str) -> Dict[str, Optional[dict]]:
+    """
+    Parse a partial-response mask like 'revisionId,body(content(startIndex))'
+    or 'files/id' into a tree of {name: subtree, or None for everything}.
+    """
+    text = fields.replace(" ", "")
+    tree, pos = _parse_field_list(text, 0)
+    if pos != len(text):
+        raise FakeApiError(400, f"Invalid field selection {fields}", "invalidParameter")
+    return tree
+
+
+_FIELD_NAME = re.compile(r"[A-Za-z0-9_*]+")
+
+
+def _parse_field_list(text: str, pos: int) -> Tuple[Dict[str, Optional[dict]], int]:
+    tree: Dict[str, Optional[dict]] = {}
+    while True:
+        name, subtree, pos = _parse_field(text, pos)
+        tree[name] = _merge_masks(tree[name], subtree) if name in tree else subtree
+        if pos < len(text) and text[pos] == ",":
+            pos += 1
+            continue
+        return tree, pos
+
+
+def _parse_field(text: str, pos: int) -> Tuple[str, Optional[dict], int]:
+    match = _FIELD_NAME.match(text, pos)
+    if not match:
+        raise FakeApiError(400, f"Invalid field selection {text}", "invalidParameter")
+    name, pos = match.group(), match.end()
+    subtree: Optional[dict] = None
+    if pos < len(text) and text[pos] == "(":
+        subtree, pos = _parse_field_list(text, pos + 1)
+        if pos >= len(text) or text[pos] != ")":
+            raise FakeApiError(400, f"Invalid field selection {text}", "invalidParameter")
+        pos += 1
+    elif pos < len(text) and text[pos] == "/":
+        # a/b is shorthand for a(b)
+        child, child_tree, pos = _parse_field(text, pos + 1)
+        subtree = {child: child_tree}
+    return name, subtree, pos
+
+
+def _merge_masks(a: Optional[dict], b: Optional[dict]) -> Optional[dict]:
+    if a is None or b is None:
+        return None
+    merged = dict(a)
+    for key, subtree in b.items():
+        merged[key] = _merge_masks(merged[key], subtree) if key in merged else subtree
+    return merged
+
+
+def apply_field_mask(value, mask: Optional[dict]):
+    """Keep only the parts of `value` selected by a parse_field_mask tree."""
+    if mask is None or "*" in mask:
+        return value
+    if isinstance(value, list):
+        return [apply_field_mask(item, mask) for item in value]
+    if isinstance(value, dict):
+        return {
+            key: apply_field_mask(value[key], subtree)
+            for key, subtree in mask.items()
+            if key in value
+        }
+    return value
+
+
+# ----------------------------
+# Documents
+# ----------------------------
+def _paragraph(start: int, text: str) -> dict:
+    end = start + len(text)
+    return {
+        "startIndex": start,
+        "endIndex": end,
+        "paragraph": {
+            "elements": [{
+                "startIndex": start,
+                "endIndex": end,
+                "textRun": {"content": text, "textStyle": {}},
+            }],
+            "paragraphStyle": _PARAGRAPH_STYLE,
+        },
+    }
+
+
+class FakeDocument:
+    """
+    Structural model of a Google Doc body: paragraphs and tables of paragraphs.
+
+    Indices are derived from the structure the way Docs counts them (a section
+    break at 0, then one character per table, row and cell marker plus the
+    text), so requests built from a rendered copy land exactly where they
+    would on the real API. Every successful batchUpdate bumps the revision.
+    """
+
+    def __init__(self, doc_id: str, title: str, content: Sequence[Element]):
+        self.doc_id = doc_id
+        self.title = title
+        self.content: List[Element] = copy.deepcopy(list(content))
+        self.revision = 1
+
+    @property
+    def revision_id(self) -> str:
+        return f"rev{self.revision}"
+
+    def copy_as(self, doc_id: str, title: str) -> "FakeDocument":
+        return FakeDocument(doc_id, title, self.content)
+
+    def tables(self) -> List[List[List[str]]]:
+        """Every table as rows of cell texts, for assertions."""
+        return [
+            [["".join(cell) for cell in row] for row in element]
+            for element in self.content
+            if not isinstance(element, str)
+        ]
+
+    def _layout(self):
+        """
+        Returns (body content, paragraphs, tables): paragraphs as
+        (start, end, container list, position) and tables keyed by start index.
+        """
+        content: List[dict] = [{"endIndex": 1, "sectionBreak": {"sectionStyle": {
+            "columnSeparatorStyle": "NONE", "contentDirection": "LEFT_TO_RIGHT",
+        }}}]
+        paragraphs: List[Tuple[int, int, list, int]] = []
+        tables: Dict[int, Table] = {}
+        index = 1
+
+        def add_paragraph(container: list, position: int) -> dict:
+            nonlocal index
+            text = container[position]
+            paragraphs.append((index, index + len(text), container, position))
+            node = _paragraph(index, text)
+            index += len(text)
+            return node
+
+        for position, element in enumerate(self.content):
+            if isinstance(element, str):
+                content.append(add_paragraph(self.content, position))
+                continue
+
+            table_start = index
+            tables[table_start] = element
+            index += 1
+            table_rows = []
+            for row in element:
+                row_start = index
+                index += 1
+                cells = []
+                for cell in row:
+                    cell_start = index
+                    index += 1
+                    paras = [add_paragraph(cell, i) for i in range(len(cell))]
+                    cells.append({
+                        "startIndex": cell_start,
+                        "endIndex": index,
+                        "content": paras,
+                        "tableCellStyle": _TABLE_CELL_STYLE,
+                    })
+                table_rows.append({
+                    "startIndex": row_start,
+                    "endIndex": index,
+                    "tableCells": cells,
+                    "tableRowStyle": {"minRowHeight": {"unit": "PT"}},
+                })
+            index += 1
+            content.append({
+                "startIndex": table_start,
+                "endIndex": index,
+                "table": {
+                    "rows": len(element),
+                    "columns": len(element[0]) if element else 0,
+                    "tableRows": table_rows,
+                    "tableStyle": {"tableColumnProperties": [
+                        {"widthType": "EVENLY_DISTRIBUTED"} for _ in (element[0] if element else [])
+                    ]},
+                },
+            })
+        return content, paragraphs, tables
+
+    def render(self) -> dict:
+        """The full documents.get resource."""
+        content, _, _ = self._layout()
+        return {
+            "documentId": self.doc_id,
+            "title": self.title,
+            "revisionId": self.revision_id,
+            "suggestionsViewMode": "SUGGESTIONS_INLINE",
+            "body": {"content": content},
+            "documentStyle": _DOCUMENT_STYLE,
+            "namedStyles": _NAMED_STYLES,
+        }
+
+    def batch_update(self, body: dict) -> dict:
+        """Apply a batchUpdate body atomically; raises FakeApiError like Docs would."""
+        required = (body.get("writeControl") or {}).get("requiredRevisionId")
+        if required is not None and required != self.revision_id:
+            raise FakeApiError(
+                400,
+                f"The required revision ID '{required}' does not match the latest "
+                f"revision of the document.",
+                "failedPrecondition",
+            )
+
+        backup = copy.deepcopy(self.content)
+        replies = []
+        try:
+            for n, request in enumerate(body.get("requests", [])):
+                if len(request) != 1:
+                    raise FakeApiError(400, f"Invalid requests[{n}]: exactly one kind expected")
+                (kind, params), = request.items()
+                handler = getattr(self, f"_{kind}", None)
+                if handler is None:
+                    raise FakeApiError(400, f"Invalid requests[{n}]: {kind} is not supported by the fake")
+                try:
+                    replies.append(handler(params))
+                except (KeyError, TypeError) as e:
+                    raise FakeApiError(400, f"Invalid requests[{n}].{kind}: missing or bad {e}")
+                except FakeApiError as e:
+                    raise FakeApiError(e.code, f"Invalid requests[{n}].{kind}: {e.message}", e.reason)
+        except FakeApiError:
+            self.content = backup
+            raise
+
+        self.revision += 1
+        return {
+            "documentId": self.doc_id,
+            "replies": replies,
+            "writeControl": {"requiredRevisionId": self.revision_id},
+        }
+
+    def _insertText(self, params: dict) -> dict:
+        text = params.get("text", "")
+        if not text:
+            raise FakeApiError(400, "Text must not be empty.")
+        index = params["location"]["index"]
+        _, paragraphs, _ = self._layout()
+        for start, end, container, position in paragraphs:
+            if start <= index < end:
+                old = container[position]
+                new = old[:index - start] + text + old[index - start:]
+                container[position:position + 1] = [line + "\n" for line in new[:-1].split("\n")]
+                return {}
+        raise FakeApiError(400, f"Index {index} must be inside the bounds of an existing paragraph.")
+
+    def _insertTableRow(self, params: dict) -> dict:
+        location = params["tableCellLocation"]
+        start = location["tableStartLocation"]["index"]
+        _, _, tables = self._layout()
+        rows = tables.get(start)
+        if rows is None:
+            raise FakeApiError(400, f"The table start location {start} is not the start of a table.")
+        row_index = location.get("rowIndex", 0)
+        if not 0 <= row_index < len(rows):
+            raise FakeApiError(400, f"Row index {row_index} is out of bounds.")
+        position = row_index + 1 if params.get("insertBelow") else row_index
+        rows.insert(position, [["\n"] for _ in rows[row_index]])
+        return {}
+
+    def _replaceAllText(self, params: dict) -> dict:
+        contains = params["containsText"]
+        pattern = re.compile(
+            re.escape(contains["text"]), 0 if contains.get("matchCase") else re.IGNORECASE
+        )
+        replacement = params.get("replaceText", "")
+        _, paragraphs, _ = self._layout()
+        changed = 0
+        for _, _, container, position in paragraphs:
+            container[position], count = pattern.subn(lambda m: replacement, container[position])
+            changed += count
+        return {"replaceAllText": {"occurrencesChanged": changed}}
+
+
+def agenda_content(
+    items: Iterable[str] = (), columns: int = 2, notes: int = 0, title: Optional[str] = None
+) -> List[Element]:
+    """
+    Body of a meeting doc: optional title, 'Agenda items:' and a table with a
+    header row plus one row per item, then `notes` paragraphs of filler text.
+    """
+    content: List[Element] = [f"{title}\n"] if title else []
+    content.append("Agenda items:\n")
+    blank = [["\n"] for _ in range(columns - 1)]
+    content.append([[["Item\n"]] + blank] + [[[f"{item}\n"]] + blank for item in items])
+    content.append("\n")
+    content.extend(
+        f"Note {n}: discussion, action items and links from the meeting go here.\n"
+        for n in range(notes)
+    )
+    return content
+
+
+# ----------------------------
+# Drive queries
+# ----------------------------
+_STRING = r"'((?:[^'\\]|\\.)*)'"
+
+
+def _unquote(value: str) -> str:
+    return re.sub(r"\\(.)", r"\1", value)
+
+
+def _split_top_level(query: str, separator: str) -> List[str]:
+    """Split on `separator` outside quotes and parentheses."""
+    parts, depth, quoted, start, i = [], 0, False, 0, 0
+    while i < len(query):
+        char = query[i]
+        if quoted:
+            if char == "\\":
+                i += 1
+            elif char == "'":
+                quoted = False
+        elif char == "'":
+            quoted = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0 and query.startswith(separator, i):
+            parts.append(query[start:i])
+            i += len(separator)
+            start = i
+            continue
+        i += 1
+    parts.append(query[start:])
+    return parts
+
+
+def matches_query(query: str, file: dict) -> bool:
+    """Evaluate the subset of the Drive query language the bot uses."""
+    query = query.strip()
+    if not query:
+        return True
+    for separator, combine in ((" or ", any), (" and ", all)):
+        parts = _split_top_level(query, separator)
+        if len(parts) > 1:
+            return combine(matches_query(part, file) for part in parts)
+    if query.startswith("(") and query.endswith(")"):
+        return matches_query(query[1:-1], file)
+    if query.startswith("not "):
+        return not matches_query(query[4:], file)
+
+    match = re.fullmatch(_STRING + r"\s+in\s+parents", query)
+    if match:
+        return _unquote(match.group(1)) in file["parents"]
+    match = re.fullmatch(r"(\w+)\s*(=|!=|contains)\s*(?:" + _STRING + r"|(true|false))", query)
+    if match:
+        field, operator, text, boolean = match.groups()
+        expected = _unquote(text) if text is not None else boolean == "true"
+        value = file.get(field)
+        if operator == "contains":
+            return isinstance(value, str) and expected in value
+        return (value == expected) == (operator == "=")
+    raise FakeApiError(400, f"Invalid Value: {query}", "invalid")
+
+
+# ----------------------------
+# Server
+# ----------------------------
+def fake_service_pool(
+    url: str, scheduler: Optional[GoogleRequestScheduler] = None
+) -> GoogleServicePool:
+    """googleapiclient services pointed at a FakeGoogle listening on `url`."""
+    return GoogleServicePool(
+        AnonymousCredentials(),
+        scheduler,
+        docs_endpoint=f"{url}/",
+        drive_endpoint=f"{url}/drive/v3/",
+    )
+
+
+def fake_docs_manager(url: str, tenant: Tenant) -> GoogleDocsManager:
+    """A tenant's GoogleDocsManager talking to the FakeGoogle at `url`."""
+    return GoogleDocsManager(fake_service_pool(url), tenant=tenant)
+
+
+class StaticTokenCredentials:
+    """Async credentials for AsyncGoogleClient that skip the token exchange."""
+
+    async def get_token(self, session) -> str:
+        return "fake-token"
+
+
+class FakeGoogle:
+    """
+    Local HTTP stand-in for the Docs and Drive APIs, laid out like Google's so
+    both googleapiclient (service_pool) and AsyncGoogleClient (async_client)
+    can talk to it unchanged.
+
+    Supports documents.get (with `fields`), documents.batchUpdate
+    (insertText, insertTableRow, replaceAllText, writeControl), files.list,
+    files.copy, files.update (name, trashed and parents), and
+    changes.getStartPageToken / changes.list over a log of every file created
+    or modified (page tokens are positions in that log). Like the real APIs,
+    a trashed doc can still be read and edited; only files.list hides it.
+    Every request can be delayed by `latency` plus up to `jitter` seconds,
+    fails with a 429 with probability `error_rate`, and is throttled with 429s
+    past `rate_limits` requests a minute per quota bucket (see
+    scheduler.bucket_for). `lose_responses` makes requests succeed but answer
+    500. Calls and bytes are counted in `stats()`.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limits: Optional[Dict[str, float]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limits = rate_limits or {}
+        self.files: Dict[str, dict] = {}
+        self.documents: Dict[str, FakeDocument] = {}
+        self.change_log: List[str] = []
+        self.url: Optional[str] = None
+        self._random = random.Random(seed)
+        self._windows: Dict[str, Deque[float]] = {}
+        self._next_id = 0
+        self._lost_responses: Counter = Counter()
+        self._runner: Optional[web.AppRunner] = None
+        self.reset_stats()
+
+        self.app = web.Application(middlewares=[self._middleware])
+        routes = [
+            ("GET", "/v1/documents/{doc_id}", self.documents_get, "docs.documents.get"),
+            ("POST", r"/v1/documents/{doc_id:[^/:]+}:batchUpdate", self.documents_batch_update,
+             "docs.documents.batchUpdate"),
+            ("GET", "/drive/v3/files", self.files_list, "drive.files.list"),
+            ("POST", "/drive/v3/files/{file_id}/copy", self.files_copy, "drive.files.copy"),
+            ("PATCH", "/drive/v3/files/{file_id}", self.files_update, "drive.files.update"),
+            ("GET", "/drive/v3/changes/startPageToken", self.changes_start_page_token,
+             "drive.changes.getStartPageToken"),
+            ("GET", "/drive/v3/changes", self.changes_list, "drive.changes.list"),
+        ]
+        for method, path, handler, name in routes:
+            self.app.router.add_route(method, path, handler, name=name)
+
+    # -- setup ---------------------------------------------------------------
+
+    def add_document(
+        self, name: str, content: Sequence[Element], folder_id: str, modified: float = None
+    ) -> str:
+        """Create a Google Doc named `name` in `folder_id`; returns its ID."""
+        doc_id = self._new_id()
+        self.documents[doc_id] = FakeDocument(doc_id, name, content)
+        self.files[doc_id] = self._file(doc_id, name, [folder_id], modified)
+        self.change_log.append(doc_id)
+        return doc_id
+
+    def trash(self, file_id: str) -> None:
+        """Move a file to the trash as some other Drive user would."""
+        self.files[file_id]["trashed"] = True
+        self._touch(file_id)
+
+    def edit_document(self, doc_id: str, requests: List[dict]) -> dict:
+        """Apply a batchUpdate as some other Docs user would, bypassing HTTP."""
+        resp = self.documents[doc_id].batch_update({"requests": requests})
+        self._touch(doc_id)
+        return resp
+
+    def lose_responses(self, method_id: str, count: int = 1) -> None:
+        """Apply the next `count` `method_id` requests, then answer them with a 500."""
+        self._lost_responses[method_id] += count
+
+    def find(self, name: str) -> FakeDocument:
+        """The most recently modified document named `name`."""
+        files = [f for f in self.files.values() if f["name"] == name and not f["trashed"]]
+        if not files:
+            raise KeyError(name)
+        return self.documents[max(files, key=lambda f: f["modifiedTime"])["id"]]
+
+    def _new_id(self) -> str:
+        self._next_id += 1
+        return f"fake-doc-{self._next_id:06d}"
+
+    def _file(self, file_id: str, name: str, parents: List[str], modified: float = None) -> dict:
+        stamp = time.strftime(
+            "%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(time.time() if modified is None else modified)
+        )
+        return {
+            "kind": "drive#file",
+            "id": file_id,
+            "name": name,
+            "mimeType": DOCUMENT_MIME_TYPE,
+            "parents": list(parents),
+            "createdTime": stamp,
+            "modifiedTime": stamp,
+            "trashed": False,
+        }
+
+    def _touch(self, file_id: str) -> None:
+        self.files[file_id]["modifiedTime"] = time.strftime(
+            "%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()
+        )
+        self.change_log.append(file_id)
+
+    # -- lifecycle -------------------------------------------------------------
+
+    async def start(self) -> str:
+        """Listen on a free localhost port; returns the base URL."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "FakeGoogle":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def service_pool(self, scheduler: Optional[GoogleRequestScheduler] = None) -> GoogleServicePool:
+        """googleapiclient services (the "thread" transport) pointed at this server."""
+        return fake_service_pool(self.url, scheduler)
+
+    def manager_factory(self):
+        """GoogleWorkerProcess factory (picklable) building managers that use this server."""
+        return functools.partial(fake_docs_manager, self.url)
+
+    def async_client(self, scheduler: Optional[GoogleRequestScheduler] = None) -> AsyncGoogleClient:
+        """AsyncGoogleClient (the "asyncio" transport) pointed at this server."""
+        return AsyncGoogleClient(
+            StaticTokenCredentials(),
+            docs_url=f"{self.url}/v1",
+            drive_url=f"{self.url}/drive/v3",
+            scheduler=scheduler,
+        )
+
+    # -- accounting ------------------------------------------------------------
+
+    def reset_stats(self) -> None:
+        self.calls: Counter = Counter()
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.throttled = 0
+
+    def stats(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "total_calls": sum(self.calls.values()),
+            "bytes_received": self.bytes_received,
+            "bytes_sent": self.bytes_sent,
+            "throttled": self.throttled,
+        }
+
+    def _check_quota(self, method_id: str) -> None:
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.throttled += 1
+            raise FakeApiError(429, "Rate Limit Exceeded", "rateLimitExceeded")
+
+        bucket = bucket_for(method_id)
+        limit = self.rate_limits.get(bucket)
+        if limit is None:
+            return
+        window = self._windows.setdefault(bucket, deque())
+        now = time.monotonic()
+        while window and window[0] <= now - 60:
+            window.popleft()
+        if len(window) >= limit:
+            self.throttled += 1
+            raise FakeApiError(
+                429, f"Quota exceeded for quota metric '{bucket}' per minute.", "rateLimitExceeded"
+            )
+        window.append(now)
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        method_id = request.match_info.route.name or "unknown"
+        body = await request.read()
+        self.bytes_received += len(body) + len(str(request.rel_url))
+        self.calls[method_id] += 1
+
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            self._check_quota(method_id)
+            response = await handler(request)
+            if self._lost_responses[method_id] > 0:
+                self._lost_responses[method_id] -= 1
+                raise FakeApiError(500, "Internal error encountered.", "backendError")
+        except FakeApiError as e:
+            response = e.response()
+        self.bytes_sent += len(response.body or b"")
+        return response
+
+    # -- handlers --------------------------------------------------------------
+
+    def _document(self, doc_id: str) -> FakeDocument:
+        document = self.documents.get(doc_id)
+        if document is None:
+            raise FakeApiError(404, "Requested entity was not found.", "notFound")
+        return document
+
+    @staticmethod
+    def _masked(request: web.Request, resource: dict, default: Optional[str] = None) -> web.Response:
+        fields = request.query.get("fields", default)
+        if fields:
+            resource = apply_field_mask(resource, parse_field_mask(fields))
+        return web.json_response(resource)
+
+    async def documents_get(self, request: web.Request) -> web.Response:
+        document = self._document(request.match_info["doc_id"])
+        return self._masked(request, document.render())
+
+    async def documents_batch_update(self, request: web.Request) -> web.Response:
+        doc_id = request.match_info["doc_id"]
+        document = self._document(doc_id)
+        resp = document.batch_update(await request.json())
+        self._touch(doc_id)
+        return web.json_response(resp)
+
+    async def files_list(self, request: web.Request) -> web.Response:
+        query = request.query
+        files = [f for f in self.files.values() if matches_query(query.get("q", ""), f)]
+        order_by = query.get("orderBy")
+        if order_by:
+            key, _, direction = order_by.partition(" ")
+            files.sort(key=lambda f: f.get(key) or "", reverse=direction == "desc")
+
+        offset = int(query.get("pageToken") or 0)
+        page_size = int(query.get("pageSize") or 100)
+        resp = {
+            "kind": "drive#fileList",
+            "incompleteSearch": False,
+            "files": files[offset:offset + page_size],
+        }
+        if offset + page_size < len(files):
+            resp["nextPageToken"] = str(offset + page_size)
+        return self._masked(
+            request, resp, "kind,incompleteSearch,nextPageToken,files(kind,id,name,mimeType)"
+        )
+
+    async def files_copy(self, request: web.Request) -> web.Response:
+        source_id = request.match_info["file_id"]
+        source = self._document(source_id)
+        body = await request.json() if request.body_exists else {}
+        name = body.get("name") or f"Copy of {source.title}"
+        copy_id = self._new_id()
+        self.documents[copy_id] = source.copy_as(copy_id, name)
+        self.files[copy_id] = self._file(
+            copy_id, name, body.get("parents") or self.files[source_id]["parents"]
+        )
+        self.change_log.append(copy_id)
+        return self._masked(request, self.files[copy_id], "kind,id,name,mimeType")
+
+    async def files_update(self, request: web.Request) -> web.Response:
+        file_id = request.match_info["file_id"]
+        file = self.files.get(file_id)
+        if file is None:
+            raise FakeApiError(404, f"File not found: {file_id}.", "notFound")
+        body = await request.json() if request.body_exists else {}
+        if "name" in body:
+            file["name"] = body["name"]
+            self.documents[file_id].title = body["name"]
+        if "trashed" in body:
+            file["trashed"] = bool(body["trashed"])
+        removed = set(filter(None, request.query.get("removeParents", "").split(",")))
+        added = [p for p in request.query.get("addParents", "").split(",") if p]
+        file["parents"] = [p for p in file["parents"] if p not in removed] + [
+            p for p in added if p not in file["parents"]
+        ]
+        self._touch(file_id)
+        return self._masked(request, file, "kind,id,name,mimeType")
+
+    async def changes_start_page_token(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {"kind": "drive#startPageToken", "startPageToken": str(len(self.change_log))}
+        )
+
+    async def changes_list(self, request: web.Request) -> web.Response:
+        query = request.query
+        try:
+            offset = int(query["pageToken"])
+        except (KeyError, ValueError):
+            raise FakeApiError(400, "Invalid Value", "invalid")
+        page_size = int(query.get("pageSize") or 100)
+        end = min(offset + page_size, len(self.change_log))
+        resp = {
+            "kind": "drive#changeList",
+            "changes": [
+                {"kind": "drive#change", "changeType": "file", "fileId": file_id,
+                 "removed": file_id not in self.files, **(
+                     {"file": self.files[file_id]} if file_id in self.files else {}
+                 )}
+                for file_id in self.change_log[offset:end]
+            ],
+        }
+        if end < len(self.change_log):
+            resp["nextPageToken"] = str(end)
+        else:
+            resp["newStartPageToken"] = str(end)
+        return self._masked(request, resp)
@@ -1,6 +1,7 @@
 """Test configuration and fixtures."""
 import pytest
 import os
+import tempfile
 from unittest.mock import MagicMock, patch
 
 # Mock environment variables for testing
@@ -8,6 +9,8 @@ os.environ.setdefault("DISCORD_TOKEN", "test_token")
 os.environ.setdefault("GOOGLE_FOLDER_ID", "test_folder_id")
 os.environ.setdefault("GOOGLE_DOC_NAME", "test_doc")
 os.environ.setdefault("GOOGLE_SERVICE_ACCOUNT_JSON", "test_service_account.json")
+os.environ.setdefault("AGENDA_COALESCE_WINDOW", "0")
+os.environ.setdefault("BOT_STATE_DIR", tempfile.mkdtemp(prefix="ctf-bot-test-"))
 
 
 @pytest.fixture
@@ -33,4 +36,36 @@ def mock_drive_service():
     with patch('ctf_bot.integrations.google_docs.make_drive_service') as mock:
         service = MagicMock()
         mock.return_value = service
-        yield service
\ No newline at end of file
+        yield service
+
+
+@pytest.fixture
+def agenda_doc():
+    """A small doc: 'Agenda items:' heading then a 2-column table with one row."""
+    def para(start, text):
+        return {
+            'startIndex': start,
+            'endIndex': start + len(text),
+            'paragraph': {'elements': [{
+                'startIndex': start,
+                'endIndex': start + len(text),
+                'textRun': {'content': text},
+            }]},
+        }
+
+    return {
+        'revisionId': 'rev1',
+        'body': {'content': [
+            {'endIndex': 1, 'sectionBreak': {}},
+            para(1, 'Agenda items:\n'),
+            {'startIndex': 15, 'endIndex': 26, 'table': {
+                'rows': 1,
+                'columns': 2,
+                'tableRows': [{'startIndex': 16, 'endIndex': 25, 'tableCells': [
+                    {'startIndex': 17, 'endIndex': 23, 'content': [para(18, 'Item\n')]},
+                    {'startIndex': 23, 'endIndex': 25, 'content': [para(24, '\n')]},
+                ]}],
+            }},
+            para(26, '\n'),
+        ]},
+    }
@@ -0,0 +1,105 @@
+"""Tests for agenda write coalescing."""
+import threading
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from ctf_bot.integrations.agenda_writer import AgendaWriteCoalescer, AsyncAgendaWriteCoalescer
+
+
+class TestAgendaWriteCoalescer:
+    """Test cases for AgendaWriteCoalescer."""
+
+    def test_single_item_uses_flush_one(self):
+        """A lone item is written with the single-item path."""
+        flush_one, flush_many = MagicMock(), MagicMock()
+        writer = AgendaWriteCoalescer(flush_one, flush_many, window=0)
+        writer.submit("doc", "item")
+        flush_one.assert_called_once_with("doc", "item")
+        flush_many.assert_not_called()
+
+    def test_concurrent_items_are_merged(self):
+        """Items arriving within the window go out in one batch."""
+        flush_one, flush_many = MagicMock(), MagicMock()
+        writer = AgendaWriteCoalescer(flush_one, flush_many, window=0.2)
+        threads = [
+            threading.Thread(target=writer.submit, args=("doc", f"item {i}"))
+            for i in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        flush_many.assert_called_once()
+        doc_id, texts = flush_many.call_args.args
+        assert doc_id == "doc"
+        assert sorted(texts) == [f"item {i}" for i in range(5)]
+        flush_one.assert_not_called()
+
+    def test_invalid_batch_reports_per_item(self):
+        """When one item makes the batch invalid, each is retried alone and fails on its own."""
+        def flush_one(doc_id, text):
+            if text == "bad":
+                raise ValueError("bad item")
+
+        flush_many = MagicMock(side_effect=ValueError("batch invalid"))
+        writer = AgendaWriteCoalescer(
+            flush_one, flush_many, window=0,
+            is_item_error=lambda e: isinstance(e, ValueError),
+        )
+        errors = writer.submit_many("doc", ["good", "bad"])
+        assert errors[0] is None
+        assert str(errors[1]) == "bad item"
+
+    def test_stale_batch_is_retried_once(self):
+        """A stale revision re-runs the whole batch once, never item by item."""
+        stale = RuntimeError("stale")
+        flush_one = MagicMock()
+        flush_many = MagicMock(side_effect=[stale, None])
+        writer = AgendaWriteCoalescer(
+            flush_one, flush_many, window=0, is_stale=lambda e: e is stale
+        )
+        assert writer.submit_many("doc", ["a", "b"]) == [None, None]
+        assert flush_many.call_count == 2
+        flush_one.assert_not_called()
+
+        flush_many.side_effect = [stale, stale]
+        assert writer.submit_many("doc", ["a", "b"]) == [stale, stale]
+        assert flush_many.call_count == 4
+        flush_one.assert_not_called()
+
+    def test_other_batch_errors_fail_every_item(self):
+        """Quota and server errors are reported for the whole batch, not retried per item."""
+        quota = RuntimeError("429")
+        flush_one = MagicMock()
+        writer = AgendaWriteCoalescer(
+            flush_one, MagicMock(side_effect=quota), window=0,
+            is_stale=lambda e: False, is_item_error=lambda e: False,
+        )
+        assert writer.submit_many("doc", ["a", "b", "c"]) == [quota] * 3
+        flush_one.assert_not_called()
+
+    def test_single_failure_propagates(self):
+        """A failed write is raised to the caller."""
+        writer = AgendaWriteCoalescer(
+            MagicMock(side_effect=RuntimeError("boom")), MagicMock(), window=0
+        )
+        with pytest.raises(RuntimeError, match="boom"):
+            writer.submit("doc", "item")
+
+
+class TestAsyncAgendaWriteCoalescer:
+    """Test cases for AsyncAgendaWriteCoalescer."""
+
+    @pytest.mark.asyncio
+    async def test_same_retry_rules(self):
+        stale, quota = RuntimeError("stale"), RuntimeError("429")
+        flush_one = AsyncMock()
+        flush_many = AsyncMock(side_effect=[stale, None, quota])
+        writer = AsyncAgendaWriteCoalescer(
+            flush_one, flush_many, window=0, is_stale=lambda e: e is stale
+        )
+        assert await writer.submit_many("doc", ["a", "b"]) == [None, None]
+        assert await writer.submit_many("doc", ["a", "b"]) == [quota, quota]
+        assert flush_many.await_count == 3
+        flush_one.assert_not_awaited()
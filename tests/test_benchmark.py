@@ -0,0 +1,45 @@
+"""Tests for the offline benchmark harness."""
+import pytest
+
+from ctf_bot.testing.benchmark import percentile, run_benchmark, seed_folder
+from ctf_bot.testing.fake_google import FakeGoogle
+
+
+class TestPercentile:
+    """Test cases for percentile."""
+
+    def test_nearest_rank(self):
+        samples = list(range(1, 101))
+        assert percentile(samples, 50) == 50
+        assert percentile(samples, 99) == 99
+        assert percentile([], 50) == 0.0
+
+
+class TestRunBenchmark:
+    """Small benchmark runs that double as API-call regression tests."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("transport", ["thread", "asyncio"])
+    async def test_add_agenda(self, transport):
+        """Warm agenda adds cost at most a revision check and a batchUpdate each."""
+        async with FakeGoogle() as fake:
+            seed_folder(fake, agenda_rows=2, notes=5, meeting_docs=2)
+            report = await run_benchmark(fake, "add-agenda", transport, concurrency=2, count=6)
+
+        assert report["errors"] == 0
+        assert report["missing_rows"] == 0
+        assert report["api_calls_per_command"] <= 2
+        assert "drive.files.list" not in report["api_calls"]
+        assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"]
+
+    @pytest.mark.asyncio
+    async def test_create_doc(self):
+        """A warm create-doc is one copy, one template revision check and one batchUpdate."""
+        async with FakeGoogle() as fake:
+            seed_folder(fake, agenda_rows=0, notes=0, meeting_docs=2)
+            report = await run_benchmark(fake, "create-doc", "asyncio", concurrency=2, count=4)
+
+        assert report["errors"] == 0
+        assert report["api_calls"] == {
+            "drive.files.copy": 4, "docs.documents.get": 4, "docs.documents.batchUpdate": 4,
+        }
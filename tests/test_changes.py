@@ -0,0 +1,191 @@
+"""Tests for the Drive changes watcher and the cached agenda view."""
+import asyncio
+
+import pytest
+
+from ctf_bot.config import FOLDER_ID, TARGET_DOC_NAME, TEMPLATE_DOC_NAME
+from ctf_bot.integrations.changes import DriveChangeWatcher
+from ctf_bot.integrations.google_async import AsyncGoogleDocsManager
+from ctf_bot.integrations.google_docs import GoogleDocsManager, agenda_rows
+from ctf_bot.testing.fake_google import FakeDocument, FakeGoogle, agenda_content
+
+
+class FakeFeed:
+    """Async callables for DriveChangeWatcher over a list of changed IDs."""
+
+    def __init__(self):
+        self.log = []
+        self.reported = []
+
+    async def start_token(self):
+        return str(len(self.log))
+
+    async def list_changes(self, token):
+        return set(self.log[int(token):]), str(len(self.log))
+
+    async def on_changed(self, ids):
+        self.reported.append(ids)
+
+
+def edit_first_row(fake: FakeGoogle, doc_id: str, text: str) -> None:
+    """Type `text` at the start of the first agenda row, as a person would."""
+    doc = fake.documents[doc_id].render()
+    table = next(el for el in doc["body"]["content"] if "table" in el)
+    cell = table["table"]["tableRows"][1]["tableCells"][0]
+    fake.edit_document(doc_id, [
+        {"insertText": {"location": {"index": cell["content"][0]["startIndex"]}, "text": text}}
+    ])
+
+
+class TestDriveChangeWatcher:
+    """Test cases for DriveChangeWatcher."""
+
+    @pytest.mark.asyncio
+    async def test_reports_changes_since_last_poll(self):
+        feed = FakeFeed()
+        feed.log.append("before-start")
+        watcher = DriveChangeWatcher(feed.start_token, feed.list_changes, feed.on_changed)
+
+        assert await watcher.poll_once() == set()
+        feed.log += ["a", "b", "a"]
+        assert await watcher.poll_once() == {"a", "b"}
+        assert await watcher.poll_once() == set()
+        assert feed.reported == [{"a", "b"}]
+
+    @pytest.mark.asyncio
+    async def test_failed_callback_keeps_token(self):
+        """Changes the caches didn't take in are reported again next poll."""
+        feed = FakeFeed()
+        watcher = DriveChangeWatcher(feed.start_token, feed.list_changes, feed.on_changed)
+        await watcher.poll_once()
+        feed.log.append("a")
+
+        async def broken(ids):
+            raise RuntimeError("refresh failed")
+
+        watcher._on_changed = broken
+        with pytest.raises(RuntimeError):
+            await watcher.poll_once()
+        watcher._on_changed = feed.on_changed
+        assert await watcher.poll_once() == {"a"}
+
+    @pytest.mark.asyncio
+    async def test_freshness(self):
+        now = [100.0]
+        feed = FakeFeed()
+        watcher = DriveChangeWatcher(
+            feed.start_token, feed.list_changes, feed.on_changed,
+            poll_interval=30, clock=lambda: now[0],
+        )
+        assert not watcher.is_fresh()
+        await watcher.poll_once()
+        assert watcher.is_fresh()
+        now[0] += 61
+        assert not watcher.is_fresh()
+
+
+class TestAgendaRows:
+    """Test cases for agenda_rows."""
+
+    def test_first_cell_of_each_row(self):
+        doc = FakeDocument("d", "t", agenda_content(["First", "Second"])).render()
+        assert agenda_rows(doc) == ["First", "Second"]
+
+    def test_missing_table(self):
+        doc = FakeDocument("d", "t", ["No agenda here\n"]).render()
+        with pytest.raises(RuntimeError):
+            agenda_rows(doc)
+
+
+class TestAgainstFakeGoogle:
+    """The cached agenda view end to end."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_reads_are_free(self):
+        """Only the changes feed is polled until the doc actually changes."""
+        async with FakeGoogle() as fake:
+            doc_id = fake.add_document(TARGET_DOC_NAME, agenda_content(["First"]), FOLDER_ID)
+            manager = GoogleDocsManager(fake.service_pool())
+            watcher = DriveChangeWatcher(
+                lambda: asyncio.to_thread(manager.changes_start_token),
+                lambda token: asyncio.to_thread(manager.changed_file_ids, token),
+                lambda ids: asyncio.to_thread(manager.refresh_snapshots, ids),
+            )
+            await watcher.poll_once()
+            assert await asyncio.to_thread(manager.agenda_items, True) == ["First"]
+
+            fake.reset_stats()
+            for _ in range(5):
+                assert await asyncio.to_thread(manager.agenda_items, True) == ["First"]
+            await watcher.poll_once()
+            assert fake.stats()["calls"] == {"drive.changes.list": 1}
+
+            # Our own write patches the snapshot; the change it causes costs
+            # one revision check and no download
+            await asyncio.to_thread(manager.add_agenda_item, "Second")
+            fake.reset_stats()
+            await watcher.poll_once()
+            assert await asyncio.to_thread(manager.agenda_items, True) == ["First", "Second"]
+            assert fake.stats()["calls"] == {"drive.changes.list": 1, "docs.documents.get": 1}
+
+            # Someone else's edit is picked up by the next poll
+            edit_first_row(fake, doc_id, "Edited ")
+            await watcher.poll_once()
+            assert await asyncio.to_thread(manager.agenda_items, True) == [
+                "Edited First", "Second",
+            ]
+
+    @pytest.mark.asyncio
+    async def test_async_manager(self):
+        async with FakeGoogle() as fake:
+            doc_id = fake.add_document(TARGET_DOC_NAME, agenda_content(["First"]), FOLDER_ID)
+            manager = AsyncGoogleDocsManager(fake.async_client())
+            watcher = DriveChangeWatcher(
+                manager.changes_start_token, manager.changed_file_ids, manager.refresh_snapshots
+            )
+            try:
+                await watcher.poll_once()
+                assert await manager.agenda_items(True) == ["First"]
+
+                edit_first_row(fake, doc_id, "Edited ")
+                assert await manager.agenda_items(True) == ["First"]
+                await watcher.poll_once()
+                assert await manager.agenda_items(True) == ["Edited First"]
+                # Without the watcher's word, the revision is checked every time
+                fake.reset_stats()
+                assert await manager.agenda_items() == ["Edited First"]
+                assert fake.stats()["calls"] == {"docs.documents.get": 1}
+            finally:
+                await manager.client.close()
+
+    @pytest.mark.asyncio
+    async def test_trashed_draft_is_forgotten(self):
+        """Docs still accepts writes to a trashed draft, so the feed has to drop it."""
+        async with FakeGoogle() as fake:
+            fake.add_document(TEMPLATE_DOC_NAME, agenda_content(title="Meeting XX"), FOLDER_ID)
+            old_id = fake.add_document(TARGET_DOC_NAME, agenda_content(["First"]), FOLDER_ID)
+            manager = GoogleDocsManager(fake.service_pool())
+            async_manager = AsyncGoogleDocsManager(fake.async_client())
+            try:
+                # Both managers have the draft cached
+                assert await asyncio.to_thread(manager.agenda_items) == ["First"]
+                assert await async_manager.agenda_items() == ["First"]
+                token = str(len(fake.change_log))
+                fake.trash(old_id)
+                for changed, _ in (
+                    await asyncio.to_thread(manager.changed_file_ids, token),
+                    await async_manager.changed_file_ids(token),
+                ):
+                    assert old_id in changed
+
+                await asyncio.to_thread(manager.add_agenda_item, "Second")
+                await async_manager.add_agenda_item("Third")
+            finally:
+                await async_manager.client.close()
+
+        new_id = fake.find(TARGET_DOC_NAME).doc_id
+        assert new_id != old_id
+        assert [row[0] for row in fake.documents[new_id].tables()[0][1:]] == [
+            "Second\n", "Third\n",
+        ]
+        assert [row[0] for row in fake.documents[old_id].tables()[0][1:]] == ["First\n"]
@@ -2,7 +2,12 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
-from ctf_bot.discord_bot import create_bot
+from ctf_bot.config import TARGET_DOC_NAME, TEMPLATE_DOC_NAME
+from ctf_bot.discord_bot import (
+    agenda_failure_report, agenda_listing, bulk_agenda_report, create_bot, parse_doc_fields,
+    split_agenda_items,
+)
+from ctf_bot.dispatcher import QueueFull
 
 
 class TestDiscordBot:
@@ -27,7 +32,10 @@ class TestDiscordBot:
             cmd = bot.get_command('add-agenda')
             await cmd(ctx, item="Test agenda item")
             
-            ctx.reply.assert_called_with("✅ Added to 'meeting draft' agenda table.")
+            ctx.reply.assert_called_with(
+                f"📝 Recorded for the '{TARGET_DOC_NAME}' agenda table. "
+                f"I'll react with ✅ once it's in the doc."
+            )
 
     @pytest.mark.asyncio
     async def test_add_agenda_command_empty_item(self, bot):
@@ -69,4 +77,259 @@ class TestDiscordBot:
             cmd = bot.get_command('add-agenda')
             await cmd(ctx, item="Test agenda item")
             
-            ctx.reply.assert_called_with("Failed to add agenda item: `Test error`")
\ No newline at end of file
+            ctx.reply.assert_called_with("Failed to add agenda item: `Test error`")
+
+    @pytest.mark.asyncio
+    async def test_create_doc_command_busy(self, bot):
+        """A full backlog for the doc gets a busy reply instead of queueing."""
+        ctx = MagicMock()
+        ctx.reply = AsyncMock()
+
+        with patch('ctf_bot.runtime.TenantRuntime.create_doc_key', AsyncMock(return_value="tmpl")), \
+                patch('ctf_bot.dispatcher.DocumentDispatcher.submit') as mock_submit:
+            mock_submit.side_effect = QueueFull("doc")
+
+            cmd = bot.get_command('create-doc')
+            await cmd(ctx, name="Meeting 12")
+
+            ctx.reply.assert_called_with(
+                "⏳ That document is busy right now, please try again in a minute."
+            )
+
+    @pytest.mark.asyncio
+    async def test_bot_stats_command(self, bot):
+        """bot-stats replies with the latency summary in a code block."""
+        ctx = MagicMock()
+        ctx.reply = AsyncMock()
+
+        with patch('ctf_bot.discord_bot.format_stats', return_value="Commands (count, p50, p95):"):
+            cmd = bot.get_command('bot-stats')
+            await cmd(ctx)
+
+        ctx.reply.assert_called_with("```\nCommands (count, p50, p95):\n```")
+
+
+def make_interaction(guild_id=None):
+    interaction = MagicMock()
+    interaction.guild_id = guild_id
+    interaction.channel_id = 555
+    interaction.extras = {}
+    interaction.response.defer = AsyncMock()
+    interaction.edit_original_response = AsyncMock()
+    interaction.original_response = AsyncMock(return_value=MagicMock(id=777))
+    return interaction
+
+
+class TestSlashCommands:
+    """Test cases for the /add-agenda and /create-doc slash commands."""
+
+    @pytest.fixture
+    def bot(self):
+        return create_bot()
+
+    @pytest.mark.asyncio
+    async def test_add_agenda_defers_then_journals_under_the_reply(self, bot):
+        interaction = make_interaction()
+
+        with patch('asyncio.to_thread', AsyncMock()) as mock_thread:
+            await bot.tree.get_command('add-agenda').callback(interaction, item=" Test item ")
+
+        interaction.response.defer.assert_awaited_once_with(thinking=True)
+        assert "started_at" in interaction.extras
+        mock_thread.assert_awaited_once()
+        assert mock_thread.await_args.args[1:] == ("Test item", 555, 777)
+        interaction.edit_original_response.assert_awaited_with(
+            content=f"📝 Recorded for the '{TARGET_DOC_NAME}' agenda table. "
+                    f"I'll react with ✅ once it's in the doc."
+        )
+
+    @pytest.mark.asyncio
+    async def test_create_doc_with_template_and_fields(self, bot):
+        interaction = make_interaction()
+
+        with patch('ctf_bot.runtime.TenantRuntime.call', AsyncMock(return_value="doc-1")) as call:
+            await bot.tree.get_command('create-doc').callback(
+                interaction, name="meeting 12", template="Quals template", fields="ctf=Quals",
+            )
+
+        interaction.response.defer.assert_awaited_once_with(thinking=True)
+        call.assert_any_await("create_from_template", "meeting 12", "Quals template", {"ctf": "Quals"})
+        interaction.edit_original_response.assert_awaited_with(
+            content="✅ Created document 'meeting 12' from template. Document ID: doc-1"
+        )
+
+    @pytest.mark.asyncio
+    async def test_create_doc_busy(self, bot):
+        interaction = make_interaction()
+
+        with patch('ctf_bot.runtime.TenantRuntime.create_doc_key', AsyncMock(return_value="tmpl")), \
+                patch('ctf_bot.dispatcher.DocumentDispatcher.submit', side_effect=QueueFull("doc")):
+            await bot.tree.get_command('create-doc').callback(interaction, name="meeting 12")
+
+        interaction.edit_original_response.assert_awaited_once_with(
+            content="⏳ That document is busy right now, please try again in a minute."
+        )
+
+    @pytest.mark.asyncio
+    async def test_create_docs_queue_by_template_not_name(self, bot):
+        """Differently named docs from one template share a queue."""
+        call = AsyncMock(
+            side_effect=lambda method, *args: "tmpl-1" if method == "template_id" else "doc-1"
+        )
+
+        with patch('ctf_bot.runtime.TenantRuntime.call', call), \
+                patch('ctf_bot.dispatcher.DocumentDispatcher.submit',
+                      side_effect=QueueFull("tmpl-1")) as submit:
+            for name in ("meeting 12", "meeting 13"):
+                await bot.tree.get_command('create-doc').callback(make_interaction(), name=name)
+
+        call.assert_any_await("template_id", None)
+        assert [c.args[0] for c in submit.call_args_list] == ["tmpl-1", "tmpl-1"]
+
+    @pytest.mark.asyncio
+    async def test_create_doc_template_missing(self, bot):
+        interaction = make_interaction()
+
+        with patch('ctf_bot.runtime.TenantRuntime.call',
+                   AsyncMock(side_effect=RuntimeError("Template 'Nope' not found in folder."))):
+            await bot.tree.get_command('create-doc').callback(
+                interaction, name="meeting 12", template="Nope"
+            )
+
+        interaction.edit_original_response.assert_awaited_once_with(
+            content="Failed to create document: `Template 'Nope' not found in folder.`"
+        )
+
+    @pytest.mark.asyncio
+    async def test_create_doc_bad_fields(self, bot):
+        interaction = make_interaction()
+
+        await bot.tree.get_command('create-doc').callback(
+            interaction, name="meeting 12", fields="ctf"
+        )
+
+        interaction.edit_original_response.assert_awaited_once_with(
+            content="Template fields must look like `key=value | key=value`, got `ctf`."
+        )
+
+    @pytest.mark.asyncio
+    async def test_autocomplete_answers_from_the_folder_index(self, bot):
+        """Typing never calls Google; choices come from the index."""
+        interaction = make_interaction()
+        params = bot.tree.get_command('create-doc')._params
+
+        with patch('ctf_bot.runtime.TenantRuntime.call', AsyncMock()) as call, \
+                patch('ctf_bot.runtime.FolderIndex.suggest',
+                      return_value=["meeting 11", "meeting 10"]) as suggest:
+            names = await params["name"].autocomplete(interaction, "meet")
+            templates = await params["template"].autocomplete(interaction, "")
+
+        call.assert_not_awaited()
+        suggest.assert_any_call("meet")
+        suggest.assert_any_call("", TEMPLATE_DOC_NAME)
+        assert [c.value for c in names] == ["meeting 11", "meeting 10"]
+        assert [c.name for c in templates] == ["meeting 11", "meeting 10"]
+
+
+class TestParseDocFields:
+    """Test cases for parse_doc_fields."""
+
+    def test_name_and_fields(self):
+        assert parse_doc_fields(" Meeting 12 | ctf = Example CTF | date=2026-10-20") == (
+            "Meeting 12", {"ctf": "Example CTF", "date": "2026-10-20"},
+        )
+        assert parse_doc_fields("Meeting 12") == ("Meeting 12", {})
+
+    def test_rejects_bad_parts(self):
+        with pytest.raises(ValueError):
+            parse_doc_fields("Meeting 12 | no equals sign")
+        with pytest.raises(ValueError):
+            parse_doc_fields("Meeting 12 | bad key=x")
+
+
+class TestBulkAgenda:
+    """Test cases for !add-agenda-bulk."""
+
+    def test_split_agenda_items(self):
+        text = "# Agenda\n- First\n\n2) Second\n* [ ] Third\n  plain line  \n"
+        assert split_agenda_items(text) == ["First", "Second", "Third", "plain line"]
+
+    def test_report(self):
+        assert bulk_agenda_report(4, [3]).splitlines() == [
+            f"📝 Recorded 3 item(s) for the '{TARGET_DOC_NAME}' agenda table. "
+            f"I'll react with ✅ once they're in the doc.",
+            "❌ #3: too long (max 500 chars), skipped",
+        ]
+        assert bulk_agenda_report(1, [1]).splitlines() == [
+            f"Nothing recorded for the '{TARGET_DOC_NAME}' agenda table.",
+            "❌ #1: too long (max 500 chars), skipped",
+        ]
+
+    def test_failure_report_is_one_message(self):
+        assert agenda_failure_report([("a", "boom")]) == (
+            "❌ Couldn't add this to the agenda after several tries: `boom`"
+        )
+        report = agenda_failure_report([(f"item {n}", "quota exceeded") for n in range(200)])
+        assert report.startswith("❌ Couldn't add 200 item(s) to the agenda")
+        assert len(report) <= 1900
+        assert report.endswith("more")
+
+    @pytest.mark.asyncio
+    async def test_command_journals_items_and_replies_at_once(self):
+        """Items from the text and an attachment are journaled together; the reply doesn't wait."""
+        bot = create_bot()
+        ctx = MagicMock()
+        ctx.reply = AsyncMock()
+        attachment = MagicMock(filename="agenda.md", size=20)
+        attachment.read = AsyncMock(return_value=b"- from file\n")
+        ctx.message.attachments = [attachment]
+
+        with patch('ctf_bot.runtime.AgendaJournal.append_many', return_value=[1, 2]) as append, \
+                patch('ctf_bot.runtime.JournalReplayer.wake') as wake:
+            await bot.get_command('add-agenda-bulk')(ctx, text="- typed")
+
+        assert append.call_args.args == (["typed", "from file"], ctx.channel.id, ctx.message.id)
+        wake.assert_called_once()
+        ctx.reply.assert_called_once_with(
+            f"📝 Recorded 2 item(s) for the '{TARGET_DOC_NAME}' agenda table. "
+            f"I'll react with ✅ once they're in the doc."
+        )
+        ctx.channel.typing.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_command_rejects_other_attachments(self):
+        bot = create_bot()
+        ctx = MagicMock()
+        ctx.reply = AsyncMock()
+        ctx.message.attachments = [MagicMock(filename="agenda.pdf", size=20)]
+
+        await bot.get_command('add-agenda-bulk')(ctx, text="")
+        ctx.reply.assert_called_once_with("Only .txt and .md attachments can be imported.")
+
+
+class TestAgendaCommand:
+    """Test cases for !agenda."""
+
+    def test_listing(self):
+        assert agenda_listing(["First", "", "Third"]).splitlines() == [
+            f"**{TARGET_DOC_NAME}** agenda:", "1. First", "2. (empty)", "3. Third",
+        ]
+        assert agenda_listing([]) == f"The '{TARGET_DOC_NAME}' agenda is empty."
+
+    def test_listing_fits_one_message(self):
+        listing = agenda_listing(["x" * 400] * 10)
+        assert len(listing) <= 1900
+        assert listing.endswith("… and 6 more")
+
+    @pytest.mark.asyncio
+    async def test_command_trusts_cache_only_while_watcher_is_fresh(self):
+        bot = create_bot()
+        ctx = MagicMock()
+        ctx.reply = AsyncMock()
+
+        with patch('ctf_bot.runtime.TenantRuntime.call', AsyncMock(return_value=["First"])) as call, \
+                patch('ctf_bot.runtime.DriveChangeWatcher.is_fresh', return_value=True):
+            await bot.get_command('agenda')(ctx)
+
+        call.assert_called_once_with("agenda_items", True)
+        ctx.reply.assert_called_once_with(agenda_listing(["First"]))
@@ -0,0 +1,98 @@
+"""Tests for the per-document dispatcher."""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from ctf_bot.dispatcher import DocumentDispatcher, QueueFull
+from ctf_bot.runtime import TenantRuntime
+from ctf_bot.tenants import Tenant
+
+
+class TestDocumentDispatcher:
+    """Test cases for DocumentDispatcher."""
+
+    @pytest.mark.asyncio
+    async def test_same_document_runs_in_order(self):
+        """Jobs for one document never overlap and keep their order."""
+        dispatcher = DocumentDispatcher(max_backlog=10, max_parallel=4)
+        log = []
+
+        async def run(payload):
+            log.append(("start", payload))
+            await asyncio.sleep(0.01)
+            log.append(("end", payload))
+            return payload
+
+        futures = [dispatcher.submit("doc", run, i)[1] for i in range(3)]
+        assert await asyncio.gather(*futures) == [0, 1, 2]
+        assert log == [
+            ("start", 0), ("end", 0), ("start", 1), ("end", 1), ("start", 2), ("end", 2),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_different_documents_run_in_parallel(self):
+        dispatcher = DocumentDispatcher(max_backlog=10, max_parallel=4)
+        running = []
+        peak = []
+
+        async def run(payload):
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+
+        await asyncio.gather(*(dispatcher.submit(f"doc{i}", run, i)[1] for i in range(3)))
+        assert max(peak) == 3
+
+    @pytest.mark.asyncio
+    async def test_positions_and_backlog_limit(self):
+        """Callers learn how many jobs are ahead; a full backlog is refused."""
+        dispatcher = DocumentDispatcher(max_backlog=2, max_parallel=4)
+        release = asyncio.Event()
+
+        async def run(payload):
+            await release.wait()
+
+        ahead0, first = dispatcher.submit("doc", run, 0)
+        ahead1, second = dispatcher.submit("doc", run, 1)
+        assert (ahead0, ahead1) == (0, 1)
+        with pytest.raises(QueueFull):
+            dispatcher.submit("doc", run, 2)
+        # Other documents have their own backlog
+        dispatcher.submit("other", run, 0)
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert dispatcher.backlog("doc") == 0
+
+    @pytest.mark.asyncio
+    async def test_runner_exception_reaches_the_caller(self):
+        dispatcher = DocumentDispatcher(max_backlog=10, max_parallel=1)
+
+        async def run(payload):
+            raise RuntimeError("boom")
+
+        _, future = dispatcher.submit("doc", run, 0)
+        with pytest.raises(RuntimeError, match="boom"):
+            await future
+
+
+class TestTenantRuntimeQueues:
+    """The runtime keys its dispatcher by the document a job writes to."""
+
+    @pytest.mark.asyncio
+    async def test_agenda_batches_queue_on_the_draft(self, tmp_path):
+        runtime = TenantRuntime(Tenant("team-a", "folder-a", state_dir=tmp_path))
+        calls = []
+
+        async def call(method, *args):
+            calls.append((method, *args))
+            return "draft-1" if method == "target_doc_id" else [None] * len(args[0])
+
+        with patch.object(runtime, "call", call), \
+                patch.object(runtime.dispatcher, "submit", wraps=runtime.dispatcher.submit) as submit:
+            assert await runtime.add_agenda_items(["First", "Second"]) == [None, None]
+
+        assert submit.call_args.args[0] == "draft-1"
+        assert calls == [("target_doc_id",), ("add_agenda_items", ["First", "Second"])]
@@ -0,0 +1,56 @@
+"""Tests for the doc ID resolution cache."""
+from unittest.mock import MagicMock
+
+from ctf_bot.integrations.doc_cache import DocIdCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDocIdCache:
+    """Test cases for DocIdCache."""
+
+    def test_resolve_caches_lookup(self):
+        """A second resolve is served from the cache."""
+        cache = DocIdCache(ttl=60, max_size=10)
+        lookup = MagicMock(return_value="doc_id")
+        assert cache.resolve("folder", "name", lookup) == "doc_id"
+        assert cache.resolve("folder", "name", lookup) == "doc_id"
+        lookup.assert_called_once()
+
+    def test_entries_expire(self):
+        """Entries older than the TTL are dropped."""
+        clock = FakeClock()
+        cache = DocIdCache(ttl=60, max_size=10, clock=clock)
+        cache.put("folder", "name", "doc_id")
+        clock.now = 59
+        assert cache.get("folder", "name") == "doc_id"
+        clock.now = 60
+        assert cache.get("folder", "name") is None
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted first."""
+        cache = DocIdCache(ttl=60, max_size=2)
+        cache.put("folder", "a", "id_a")
+        cache.put("folder", "b", "id_b")
+        cache.get("folder", "a")
+        cache.put("folder", "c", "id_c")
+        assert cache.get("folder", "a") == "id_a"
+        assert cache.get("folder", "b") is None
+        assert cache.get("folder", "c") == "id_c"
+
+    def test_invalidate_file(self):
+        """Invalidating a file ID drops every entry pointing at it."""
+        cache = DocIdCache(ttl=60, max_size=10)
+        cache.put("folder", "a", "same")
+        cache.put("other", "a", "same")
+        cache.put("folder", "b", "different")
+        cache.invalidate_file("same")
+        assert cache.get("folder", "a") is None
+        assert cache.get("other", "a") is None
+        assert cache.get("folder", "b") == "different"
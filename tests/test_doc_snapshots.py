@@ -0,0 +1,62 @@
+"""Tests for the document snapshot cache."""
+from unittest.mock import MagicMock
+
+from ctf_bot.integrations.doc_snapshots import DocSnapshotCache
+
+
+def make_service(*responses):
+    """A docs service whose documents().get().execute() returns `responses` in order."""
+    service = MagicMock()
+    service.documents.return_value.get.return_value.execute.side_effect = list(responses)
+    return service
+
+
+class TestDocSnapshotCache:
+    """Test cases for DocSnapshotCache."""
+
+    def test_first_get_fetches_masked_doc(self):
+        """A cold cache downloads the doc with the field mask."""
+        service = make_service({'revisionId': 'r1', 'body': {}})
+        cache = DocSnapshotCache('revisionId,body', max_size=4)
+
+        assert cache.get(service, 'doc')['revisionId'] == 'r1'
+        service.documents.return_value.get.assert_called_once_with(
+            documentId='doc', fields='revisionId,body'
+        )
+
+    def test_unchanged_revision_reuses_snapshot(self):
+        """Only the revision is fetched when the doc hasn't changed."""
+        snapshot = {'revisionId': 'r1', 'body': {'content': []}}
+        service = make_service(snapshot, {'revisionId': 'r1'})
+        cache = DocSnapshotCache('revisionId,body', max_size=4)
+
+        cache.get(service, 'doc')
+        assert cache.get(service, 'doc') is snapshot
+        last_call = service.documents.return_value.get.call_args
+        assert last_call.kwargs['fields'] == 'revisionId'
+
+    def test_changed_revision_refetches(self):
+        """A new revision triggers a full masked fetch."""
+        service = make_service(
+            {'revisionId': 'r1'}, {'revisionId': 'r2'}, {'revisionId': 'r2', 'body': {}}
+        )
+        cache = DocSnapshotCache('revisionId,body', max_size=4)
+
+        cache.get(service, 'doc')
+        assert cache.get(service, 'doc') == {'revisionId': 'r2', 'body': {}}
+        assert service.documents.return_value.get.call_count == 3
+
+    def test_store_without_revision_invalidates(self):
+        """A snapshot with no known revision is never served."""
+        cache = DocSnapshotCache('revisionId', max_size=4)
+        cache.store('doc', {'revisionId': 'r1'})
+        cache.store('doc', {'revisionId': None})
+        assert cache.peek('doc') is None
+
+    def test_lru_bound(self):
+        """Only `max_size` snapshots are kept."""
+        cache = DocSnapshotCache('revisionId', max_size=1)
+        cache.store('a', {'revisionId': 'r1'})
+        cache.store('b', {'revisionId': 'r1'})
+        assert cache.peek('a') is None
+        assert cache.peek('b') is not None
@@ -0,0 +1,75 @@
+"""Tests for the Markdown meeting archive export."""
+import asyncio
+import json
+
+import pytest
+
+from ctf_bot.__main__ import main
+from ctf_bot.config import FOLDER_ID, TARGET_DOC_NAME
+from ctf_bot.export import doc_to_markdown, export_filename, export_meeting_docs
+from ctf_bot.integrations.google_docs import DriveFile, GoogleDocsManager
+from ctf_bot.testing.fake_google import FakeDocument, FakeGoogle, agenda_content
+
+
+class TestMarkdown:
+    """Test cases for converting docs to Markdown."""
+
+    def test_agenda_table_and_paragraphs(self):
+        content = agenda_content(["Pwn | recap", "Crypto"], title="Meeting 07")
+        doc = FakeDocument("doc1", "Meeting 07", content).render()
+        doc["body"]["content"][1]["paragraph"]["paragraphStyle"]["namedStyleType"] = "HEADING_1"
+
+        markdown = doc_to_markdown(doc, DriveFile("doc1", "Meeting 07", "2026-10-01T00:00:00.000Z"))
+
+        assert "agenda_items: 2\n" in markdown
+        assert "## Meeting 07\n" in markdown
+        assert "| Item |" in markdown
+        assert "| Pwn \\| recap |" in markdown
+        assert "| Crypto |" in markdown
+
+    def test_filenames_are_unique_per_doc(self):
+        assert export_filename(DriveFile("abcdefghij", "Meeting 07: Quals!", "")) == (
+            "meeting-07-quals-abcdefgh.md"
+        )
+
+
+class TestAgainstFakeGoogle:
+    """The export end to end."""
+
+    @pytest.mark.asyncio
+    async def test_incremental_export(self, tmp_path):
+        async with FakeGoogle() as fake:
+            first = fake.add_document("meeting 01", agenda_content(["Intro"]), FOLDER_ID)
+            second = fake.add_document("meeting 02", agenda_content(["Quals"]), FOLDER_ID)
+            fake.add_document(TARGET_DOC_NAME, agenda_content(["Draft"]), FOLDER_ID)
+            fake.add_document("notes", agenda_content(["Not a meeting"]), FOLDER_ID)
+            manager = GoogleDocsManager(fake.service_pool())
+
+            result = await asyncio.to_thread(export_meeting_docs, manager, tmp_path, 4)
+            assert sorted(result.exported) == sorted([first, second])
+            assert not result.failed
+
+            fake.edit_document(second, [{"insertText": {"location": {"index": 1}, "text": "x"}}])
+            fake.files[second]["modifiedTime"] = "2999-01-01T00:00:00.000Z"
+            fake.reset_stats()
+            result = await asyncio.to_thread(export_meeting_docs, manager, tmp_path, 4)
+
+        assert result.exported == [second]
+        assert result.unchanged == [first]
+        assert fake.stats()["calls"]["docs.documents.get"] == 1
+
+        manifest = json.loads((tmp_path / "manifest.json").read_text())
+        assert set(manifest) == {first, second}
+        assert manifest[second]["modifiedTime"] == "2999-01-01T00:00:00.000Z"
+        assert manifest[second]["revisionId"] == fake.documents[second].revision_id
+        assert "| Quals |" in (tmp_path / manifest[second]["path"]).read_text()
+
+
+class TestCommandLine:
+    """Test cases for the ctf-bot entry point."""
+
+    def test_export_unknown_tenant(self, capsys):
+        with pytest.raises(SystemExit) as exit_info:
+            main(["export", "--tenant", "nobody"])
+        assert exit_info.value.code == 2
+        assert "Unknown tenant 'nobody'" in capsys.readouterr().out
@@ -0,0 +1,258 @@
+"""Tests for the fake Docs/Drive server."""
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from googleapiclient.errors import HttpError
+
+from ctf_bot.integrations.google_async import AsyncGoogleDocsManager
+from ctf_bot.integrations.google_docs import (
+    AGENDA_DOC_FIELDS,
+    DriveFile,
+    GoogleDocsManager,
+    add_row_and_fill_refetch,
+    add_rows_and_fill,
+    count_meeting_docs,
+    docs_named_query,
+    find_doc_in_folder,
+    meeting_docs_query,
+)
+from ctf_bot.integrations.meeting_numbers import MeetingNumberAllocator
+from ctf_bot.integrations.scheduler import GoogleRequestScheduler
+from ctf_bot.testing.fake_google import (
+    FakeApiError,
+    FakeDocument,
+    FakeGoogle,
+    agenda_content,
+    apply_field_mask,
+    matches_query,
+    parse_field_mask,
+)
+
+
+@pytest_asyncio.fixture
+async def fake():
+    async with FakeGoogle() as fake:
+        fake.doc_id = fake.add_document("test_doc", agenda_content(["First"]), "test_folder_id")
+        yield fake
+
+
+class TestFakeDocument:
+    """Test cases for the document model."""
+
+    def test_layout_matches_docs_indices(self, agenda_doc):
+        """Rendered indices match a real doc with the same structure."""
+        rendered = FakeDocument("d", "t", agenda_content()).render()
+        table = rendered["body"]["content"][2]
+        expected = agenda_doc["body"]["content"][2]
+        assert (table["startIndex"], table["endIndex"]) == (15, 26)
+        assert [
+            (cell["startIndex"], cell["endIndex"])
+            for cell in table["table"]["tableRows"][0]["tableCells"]
+        ] == [
+            (cell["startIndex"], cell["endIndex"])
+            for cell in expected["table"]["tableRows"][0]["tableCells"]
+        ]
+
+    def test_batch_update_is_atomic(self):
+        """A bad request rolls back the whole batch and keeps the revision."""
+        doc = FakeDocument("d", "t", agenda_content())
+        with pytest.raises(FakeApiError) as excinfo:
+            doc.batch_update({"requests": [
+                {"insertText": {"location": {"index": 1}, "text": "Hi "}},
+                {"insertText": {"location": {"index": 18}, "text": "x"}},  # table marker, shifted by 3
+            ]})
+        assert "requests[1].insertText" in excinfo.value.message
+        assert doc.content[0] == "Agenda items:\n"
+        assert doc.revision_id == "rev1"
+
+    def test_required_revision(self):
+        doc = FakeDocument("d", "t", agenda_content())
+        doc.batch_update({"requests": [], "writeControl": {"requiredRevisionId": "rev1"}})
+        with pytest.raises(FakeApiError) as excinfo:
+            doc.batch_update({"requests": [], "writeControl": {"requiredRevisionId": "rev1"}})
+        assert excinfo.value.code == 400
+        assert "revision" in excinfo.value.message
+
+    def test_replace_all_text(self):
+        doc = FakeDocument("d", "t", agenda_content(title="Meeting XX"))
+        resp = doc.batch_update({"requests": [{"replaceAllText": {
+            "containsText": {"text": "XX", "matchCase": True}, "replaceText": "07",
+        }}]})
+        assert resp["replies"] == [{"replaceAllText": {"occurrencesChanged": 1}}]
+        assert doc.content[0] == "Meeting 07\n"
+
+
+class TestFieldMasks:
+    """Test cases for partial responses."""
+
+    def test_nested_and_path_masks(self):
+        value = {"a": 1, "b": [{"c": 2, "d": 3}], "e": {"f": 4, "g": 5}}
+        assert apply_field_mask(value, parse_field_mask("a,b(c),e/f")) == {
+            "a": 1, "b": [{"c": 2}], "e": {"f": 4},
+        }
+
+    def test_agenda_mask_parses(self):
+        mask = parse_field_mask(AGENDA_DOC_FIELDS)
+        assert set(mask) == {"revisionId", "body"}
+
+
+class TestDriveQueries:
+    """Test cases for the Drive query subset."""
+
+    def test_meeting_docs_query(self):
+        q = meeting_docs_query("folder")
+        file = {"name": "meeting 03", "parents": ["folder"], "trashed": False,
+                "mimeType": "application/vnd.google-apps.document"}
+        assert matches_query(q, file)
+        assert not matches_query(q, dict(file, name="notes"))
+        assert not matches_query(q, dict(file, parents=["other"]))
+        assert not matches_query(q, dict(file, trashed=True))
+
+    def test_docs_named_query(self):
+        q = docs_named_query("folder", ["a", "b"])
+        file = {"name": "a", "parents": ["folder"], "trashed": False,
+                "mimeType": "application/vnd.google-apps.document"}
+        assert matches_query(q, file)
+        assert matches_query(q, dict(file, name="b"))
+        assert not matches_query(q, dict(file, name="c"))
+        assert not matches_query(q, dict(file, parents=["other"]))
+
+
+class TestAgainstGoogleDocsHelpers:
+    """The real thread-transport code paths, end to end against the fake."""
+
+    @pytest.mark.asyncio
+    async def test_index_arithmetic_and_refetch_paths_agree(self, fake):
+        """Both agenda write paths fill the first cell of new rows."""
+        pool = fake.service_pool()
+
+        def write():
+            add_rows_and_fill(pool.docs_service, fake.doc_id, ["Two", "Three"])
+            add_row_and_fill_refetch(pool.docs_service, fake.doc_id, "Four")
+
+        await asyncio.to_thread(write)
+        rows = fake.documents[fake.doc_id].tables()[0]
+        assert [row[0] for row in rows] == ["Item\n", "First\n", "Two\n", "Three\n", "Four\n"]
+        assert all(row[1] == "\n" for row in rows)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("transport", ["thread", "asyncio"])
+    async def test_write_applied_before_a_500_is_not_repeated(self, fake, transport):
+        """An agenda insert that went in but was answered with a 500 adds one row, not two."""
+        scheduler = GoogleRequestScheduler({}, max_retries=3)
+        fake.lose_responses("docs.documents.batchUpdate")
+        if transport == "asyncio":
+            manager = AsyncGoogleDocsManager(fake.async_client(scheduler))
+            errors = await manager.add_agenda_items(["Second"])
+            await manager.client.close()
+        else:
+            manager = GoogleDocsManager(fake.service_pool(scheduler))
+            errors = await asyncio.to_thread(manager.add_agenda_items, ["Second"])
+
+        assert errors == [None]
+        rows = fake.documents[fake.doc_id].tables()[0]
+        assert [row[0] for row in rows] == ["Item\n", "First\n", "Second\n"]
+        assert fake.stats()["calls"]["docs.documents.batchUpdate"] == 1
+
+    @pytest.mark.asyncio
+    async def test_write_lost_with_a_500_is_reported(self, fake):
+        """A 500 that really was a failure still reaches the caller (the journal retries it)."""
+        manager = GoogleDocsManager(fake.service_pool(GoogleRequestScheduler({}, max_retries=3)))
+        with patch.object(fake.documents[fake.doc_id], "batch_update",
+                          side_effect=FakeApiError(500, "Internal error encountered.")):
+            errors = await asyncio.to_thread(manager.add_agenda_items, ["Second"])
+
+        assert errors[0].resp.status == 500
+        assert [row[0] for row in fake.documents[fake.doc_id].tables()[0]] == ["Item\n", "First\n"]
+
+    @pytest.mark.asyncio
+    async def test_masked_get_is_smaller(self, fake):
+        """The agenda field mask cuts the response size."""
+        pool = fake.service_pool()
+        docs = pool.docs_service
+
+        await asyncio.to_thread(lambda: docs.documents().get(documentId=fake.doc_id).execute())
+        full = fake.stats()["bytes_sent"]
+        fake.reset_stats()
+        await asyncio.to_thread(
+            lambda: docs.documents().get(documentId=fake.doc_id, fields=AGENDA_DOC_FIELDS).execute()
+        )
+        assert fake.stats()["bytes_sent"] < full / 2
+
+    @pytest.mark.asyncio
+    async def test_drive_lookups(self, fake):
+        """files.list honours the queries and pagination the bot relies on."""
+        for n in range(3):
+            fake.add_document(f"meeting {n}", agenda_content(), "test_folder_id")
+        drive = fake.service_pool().drive_service
+
+        found = await asyncio.to_thread(find_doc_in_folder, drive, "test_folder_id", "test_doc")
+        assert found == fake.doc_id
+        assert await asyncio.to_thread(count_meeting_docs, drive, "test_folder_id") == 3
+
+    @pytest.mark.asyncio
+    async def test_injected_errors(self):
+        """error_rate turns requests into retryable 429s."""
+        async with FakeGoogle(error_rate=1.0) as fake:
+            doc_id = fake.add_document("d", agenda_content(), "f")
+            docs = fake.service_pool().docs_service
+            with pytest.raises(HttpError) as excinfo:
+                await asyncio.to_thread(lambda: docs.documents().get(documentId=doc_id).execute())
+        assert excinfo.value.resp.status == 429
+        assert fake.stats()["throttled"] == 1
+
+
+class TestFolderLookups:
+    """Grouped Drive lookups on both transports."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("transport", ["thread", "asyncio"])
+    async def test_lookup_folder_is_one_round_trip(self, transport):
+        """Several names and the meeting count cost one round trip together."""
+        async with FakeGoogle(latency=0.2) as fake:
+            doc_id = fake.add_document("test_doc", agenda_content(), "test_folder_id")
+            fake.add_document("meeting template", agenda_content(), "test_folder_id", modified=1)
+            newer = fake.add_document("meeting template", agenda_content(), "test_folder_id")
+            fake.add_document("meeting 01", agenda_content(), "test_folder_id")
+            names = ["test_doc", "meeting template", "missing"]
+
+            start = time.perf_counter()
+            if transport == "asyncio":
+                manager = AsyncGoogleDocsManager(fake.async_client())
+                found = await manager.lookup_folder(names, count_meetings=True)
+                await manager.client.close()
+            else:
+                manager = GoogleDocsManager(fake.service_pool())
+                found = await asyncio.to_thread(manager.lookup_folder, names, True)
+            elapsed = time.perf_counter() - start
+
+        assert set(found.files) == {"test_doc", "meeting template"}
+        assert found.files["meeting template"].id == newer
+        assert found.files["test_doc"] == DriveFile(
+            doc_id, "test_doc", fake.files[doc_id]["modifiedTime"]
+        )
+        assert found.meeting_docs == 1
+        assert fake.stats()["calls"] == {"drive.files.list": 2}
+        assert elapsed < 0.39
+
+    @pytest.mark.asyncio
+    async def test_missing_draft_uses_one_lookup(self, tmp_path):
+        """Creating a missing draft finds it and the template with one query."""
+        async with FakeGoogle() as fake:
+            fake.add_document("meeting template", agenda_content(title="Meeting XX"),
+                              "test_folder_id")
+            manager = GoogleDocsManager(fake.service_pool())
+            manager.meeting_numbers = MeetingNumberAllocator(
+                tmp_path / "numbers.sqlite3", "test_folder_id", None
+            )
+            manager.meeting_numbers.reconcile(2)
+
+            doc_id = await asyncio.to_thread(manager.doc_id_cache.resolve, "test_folder_id",
+                                             "test_doc", manager._find_target_doc)
+
+        assert fake.documents[doc_id].content[0] == "Meeting 03\n"
+        assert fake.stats()["calls"]["drive.files.list"] == 1
+        assert manager.doc_id_cache.get("test_folder_id", "meeting template") is not None
@@ -0,0 +1,121 @@
+"""Tests for the in-memory folder index behind slash command autocomplete."""
+import asyncio
+
+import pytest
+
+from ctf_bot.config import FOLDER_ID, TEMPLATE_DOC_NAME
+from ctf_bot.integrations.folder_index import MAX_CHOICES, FolderIndex
+from ctf_bot.integrations.google_async import AsyncGoogleDocsManager
+from ctf_bot.integrations.google_docs import DriveFile, GoogleDocsManager
+from ctf_bot.integrations.provisioner import staged_name
+from ctf_bot.testing.fake_google import FakeGoogle
+
+
+def docs(*names):
+    """DriveFiles in the given (newest first) order."""
+    return [DriveFile(f"id-{n}", name, f"2026-01-{30 - n:02d}T00:00:00.000Z")
+            for n, name in enumerate(names)]
+
+
+def index_of(*names) -> FolderIndex:
+    index = FolderIndex(lambda: None)
+    index.docs = docs(*names)
+    return index
+
+
+class TestSuggest:
+    """Test cases for matching doc names."""
+
+    def test_prefix_matches_first_then_newest(self):
+        index = index_of("Old meeting 03", "meeting 05", "meeting notes", "Quals recap")
+        assert index.suggest("meet") == ["meeting 05", "meeting notes", "Old meeting 03"]
+
+    def test_case_insensitive_and_empty_query(self):
+        index = index_of("Meeting 05", "Quals recap")
+        assert index.suggest("  QUALS ") == ["Quals recap"]
+        assert index.suggest("") == ["Meeting 05", "Quals recap"]
+
+    def test_limits_and_duplicates(self):
+        index = index_of("x" * 101, *[f"meeting {n}" for n in range(40)], "meeting 1")
+        names = index.suggest("")
+        assert len(names) == MAX_CHOICES
+        assert "x" * 101 not in names
+        assert names.count("meeting 1") == 1
+
+    def test_templates_only(self):
+        index = index_of("meeting 05", "Quals Template", "meeting draft", TEMPLATE_DOC_NAME)
+        assert index.suggest("", TEMPLATE_DOC_NAME) == ["Quals Template", TEMPLATE_DOC_NAME]
+
+
+class TestRefresh:
+    """Test cases for keeping the index current."""
+
+    @pytest.mark.asyncio
+    async def test_refreshes_on_start_and_wake(self):
+        listings = [docs("meeting 01"), docs("meeting 02", "meeting 01")]
+        calls = []
+
+        async def list_docs():
+            calls.append(1)
+            return listings[min(len(calls), len(listings)) - 1]
+
+        index = FolderIndex(list_docs, refresh_interval=60, clock=lambda: 42.0)
+        index.start()
+        try:
+            await asyncio.sleep(0)
+            assert index.suggest("") == ["meeting 01"]
+            assert index.updated_at == 42.0
+
+            index.wake()
+            await asyncio.sleep(0.01)
+            assert len(calls) == 2
+            assert index.suggest("") == ["meeting 02", "meeting 01"]
+        finally:
+            index.task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_leaves_out_staged_copies(self):
+        async def list_docs():
+            return docs(staged_name(7), "Quals template", TEMPLATE_DOC_NAME)
+
+        index = FolderIndex(list_docs)
+        await index.refresh()
+        assert index.suggest("", TEMPLATE_DOC_NAME) == ["Quals template", TEMPLATE_DOC_NAME]
+        assert index.suggest("copy") == []
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_old_listing(self):
+        async def list_docs():
+            raise RuntimeError("Drive is down")
+
+        index = FolderIndex(list_docs, refresh_interval=60)
+        index.docs = docs("meeting 01")
+        index.start()
+        try:
+            await asyncio.sleep(0)
+            assert index.suggest("") == ["meeting 01"]
+        finally:
+            index.task.cancel()
+
+
+class TestListFolderDocs:
+    """Both docs managers list the folder's docs newest first."""
+
+    @pytest.mark.asyncio
+    async def test_sync_and_async_agree(self):
+        async with FakeGoogle() as fake:
+            fake.add_document("meeting 01", ["One\n"], FOLDER_ID, modified=1_700_000_000)
+            newest = fake.add_document("meeting 02", ["Two\n"], FOLDER_ID, modified=1_700_000_100)
+            fake.add_document("elsewhere", ["Other\n"], "another-folder")
+
+            manager = GoogleDocsManager(fake.service_pool())
+            listed = await asyncio.to_thread(manager.list_folder_docs)
+            async_manager = AsyncGoogleDocsManager(fake.async_client())
+            try:
+                assert await async_manager.list_folder_docs() == listed
+            finally:
+                await async_manager.client.close()
+
+        assert [f.name for f in listed] == ["meeting 02", "meeting 01"]
+        assert listed[0].id == newest
+        assert listed[0].modified_time == fake.files[newest]["modifiedTime"]
@@ -0,0 +1,192 @@
+"""Tests for the native asyncio Google client."""
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from google.auth import jwt
+from googleapiclient.errors import HttpError
+
+from ctf_bot.integrations.google_async import (
+    AsyncGoogleClient,
+    AsyncGoogleDocsManager,
+    AsyncServiceAccountCredentials,
+)
+from ctf_bot.integrations.tokens import TokenCache
+
+
+class StaticToken:
+    """Credentials stub that always returns the same bearer token."""
+
+    async def get_token(self, session):
+        return "test-token"
+
+
+class FakeGoogle:
+    """Tiny local stand-in for the Docs/Drive endpoints the client uses."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.calls = []
+        self.app = web.Application()
+        self.app.router.add_post("/token", self.token)
+        self.app.router.add_get("/drive/files", self.files_list)
+        self.app.router.add_post("/drive/files/{file_id}/copy", self.files_copy)
+        self.app.router.add_get("/docs/documents/{doc_id}", self.documents_get)
+        self.app.router.add_post("/docs/documents/{doc_id}", self.documents_post)
+
+    def record(self, request, name, body=None):
+        assert request.headers["Authorization"] == "Bearer test-token"
+        self.calls.append((name, dict(request.query), body))
+
+    async def token(self, request):
+        form = await request.post()
+        self.calls.append(("token", dict(form), None))
+        return web.json_response({"access_token": "test-token", "expires_in": 3600})
+
+    async def files_list(self, request):
+        self.record(request, "files.list")
+        return web.json_response({"files": [{"id": "doc1", "name": "test_doc"}]})
+
+    async def files_copy(self, request):
+        self.record(request, "files.copy", await request.json())
+        return web.json_response({"id": "copy1"})
+
+    async def documents_get(self, request):
+        self.record(request, "documents.get")
+        if request.match_info["doc_id"] == "missing":
+            return web.json_response({"error": {"code": 404}}, status=404)
+        if request.query.get("fields") == "revisionId":
+            return web.json_response({"revisionId": self.doc["revisionId"]})
+        return web.json_response(self.doc)
+
+    async def documents_post(self, request):
+        doc_id, _, method = request.match_info["doc_id"].partition(":")
+        assert method == "batchUpdate"
+        self.record(request, "documents.batchUpdate", await request.json())
+        return web.json_response(
+            {"documentId": doc_id, "writeControl": {"requiredRevisionId": "rev2"}}
+        )
+
+
+@pytest_asyncio.fixture
+async def fake_google(agenda_doc):
+    fake = FakeGoogle(agenda_doc)
+    server = TestServer(fake.app)
+    await server.start_server()
+    fake.url = str(server.make_url("")).rstrip("/")
+    yield fake
+    await server.close()
+
+
+@pytest_asyncio.fixture
+async def client(fake_google):
+    client = AsyncGoogleClient(
+        StaticToken(),
+        docs_url=f"{fake_google.url}/docs",
+        drive_url=f"{fake_google.url}/drive",
+    )
+    yield client
+    await client.close()
+
+
+class TestAsyncGoogleClient:
+    """Test cases for AsyncGoogleClient."""
+
+    @pytest.mark.asyncio
+    async def test_files_list_encodes_params(self, client, fake_google):
+        """Booleans are sent the way Google expects them."""
+        resp = await client.files_list(q="name='x'", supportsAllDrives=True, pageToken=None)
+        assert resp["files"][0]["id"] == "doc1"
+        _, query, _ = fake_google.calls[-1]
+        assert query == {"q": "name='x'", "supportsAllDrives": "true"}
+
+    @pytest.mark.asyncio
+    async def test_errors_raise_http_error(self, client):
+        """HTTP errors surface as googleapiclient HttpError."""
+        with pytest.raises(HttpError) as excinfo:
+            await client.documents_get("missing")
+        assert excinfo.value.resp.status == 404
+
+
+class TestAsyncServiceAccountCredentials:
+    """Test cases for async token minting."""
+
+    @staticmethod
+    def service_account_info(fake_google) -> dict:
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode()
+        return {
+            "client_email": "bot@example.iam.gserviceaccount.com",
+            "private_key": pem,
+            "private_key_id": "k1",
+            "token_uri": f"{fake_google.url}/token",
+        }
+
+    @pytest.mark.asyncio
+    async def test_token_is_minted_once(self, client, fake_google):
+        """A signed JWT assertion is exchanged once and then reused."""
+        creds = AsyncServiceAccountCredentials(
+            self.service_account_info(fake_google), ["https://www.googleapis.com/auth/documents"]
+        )
+
+        assert await creds.get_token(client.session) == "test-token"
+        assert await creds.get_token(client.session) == "test-token"
+
+        token_calls = [c for c in fake_google.calls if c[0] == "token"]
+        assert len(token_calls) == 1
+        claims = jwt.decode(token_calls[0][1]["assertion"], verify=False)
+        assert claims["iss"] == "bot@example.iam.gserviceaccount.com"
+        assert claims["scope"] == "https://www.googleapis.com/auth/documents"
+
+    @pytest.mark.asyncio
+    async def test_token_cache_is_shared(self, client, fake_google, tmp_path):
+        """A token saved by one credentials object is reused by the next, e.g. after a restart."""
+        info = self.service_account_info(fake_google)
+        scopes = ["https://www.googleapis.com/auth/documents"]
+        cache = TokenCache(tmp_path / "tokens.json")
+
+        first = AsyncServiceAccountCredentials(info, scopes, cache)
+        expiry = await first.ensure_fresh(client.session)
+        restarted = AsyncServiceAccountCredentials(info, scopes, cache)
+
+        assert await restarted.get_token(client.session) == "test-token"
+        assert restarted.expiry == expiry
+        assert len([c for c in fake_google.calls if c[0] == "token"]) == 1
+
+
+class TestAsyncGoogleDocsManager:
+    """Test cases for AsyncGoogleDocsManager."""
+
+    @pytest.mark.asyncio
+    async def test_add_agenda_item(self, client, fake_google):
+        """An agenda add is one lookup, one get and one guarded batchUpdate."""
+        manager = AsyncGoogleDocsManager(client)
+        await manager.add_agenda_item("New item")
+
+        assert [c[0] for c in fake_google.calls] == [
+            "files.list", "documents.get", "documents.batchUpdate",
+        ]
+        body = fake_google.calls[-1][2]
+        assert body["writeControl"] == {"requiredRevisionId": "rev1"}
+        assert body["requests"][-1]["insertText"]["text"] == "New item"
+        assert manager.snapshots.peek("doc1")["revisionId"] == "rev2"
+
+    @pytest.mark.asyncio
+    async def test_second_add_reuses_caches(self, client, fake_google):
+        """The doc ID and snapshot are reused when nothing else changed."""
+        manager = AsyncGoogleDocsManager(client)
+        await manager.add_agenda_item("one")
+        fake_google.doc = manager.snapshots.peek("doc1")
+        fake_google.calls.clear()
+
+        await manager.add_agenda_item("two")
+
+        names = [c[0] for c in fake_google.calls]
+        assert names == ["documents.get", "documents.batchUpdate"]
+        assert fake_google.calls[0][1] == {"fields": "revisionId"}
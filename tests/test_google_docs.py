@@ -1,8 +1,32 @@
 """Tests for Google Docs integration."""
+import json
+import os
+import subprocess
+import sys
+import threading
+
 import pytest
 from unittest.mock import MagicMock, patch
+from google.auth.credentials import AnonymousCredentials
+from googleapiclient.errors import HttpError
 
-from ctf_bot.integrations.google_docs import GoogleDocsManager, find_doc_in_folder
+from ctf_bot.integrations.doc_snapshots import DocSnapshotCache
+from ctf_bot.integrations.google_docs import (
+    GoogleDocsManager,
+    GoogleServicePool,
+    add_row_and_fill,
+    add_rows_and_fill,
+    agenda_rows,
+    apply_agenda_insert,
+    build_agenda_insert_requests,
+    count_meeting_docs,
+    discovery_document,
+    find_agenda_table,
+    find_doc_in_folder,
+    locate_agenda,
+    make_docs_service,
+    make_drive_service,
+)
 
 
 class TestGoogleDocsManager:
@@ -28,6 +52,98 @@ class TestGoogleDocsManager:
             manager.add_agenda_item("Test agenda item")
             mock_add_row.assert_called_once()
 
+    def test_add_agenda_item_uses_doc_id_cache(self, mock_google_creds, mock_docs_service, mock_drive_service):
+        """Repeated agenda adds resolve the doc ID only once."""
+        mock_drive_service.files.return_value.list.return_value.execute.return_value = {
+            'files': [{'id': 'test_doc_id', 'name': 'test_doc', 'modifiedTime': '2023-01-01'}]
+        }
+
+        manager = GoogleDocsManager()
+
+        with patch('ctf_bot.integrations.google_docs.add_row_and_fill'):
+            manager.add_agenda_item("one")
+            manager.add_agenda_item("two")
+        assert mock_drive_service.files.return_value.list.call_count == 1
+
+    def test_add_agenda_item_invalidates_on_404(self, mock_google_creds, mock_docs_service, mock_drive_service):
+        """A 404 from Docs drops the cached ID and retries with a fresh lookup."""
+        mock_drive_service.files.return_value.list.return_value.execute.side_effect = [
+            {'files': [{'id': 'old_id', 'name': 'test_doc'}]},
+            {'files': [{'id': 'new_id', 'name': 'test_doc'}]},
+        ]
+        manager = GoogleDocsManager()
+        gone = HttpError(MagicMock(status=404), b'not found')
+
+        with patch('ctf_bot.integrations.google_docs.add_row_and_fill') as mock_add_row:
+            mock_add_row.side_effect = [gone, None]
+            manager.add_agenda_item("Test agenda item")
+            assert mock_add_row.call_args_list[1].args[1] == 'new_id'
+        assert manager.doc_id_cache.get('test_folder_id', 'test_doc') == 'new_id'
+
+    def test_rate_limited_403_keeps_cached_id(self, mock_google_creds, mock_docs_service, mock_drive_service):
+        """Drive's rate-limit 403 is throttling, not a missing doc: no fresh lookup or rerun."""
+        mock_drive_service.files.return_value.list.return_value.execute.return_value = {
+            'files': [{'id': 'test_doc_id', 'name': 'test_doc'}]
+        }
+        manager = GoogleDocsManager()
+        limited = HttpError(
+            MagicMock(status=403), b'{"error": {"errors": [{"reason": "userRateLimitExceeded"}]}}'
+        )
+
+        with patch('ctf_bot.integrations.google_docs.add_row_and_fill') as mock_add_row:
+            mock_add_row.side_effect = limited
+            with pytest.raises(HttpError):
+                manager.add_agenda_item("Test agenda item")
+            mock_add_row.assert_called_once()
+        assert manager.doc_id_cache.get('test_folder_id', 'test_doc') == 'test_doc_id'
+
+    def test_failed_template_copy_is_not_repeated(self, mock_google_creds, mock_docs_service, mock_drive_service):
+        """Only the template read is retried after a 404; the copy runs once, with one number."""
+        manager = GoogleDocsManager()
+        manager.doc_id_cache.put('test_folder_id', manager.tenant.template_doc_name, 'template_id')
+        copy = mock_drive_service.files.return_value.copy
+        copy.return_value.execute.side_effect = HttpError(MagicMock(status=404), b'not found')
+
+        with patch.object(manager.template_fields, 'get', return_value=frozenset({'XX'})), \
+                patch.object(manager.meeting_numbers, 'allocate', return_value=7) as allocate:
+            with pytest.raises(HttpError):
+                manager.create_from_template('meeting 07')
+        copy.assert_called_once()
+        allocate.assert_called_once()
+
+
+class TestGoogleServicePool:
+    """Test cases for the shared service pool."""
+
+    def test_services_reused_within_thread(self, mock_google_creds):
+        """A thread keeps getting the same service objects."""
+        with patch('ctf_bot.integrations.google_docs.make_docs_service') as make_docs:
+            make_docs.side_effect = lambda creds, scheduler, endpoint=None: MagicMock()
+            pool = GoogleServicePool()
+            assert pool.docs_service is pool.docs_service
+            make_docs.assert_called_once_with(pool.creds, None, endpoint=None)
+        mock_google_creds.assert_called_once()
+
+    def test_services_are_per_thread(self, mock_google_creds):
+        """Each thread builds its own services on shared credentials."""
+        with patch('ctf_bot.integrations.google_docs.make_drive_service') as make_drive:
+            make_drive.side_effect = lambda creds, scheduler, endpoint=None: MagicMock()
+            pool = GoogleServicePool()
+            seen = []
+            t = threading.Thread(target=lambda: seen.append(pool.drive_service))
+            t.start()
+            t.join()
+            assert seen[0] is not pool.drive_service
+            assert make_drive.call_count == 2
+        mock_google_creds.assert_called_once()
+
+    def test_manager_shares_pool(self, mock_google_creds, mock_docs_service, mock_drive_service):
+        """Managers built on one pool don't reload credentials."""
+        pool = GoogleServicePool()
+        GoogleDocsManager(pool)
+        GoogleDocsManager(pool)
+        mock_google_creds.assert_called_once()
+
 
 class TestGoogleDocsHelpers:
     """Test cases for Google Docs helper functions."""
@@ -48,4 +164,180 @@ class TestGoogleDocsHelpers:
         }
         
         with pytest.raises(RuntimeError, match="No Google Doc named"):
-            find_doc_in_folder(mock_drive_service, 'folder_id', 'doc_name')
\ No newline at end of file
+            find_doc_in_folder(mock_drive_service, 'folder_id', 'doc_name')
+
+    def test_count_meeting_docs_paginates(self, mock_drive_service):
+        """Every page is counted and the draft/template docs are excluded."""
+        mock_drive_service.files.return_value.list.return_value.execute.side_effect = [
+            {'files': [{'name': 'meeting 1'}, {'name': 'test_doc'}], 'nextPageToken': 'p2'},
+            {'files': [{'name': 'meeting 2'}, {'name': 'meeting template'}]},
+        ]
+
+        assert count_meeting_docs(mock_drive_service, 'folder_id') == 2
+        calls = mock_drive_service.files.return_value.list.call_args_list
+        assert calls[1].kwargs['pageToken'] == 'p2'
+
+class TestAgendaInsertRequests:
+    """Test cases for single-snapshot agenda inserts."""
+
+    def test_build_requests_computes_cell_indices(self, agenda_doc):
+        """Rows are appended in order and text goes in bottom-up."""
+        requests = build_agenda_insert_requests(agenda_doc, ['first ', 'second'])
+
+        rows = [r['insertTableRow']['tableCellLocation'] for r in requests[:2]]
+        assert [r['rowIndex'] for r in rows] == [0, 1]
+        assert all(r['tableStartLocation']['index'] == 15 for r in rows)
+        # New rows are 1 + 2*2 = 5 long, starting at the old table end (25)
+        assert [r['insertText'] for r in requests[2:]] == [
+            {'location': {'index': 32}, 'text': 'second'},
+            {'location': {'index': 27}, 'text': 'first'},
+        ]
+
+    def test_build_requests_without_agenda(self):
+        """A doc with no agenda table is rejected."""
+        with pytest.raises(RuntimeError, match="Couldn't find"):
+            build_agenda_insert_requests({'body': {'content': []}}, ['x'])
+
+    def test_add_rows_and_fill_single_round_trip(self, mock_docs_service, agenda_doc):
+        """Many rows cost one get and one batchUpdate."""
+        documents = mock_docs_service.documents.return_value
+        documents.get.return_value.execute.return_value = agenda_doc
+
+        add_rows_and_fill(mock_docs_service, 'doc_id', ['a', 'b', 'c'])
+
+        documents.get.assert_called_once()
+        documents.batchUpdate.assert_called_once()
+        body = documents.batchUpdate.call_args.kwargs['body']
+        assert len(body['requests']) == 6
+
+    def test_add_rows_and_fill_pins_revision(self, mock_docs_service, agenda_doc):
+        """The batchUpdate is guarded by the snapshot's revision."""
+        documents = mock_docs_service.documents.return_value
+        documents.get.return_value.execute.return_value = agenda_doc
+
+        add_rows_and_fill(mock_docs_service, 'doc_id', ['a'])
+
+        body = documents.batchUpdate.call_args.kwargs['body']
+        assert body['writeControl'] == {'requiredRevisionId': 'rev1'}
+
+    def test_add_row_and_fill_falls_back_on_revision_mismatch(self, mock_docs_service):
+        """A stale revision falls back to the re-fetching path."""
+        stale = HttpError(MagicMock(status=400), b'The required revision ID does not match')
+        with patch('ctf_bot.integrations.google_docs.add_rows_and_fill', side_effect=stale), \
+                patch('ctf_bot.integrations.google_docs.add_row_and_fill_refetch') as refetch:
+            add_row_and_fill(mock_docs_service, 'doc_id', 'item', index_arithmetic=True)
+            refetch.assert_called_once_with(mock_docs_service, 'doc_id', 'item')
+
+    def test_add_row_and_fill_other_errors_propagate(self, mock_docs_service):
+        """Errors other than a revision mismatch are not retried."""
+        boom = HttpError(MagicMock(status=500), b'backend error')
+        with patch('ctf_bot.integrations.google_docs.add_rows_and_fill', side_effect=boom), \
+                patch('ctf_bot.integrations.google_docs.add_row_and_fill_refetch') as refetch:
+            with pytest.raises(HttpError):
+                add_row_and_fill(mock_docs_service, 'doc_id', 'item', index_arithmetic=True)
+            refetch.assert_not_called()
+
+    def test_apply_agenda_insert_matches_requests(self, agenda_doc):
+        """The patched snapshot agrees with the index arithmetic."""
+        doc = agenda_doc
+        patched = apply_agenda_insert(doc, ['ab'], 'rev2')
+
+        assert patched['revisionId'] == 'rev2'
+        assert doc['revisionId'] == 'rev1'  # original left alone
+        table = patched['body']['content'][2]['table']
+        new_row = table['tableRows'][-1]
+        assert table['rows'] == 2
+        assert new_row['startIndex'] == 25
+        assert new_row['tableCells'][0]['content'][0]['startIndex'] == 27
+        assert new_row['endIndex'] == 32
+        assert patched['body']['content'][2]['endIndex'] == 33
+        assert patched['body']['content'][3]['startIndex'] == 33
+        # The next insert lands in the row after the one we just patched in
+        next_text = build_agenda_insert_requests(patched, ['c'])[-1]['insertText']
+        assert next_text['location']['index'] == 34
+
+    def test_add_rows_and_fill_updates_snapshot(self, mock_docs_service, agenda_doc):
+        """Our own write updates the cached snapshot to the returned revision."""
+        documents = mock_docs_service.documents.return_value
+        documents.get.return_value.execute.return_value = agenda_doc
+        documents.batchUpdate.return_value.execute.return_value = {
+            'writeControl': {'requiredRevisionId': 'rev2'}
+        }
+        snapshots = DocSnapshotCache('revisionId,body', max_size=4)
+
+        add_rows_and_fill(mock_docs_service, 'doc_id', ['a'], snapshots)
+
+        cached = snapshots.peek('doc_id')
+        assert cached['revisionId'] == 'rev2'
+        assert len(cached['body']['content'][2]['table']['tableRows']) == 2
+
+
+class TestLocateAgenda:
+    """Test cases for the early-exit agenda table locator."""
+
+    @pytest.mark.parametrize('revision_last', [False, True])
+    def test_same_agenda_as_full_parse(self, agenda_doc, revision_last):
+        """Wherever revisionId is, the located doc yields the same rows and requests."""
+        doc = dict(agenda_doc)
+        if revision_last:  # the order Google sends
+            doc['revisionId'] = doc.pop('revisionId')
+        located = locate_agenda(json.dumps(doc, indent=1).encode())
+
+        assert located['revisionId'] == 'rev1'
+        assert find_agenda_table(located)[1] == find_agenda_table(agenda_doc)[1]
+        assert agenda_rows(located) == agenda_rows(agenda_doc)
+        assert build_agenda_insert_requests(located, ['a', 'b']) == \
+            build_agenda_insert_requests(agenda_doc, ['a', 'b'])
+        patched = apply_agenda_insert(located, ['a'], 'rev2')
+        assert agenda_rows(patched) == agenda_rows(apply_agenda_insert(agenda_doc, ['a'], 'rev2'))
+        assert build_agenda_insert_requests(patched, ['c']) == build_agenda_insert_requests(
+            apply_agenda_insert(agenda_doc, ['a'], 'rev2'), ['c']
+        )
+
+    def test_stops_after_the_table(self, agenda_doc):
+        """Nothing after the agenda table is decoded, or kept."""
+        agenda_doc['body']['content'].append('@@')
+        raw = json.dumps(agenda_doc).replace('"@@"', '{not json')
+
+        located = locate_agenda(raw)
+
+        content = located['body']['content']
+        assert len(content) == 3
+        assert content[0] == {}
+        assert 'content' not in content[2]['table']['tableRows'][0]['tableCells'][1]
+
+    def test_no_agenda_table(self):
+        """A doc without the heading and table locates nothing, like find_agenda_table."""
+        raw = json.dumps({'revisionId': 'r', 'body': {'content': [{'endIndex': 1}]}})
+        assert find_agenda_table(locate_agenda(raw)) is None
+
+    def test_unrecognised_layout_is_fully_parsed(self):
+        assert locate_agenda(b'{"revisionId": "r"}') == {'revisionId': 'r'}
+
+
+class TestStartup:
+    """Clients come from the bundled discovery docs and load lazily."""
+
+    def test_import_does_not_load_client_stack(self):
+        """Importing the module leaves googleapiclient's discovery/http stack unloaded."""
+        code = (
+            "import sys, ctf_bot.integrations.google_docs\n"
+            "heavy = ['googleapiclient.discovery', 'googleapiclient.http', 'httplib2',\n"
+            "         'google.oauth2.service_account', 'google_auth_httplib2']\n"
+            "print([m for m in heavy if m in sys.modules])\n"
+        )
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        out = subprocess.run(
+            [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+        )
+        assert out.stdout.strip() == "[]"
+
+    def test_services_built_from_bundled_discovery(self):
+        """Services use the packaged discovery documents, honouring the endpoint."""
+        assert discovery_document("docs", "v1")["name"] == "docs"
+        with patch('googleapiclient.discovery.build') as build:
+            docs = make_docs_service(AnonymousCredentials())
+            drive = make_drive_service(AnonymousCredentials(), endpoint="http://localhost:1/drive/v3/")
+        build.assert_not_called()
+        assert docs._baseUrl == "https://docs.googleapis.com/"
+        assert drive._baseUrl == "http://localhost:1/drive/v3/"
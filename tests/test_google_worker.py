@@ -0,0 +1,121 @@
+"""Tests for running Google calls in a worker process."""
+import asyncio
+import threading
+
+import pytest
+
+from ctf_bot.config import FOLDER_ID, TARGET_DOC_NAME
+from ctf_bot.integrations.google_worker import GoogleWorkerProcess, WorkerCrashed, portable_error
+from ctf_bot.tenants import Tenant
+from ctf_bot.testing.fake_google import FakeGoogle, agenda_content
+
+
+def make_worker(fake: FakeGoogle, tmp_path, doc_name=TARGET_DOC_NAME) -> GoogleWorkerProcess:
+    tenant = Tenant("team-a", FOLDER_ID, target_doc_name=doc_name, state_dir=tmp_path)
+    return GoogleWorkerProcess(tenant, threads=2, factory=fake.manager_factory(), restart_delay=0)
+
+
+class Unpicklable(Exception):
+    def __reduce__(self):
+        raise TypeError("nope")
+
+
+class TestPortableError:
+    """Test cases for sending errors back from the worker."""
+
+    def test_picklable_errors_pass_through(self):
+        error = ValueError("bad")
+        assert portable_error(error) is error
+
+    def test_unpicklable_errors_become_runtime_errors(self):
+        error = portable_error(Unpicklable("bad"))
+        assert type(error) is RuntimeError
+        assert str(error) == "Unpicklable: bad"
+
+
+class TestAgainstFakeGoogle:
+    """The worker process end to end."""
+
+    @pytest.mark.asyncio
+    async def test_round_trip(self, tmp_path):
+        async with FakeGoogle() as fake:
+            doc_id = fake.add_document(TARGET_DOC_NAME, agenda_content(["First"]), FOLDER_ID)
+            worker = make_worker(fake, tmp_path)
+            try:
+                assert await worker.call("add_agenda_items", ["Second"]) == [None]
+                assert await worker.call("agenda_items") == ["First", "Second"]
+            finally:
+                await asyncio.to_thread(worker.close)
+
+        assert [row[0] for row in fake.documents[doc_id].tables()[0][1:]] == [
+            "First\n", "Second\n",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_spawns_off_the_event_loop(self, tmp_path):
+        """Starting the child doesn't stall the loop the Discord client runs on."""
+        async with FakeGoogle() as fake:
+            fake.add_document(TARGET_DOC_NAME, agenda_content(["First"]), FOLDER_ID)
+            worker = make_worker(fake, tmp_path)
+            start = worker._start
+            started_on = []
+
+            def record_start():
+                started_on.append(threading.current_thread())
+                start()
+
+            worker._start = record_start
+            try:
+                assert await worker.call("agenda_items") == ["First"]
+            finally:
+                await asyncio.to_thread(worker.close)
+
+        assert started_on and threading.main_thread() not in started_on
+
+    @pytest.mark.asyncio
+    async def test_errors_come_back(self, tmp_path):
+        async with FakeGoogle() as fake:
+            fake.add_document("empty", ["Nothing here\n"], FOLDER_ID)
+            worker = make_worker(fake, tmp_path, doc_name="empty")
+            try:
+                with pytest.raises(RuntimeError, match="Agenda"):
+                    await worker.call("agenda_items")
+            finally:
+                await asyncio.to_thread(worker.close)
+
+    @pytest.mark.asyncio
+    async def test_restarts_after_crash(self, tmp_path):
+        async with FakeGoogle() as fake:
+            fake.add_document(TARGET_DOC_NAME, agenda_content(["First"]), FOLDER_ID)
+            worker = make_worker(fake, tmp_path)
+            try:
+                assert await worker.call("agenda_items") == ["First"]
+                first = worker.process
+                first.kill()
+                await asyncio.to_thread(first.join)
+
+                assert await worker.call("agenda_items") == ["First"]
+                assert worker.process is not first
+                assert worker.restarts == 1
+            finally:
+                await asyncio.to_thread(worker.close)
+
+    @pytest.mark.asyncio
+    async def test_crash_fails_writes_and_retries_reads(self, tmp_path):
+        async with FakeGoogle() as fake:
+            fake.add_document(TARGET_DOC_NAME, agenda_content(["First"]), FOLDER_ID)
+            worker = make_worker(fake, tmp_path)
+            try:
+                await worker.call("agenda_items")  # worker is up
+                fake.latency = 5.0
+                write = asyncio.create_task(worker.call("add_agenda_items", ["Second"]))
+                read = asyncio.create_task(worker.call("agenda_items", True))
+                await asyncio.sleep(0.5)
+                fake.latency = 0.0
+                worker.process.kill()
+
+                with pytest.raises(WorkerCrashed):
+                    await write
+                assert await read == ["First"]
+            finally:
+                await asyncio.to_thread(worker.close)
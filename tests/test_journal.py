@@ -0,0 +1,140 @@
+"""Tests for the agenda write-ahead journal."""
+import pytest
+
+from ctf_bot.integrations.google_async import AsyncGoogleDocsManager
+from ctf_bot.journal import AgendaJournal, JournalReplayer
+from ctf_bot.testing.fake_google import FakeGoogle, agenda_content
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return AgendaJournal(tmp_path / "journal.sqlite3", max_attempts=2)
+
+
+class TestAgendaJournal:
+    """Test cases for AgendaJournal."""
+
+    def test_append_and_due(self, journal):
+        """Items come back in order until marked done."""
+        first = journal.append("one", channel_id=1, message_id=2)
+        journal.append("two")
+
+        due = journal.due(10)
+        assert [e.text for e in due] == ["one", "two"]
+        assert (due[0].channel_id, due[0].message_id) == (1, 2)
+
+        journal.mark_done([first])
+        assert [e.text for e in journal.due(10)] == ["two"]
+        assert journal.pending_count() == 1
+
+    def test_survives_reopen(self, journal, tmp_path):
+        """Pending items are still there for a new process."""
+        journal.append("one")
+        assert [e.text for e in AgendaJournal(tmp_path / "journal.sqlite3").due(10)] == ["one"]
+
+    def test_failed_attempts_back_off_then_give_up(self, journal):
+        journal.append("flaky")
+        entry = journal.due(10)[0]
+
+        assert journal.mark_attempt_failed(entry, "boom", retry_in=60) is False
+        assert journal.due(10) == []  # not due yet
+        assert journal.pending_count() == 1
+        assert 0 < journal.seconds_until_due() <= 60
+
+        entry = entry._replace(attempts=1)
+        assert journal.mark_attempt_failed(entry, "boom", retry_in=0) is True
+        assert journal.pending_count() == 0
+
+
+class TestJournalReplayer:
+    """Test cases for JournalReplayer."""
+
+    @pytest.mark.asyncio
+    async def test_replay_writes_batch_and_marks_results(self, journal):
+        """One write per batch; successes are done, failures stay pending."""
+        for text in ("a", "bad", "c"):
+            journal.append(text)
+        calls, settled = [], []
+
+        async def write(texts):
+            calls.append(texts)
+            return [RuntimeError("nope") if t == "bad" else None for t in texts]
+
+        async def on_settled(channel_id, message_id, failed):
+            settled.append((message_id, failed))
+
+        replayer = JournalReplayer(journal, write, batch_size=10, on_settled=on_settled)
+        assert await replayer.replay_once() == 3
+
+        assert calls == [["a", "bad", "c"]]
+        assert settled == [(None, []), (None, [])]
+        assert journal.pending_count() == 1
+        assert await replayer.replay_once() == 0  # "bad" is backing off
+
+    @pytest.mark.asyncio
+    async def test_write_exception_keeps_items(self, journal):
+        """If Google is down the whole batch stays in the journal."""
+        journal.append("a")
+
+        async def write(texts):
+            raise ConnectionError("offline")
+
+        settled = []
+
+        async def on_settled(channel_id, message_id, failed):
+            settled.append(failed)
+
+        replayer = JournalReplayer(journal, write, on_settled=on_settled)
+        await replayer.replay_once()
+        assert journal.pending_count() == 1
+        assert settled == []
+
+    @pytest.mark.asyncio
+    async def test_message_settles_once_after_its_last_item(self, tmp_path):
+        """A bulk message hears back once, after its last batch, with all failures together."""
+        journal = AgendaJournal(tmp_path / "journal.sqlite3", max_attempts=1)
+        journal.append_many(["a", "bad", "c", "worse"], channel_id=1, message_id=2)
+        journal.append("other", channel_id=1, message_id=3)
+        settled = []
+
+        async def write(texts):
+            return [RuntimeError(f"{t} rejected") if t in ("bad", "worse") else None
+                    for t in texts]
+
+        async def on_settled(channel_id, message_id, failed):
+            settled.append((channel_id, message_id, failed))
+
+        replayer = JournalReplayer(journal, write, batch_size=2, on_settled=on_settled)
+        assert await replayer.replay_once() == 2
+        assert settled == []  # c and worse are still pending
+        assert await replayer.replay_once() == 2
+        assert await replayer.replay_once() == 1
+        assert settled == [
+            (1, 2, [("bad", "bad rejected"), ("worse", "worse rejected")]),
+            (1, 3, []),
+        ]
+
+
+class TestBulkAgainstFakeGoogle:
+    """A pasted list goes out as a couple of API calls."""
+
+    @pytest.mark.asyncio
+    async def test_fifty_items_in_one_update(self, journal):
+        async with FakeGoogle() as fake:
+            fake.add_document("test_doc", agenda_content(), "test_folder_id")
+            manager = AsyncGoogleDocsManager(fake.async_client())
+            try:
+                await manager.add_agenda_items(["warm-up"])
+                fake.reset_stats()
+
+                texts = [f"Item {n}" for n in range(50)]
+                journal.append_many(texts)
+                replayer = JournalReplayer(journal, manager.add_agenda_items, batch_size=50)
+                assert await replayer.replay_once() == 50
+                assert journal.pending_count() == 0
+            finally:
+                await manager.client.close()
+
+        rows = fake.find("test_doc").tables()[0]
+        assert [row[0] for row in rows[2:]] == [f"{text}\n" for text in texts]
+        assert fake.stats()["total_calls"] <= 2
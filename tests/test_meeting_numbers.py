@@ -0,0 +1,75 @@
+"""Tests for the persistent meeting number allocator."""
+import threading
+
+from unittest.mock import MagicMock
+
+from ctf_bot.integrations.meeting_numbers import MeetingNumberAllocator
+
+
+class TestMeetingNumberAllocator:
+    """Test cases for MeetingNumberAllocator."""
+
+    def test_first_allocation_reconciles(self, tmp_path):
+        """An unknown folder is counted once, then numbers come from disk."""
+        count = MagicMock(return_value=7)
+        allocator = MeetingNumberAllocator(tmp_path / "m.sqlite3", "folder", count)
+
+        assert allocator.allocate() == 8
+        assert allocator.allocate() == 9
+        count.assert_called_once()
+
+    def test_numbers_survive_restart(self, tmp_path):
+        """A new allocator on the same database continues the sequence."""
+        db = tmp_path / "m.sqlite3"
+        MeetingNumberAllocator(db, "folder", lambda: 3).allocate()
+        count = MagicMock(return_value=0)
+        assert MeetingNumberAllocator(db, "folder", count).allocate() == 5
+        count.assert_not_called()
+
+    def test_reconcile_never_moves_backwards(self, tmp_path):
+        """Reconciling only catches up with Drive, it never reissues numbers."""
+        existing = [10]
+        allocator = MeetingNumberAllocator(tmp_path / "m.sqlite3", "folder", lambda: existing[0])
+        assert allocator.reconcile() == 10
+        existing[0] = 4
+        assert allocator.reconcile() == 10
+        existing[0] = 12
+        assert allocator.reconcile() == 12
+
+    def test_reconcile_overtakes_held_numbers(self, tmp_path):
+        """A number held back is no longer unused once Drive has that many meeting docs."""
+        existing = [3]
+        allocator = MeetingNumberAllocator(tmp_path / "m.sqlite3", "folder", lambda: existing[0])
+        held = [allocator.allocate(), allocator.allocate()]
+        assert held == [4, 5]
+        assert all(allocator.is_unused(n) for n in held)
+
+        existing[0] = 4
+        allocator.reconcile()
+        assert not allocator.is_unused(4)
+        assert allocator.is_unused(5)
+
+    def test_concurrent_allocations_are_unique(self, tmp_path):
+        """Parallel callers never get the same number."""
+        allocator = MeetingNumberAllocator(tmp_path / "m.sqlite3", "folder", lambda: 0)
+        allocator.reconcile()
+        numbers = []
+        lock = threading.Lock()
+
+        def allocate():
+            n = allocator.allocate()
+            with lock:
+                numbers.append(n)
+
+        threads = [threading.Thread(target=allocate) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(numbers) == list(range(1, 21))
+
+    def test_folders_are_independent(self, tmp_path):
+        """Each folder keeps its own counter."""
+        db = tmp_path / "m.sqlite3"
+        assert MeetingNumberAllocator(db, "a", lambda: 1).allocate() == 2
+        assert MeetingNumberAllocator(db, "b", lambda: 5).allocate() == 6
@@ -0,0 +1,119 @@
+"""Tests for latency histograms and the metrics endpoint."""
+import asyncio
+
+import aiohttp
+import pytest
+from unittest.mock import MagicMock
+
+from ctf_bot.integrations.scheduler import GoogleRequestScheduler
+from ctf_bot.metrics import (
+    Histogram,
+    MetricsRegistry,
+    format_stats,
+    registry,
+    start_metrics_server,
+)
+from ctf_bot.testing.fake_google import FakeGoogle, agenda_content
+from test_scheduler import http_error
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+class TestHistogram:
+    """Test cases for Histogram."""
+
+    def test_quantile_interpolates_within_bucket(self):
+        histogram = Histogram(buckets=(1.0, 2.0))
+        for value in (0.5, 1.5, 1.5, 1.5):
+            histogram.observe(value)
+        assert histogram.quantile(0.25) == pytest.approx(1.0)
+        assert histogram.quantile(1.0) == pytest.approx(2.0)
+        assert Histogram().quantile(0.5) == 0.0
+
+    def test_overflow_reports_highest_bound(self):
+        histogram = Histogram(buckets=(1.0,))
+        histogram.observe(5.0)
+        assert histogram.quantile(0.99) == 1.0
+
+
+class TestMetricsRegistry:
+    """Test cases for MetricsRegistry."""
+
+    def test_prometheus_text(self):
+        reg = MetricsRegistry()
+        reg.observe("command_seconds", 0.2, command="add-agenda", outcome="ok")
+        reg.inc("google_retries_total", method="docs.documents.get", status=429)
+
+        text = reg.render()
+        assert "# TYPE ctf_bot_command_seconds histogram" in text
+        assert 'ctf_bot_command_seconds_bucket{command="add-agenda",outcome="ok",le="0.1"} 0' in text
+        assert 'ctf_bot_command_seconds_bucket{command="add-agenda",outcome="ok",le="0.25"} 1' in text
+        assert 'ctf_bot_command_seconds_count{command="add-agenda",outcome="ok"} 1' in text
+        assert 'ctf_bot_google_retries_total{method="docs.documents.get",status="429"} 1' in text
+
+    def test_label_values_are_escaped(self):
+        reg = MetricsRegistry()
+        reg.inc("google_errors_total", method='a"b\\c')
+        assert 'method="a\\"b\\\\c"' in reg.render()
+
+    def test_format_stats(self):
+        reg = MetricsRegistry()
+        reg.observe("command_seconds", 0.05, command="create-doc", outcome="ok")
+        reg.inc("google_errors_total", method="drive.files.copy", status=500)
+        stats = format_stats(reg)
+        assert "create-doc" in stats
+        assert "errors: 1" in stats
+
+
+class TestInstrumentation:
+    """Google calls are timed by phase and retries are counted."""
+
+    def test_retries_and_errors_counted(self):
+        scheduler = GoogleRequestScheduler({}, max_retries=1, base_delay=0)
+        call = MagicMock(side_effect=[http_error(503), http_error(503)])
+        with pytest.raises(Exception):
+            scheduler.execute("docs.documents.get", call)
+        assert registry.counter("google_retries_total", method="docs.documents.get", status=503) == 1
+        assert registry.counter("google_errors_total", method="docs.documents.get", status=503) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("transport", ["thread", "asyncio"])
+    async def test_phases_recorded(self, transport):
+        scheduler = GoogleRequestScheduler.from_config()
+        async with FakeGoogle() as fake:
+            doc_id = fake.add_document("d", agenda_content(), "f")
+            if transport == "asyncio":
+                client = fake.async_client(scheduler)
+                await client.documents_get(doc_id)
+                await client.close()
+            else:
+                docs = fake.service_pool(scheduler).docs_service
+                await asyncio.to_thread(lambda: docs.documents().get(documentId=doc_id).execute())
+
+        phases = {
+            dict(key)["phase"]: histogram.count
+            for key, histogram in registry.histograms("google_request_seconds").items()
+        }
+        assert phases == {"queue": 1, "auth": 1, "request": 1, "parse": 1}
+
+
+class TestMetricsServer:
+    """Test cases for the /metrics endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_serves_prometheus_text(self, unused_tcp_port):
+        registry.observe("command_seconds", 0.1, command="add-agenda", outcome="ok")
+        runner = await start_metrics_server("127.0.0.1", unused_tcp_port)
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{unused_tcp_port}/metrics") as resp:
+                    assert resp.status == 200
+                    assert resp.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                    assert "ctf_bot_command_seconds_count" in await resp.text()
+        finally:
+            await runner.cleanup()
@@ -0,0 +1,245 @@
+"""Tests for pre-provisioned template copies."""
+import asyncio
+import itertools
+
+import pytest
+
+from ctf_bot.config import FOLDER_ID, TARGET_DOC_NAME, TEMPLATE_DOC_NAME
+from ctf_bot.integrations.google_async import AsyncGoogleDocsManager
+from ctf_bot.integrations.google_docs import GoogleDocsManager
+from ctf_bot.integrations.provisioner import (
+    STAGED_NAME_PREFIX,
+    StagedDoc,
+    StagedDocPool,
+    TemplateProvisioner,
+)
+from ctf_bot.tenants import DEFAULT_TENANT_NAME, Tenant
+from ctf_bot.testing.fake_google import FakeGoogle, agenda_content
+
+
+@pytest.fixture
+def pool(tmp_path):
+    return StagedDocPool(tmp_path / "staged.sqlite3", "folder")
+
+
+class FakeBackend:
+    """Async callables for TemplateProvisioner, recording what they did."""
+
+    def __init__(self):
+        self.template = ("template", "2026-01-01T00:00:00.000Z")
+        self.numbers = itertools.count(1)
+        self.ids = itertools.count(1)
+        self.built = []
+        self.discarded = []
+        self.fail_builds = 0
+
+    async def version(self):
+        return self.template
+
+    async def build(self, template_id, number):
+        if self.fail_builds:
+            self.fail_builds -= 1
+            raise RuntimeError("copy failed")
+        doc_id = f"copy-{next(self.ids)}"
+        self.built.append((doc_id, template_id, number))
+        return doc_id
+
+    async def discard(self, doc_id):
+        self.discarded.append(doc_id)
+
+    async def allocate(self):
+        return next(self.numbers)
+
+    def provisioner(self, pool, size):
+        return TemplateProvisioner(
+            pool, size, self.version, self.build, self.discard, self.allocate
+        )
+
+
+class TestStagedDocPool:
+    """Test cases for StagedDocPool."""
+
+    def test_claim_lowest_number_first(self, pool):
+        pool.add(StagedDoc("b", 8, "t", "m"))
+        pool.add(StagedDoc("a", 7, "t", "m"))
+
+        assert pool.claim().doc_id == "a"
+        assert pool.claim().doc_id == "b"
+        assert pool.claim() is None
+
+    def test_replace_only_unclaimed(self, pool):
+        """A copy handed out meanwhile is not resurrected by a recycle."""
+        pool.add(StagedDoc("old", 3, "t", "m"))
+        assert pool.replace("old", StagedDoc("new", 3, "t", "m2")) is True
+        assert pool.docs() == [StagedDoc("new", 3, "t", "m2")]
+
+        pool.claim()
+        assert pool.replace("new", StagedDoc("newer", 3, "t", "m3")) is False
+        assert pool.docs() == []
+
+    def test_folders_are_independent(self, tmp_path):
+        db = tmp_path / "staged.sqlite3"
+        StagedDocPool(db, "a").add(StagedDoc("x", 1, "t", "m"))
+        assert StagedDocPool(db, "b").claim() is None
+
+
+class TestTemplateProvisioner:
+    """Test cases for TemplateProvisioner."""
+
+    @pytest.mark.asyncio
+    async def test_fills_pool_to_size(self, pool):
+        backend = FakeBackend()
+        provisioner = backend.provisioner(pool, 2)
+
+        assert await provisioner.refill_once() == (0, 2)
+        assert [doc.meeting_number for doc in pool.docs()] == [1, 2]
+        assert await provisioner.refill_once() == (0, 0)
+
+        pool.claim()
+        assert await provisioner.refill_once() == (0, 1)
+        assert [doc.meeting_number for doc in pool.docs()] == [2, 3]
+
+    @pytest.mark.asyncio
+    async def test_recycles_stale_copies_keeping_numbers(self, pool):
+        """A newer template replaces staged copies without skipping numbers."""
+        backend = FakeBackend()
+        provisioner = backend.provisioner(pool, 2)
+        await provisioner.refill_once()
+        old_ids = [doc.doc_id for doc in pool.docs()]
+
+        backend.template = ("template", "2026-02-01T00:00:00.000Z")
+        assert await provisioner.refill_once() == (2, 0)
+
+        docs = pool.docs()
+        assert [doc.meeting_number for doc in docs] == [1, 2]
+        assert {doc.template_modified for doc in docs} == {backend.template[1]}
+        assert backend.discarded == old_ids
+
+    @pytest.mark.asyncio
+    async def test_failed_build_reuses_number(self, pool):
+        """A number allocated for a copy that failed goes to the next copy."""
+        backend = FakeBackend()
+        backend.fail_builds = 1
+        provisioner = backend.provisioner(pool, 1)
+
+        with pytest.raises(RuntimeError):
+            await provisioner.refill_once()
+        await provisioner.refill_once()
+        assert [doc.meeting_number for doc in pool.docs()] == [1]
+        assert pool.reserved() == []
+
+    @pytest.mark.asyncio
+    async def test_reserved_number_survives_restart(self, tmp_path):
+        """A number reserved before a failed build is used by the next provisioner too."""
+        backend = FakeBackend()
+        backend.fail_builds = 1
+        db = tmp_path / "staged.sqlite3"
+
+        with pytest.raises(RuntimeError):
+            await backend.provisioner(StagedDocPool(db, "folder"), 1).refill_once()
+
+        pool = StagedDocPool(db, "folder")
+        assert pool.reserved() == [1]
+        await backend.provisioner(pool, 1).refill_once()
+        assert [doc.meeting_number for doc in pool.docs()] == [1]
+        assert pool.reserved() == []
+
+
+def pooled_tenant(tmp_path) -> Tenant:
+    return Tenant(DEFAULT_TENANT_NAME, FOLDER_ID, state_dir=tmp_path, template_pool_size=1)
+
+
+class TestAgainstFakeGoogle:
+    """Staged copies end to end with GoogleDocsManager."""
+
+    @pytest.mark.asyncio
+    async def test_create_from_template_uses_staged_copy(self, tmp_path):
+        """A staged copy is renamed into place with its number already filled in."""
+        async with FakeGoogle() as fake:
+            fake.add_document(TEMPLATE_DOC_NAME, agenda_content(title="Meeting XX"), FOLDER_ID)
+            fake.add_document("meeting 01", agenda_content(title="Meeting 01"), FOLDER_ID)
+            manager = GoogleDocsManager(fake.service_pool(), tenant=pooled_tenant(tmp_path))
+
+            provisioner = TemplateProvisioner(
+                manager.staged_docs,
+                1,
+                version=lambda: asyncio.to_thread(manager.find_template_version),
+                build=lambda *args: asyncio.to_thread(manager.stage_template_copy, *args),
+                discard=lambda doc_id: asyncio.to_thread(manager.trash_document, doc_id),
+                allocate=lambda: asyncio.to_thread(manager.allocate_meeting_number),
+            )
+            await provisioner.refill_once()
+            staged_id = manager.staged_docs.docs()[0].doc_id
+            assert fake.files[staged_id]["name"].startswith(STAGED_NAME_PREFIX)
+
+            fake.reset_stats()
+            doc_id = await asyncio.to_thread(manager.create_from_template, "meeting 02")
+
+            assert doc_id == staged_id
+            assert fake.stats()["calls"] == {"drive.files.update": 1}
+            assert fake.files[doc_id]["name"] == "meeting 02"
+            assert fake.documents[doc_id].content[0] == "Meeting 02\n"
+
+            # The pool is empty now, so the next one is copied as before
+            other = await asyncio.to_thread(manager.create_from_template, "meeting 03")
+            assert fake.documents[other].content[0] == "Meeting 03\n"
+
+    @pytest.mark.asyncio
+    async def test_async_manager_uses_staged_copy(self, tmp_path):
+        async with FakeGoogle() as fake:
+            fake.add_document(TEMPLATE_DOC_NAME, agenda_content(title="Meeting XX"), FOLDER_ID)
+            manager = AsyncGoogleDocsManager(fake.async_client(), tenant=pooled_tenant(tmp_path))
+            await manager.reconcile_meeting_numbers()
+            try:
+                template_id, modified = await manager.find_template_version()
+                staged_id = await manager.stage_template_copy(template_id, 5)
+                manager.staged_docs.add(StagedDoc(staged_id, 5, template_id, modified))
+
+                doc_id = await manager.create_from_template("meeting 05")
+            finally:
+                await manager.client.close()
+
+        assert doc_id == staged_id
+        assert fake.files[doc_id]["name"] == "meeting 05"
+        assert fake.documents[doc_id].content[0] == "Meeting 05\n"
+
+    @pytest.mark.asyncio
+    async def test_overtaken_staged_copy_is_discarded(self, tmp_path):
+        """A copy whose number Drive has caught up with is trashed, not handed out."""
+        async with FakeGoogle() as fake:
+            fake.add_document(TEMPLATE_DOC_NAME, agenda_content(title="Meeting XX"), FOLDER_ID)
+            manager = GoogleDocsManager(fake.service_pool(), tenant=pooled_tenant(tmp_path))
+            await asyncio.to_thread(manager.reconcile_meeting_numbers)
+            template_id, modified = await asyncio.to_thread(manager.find_template_version)
+            number = await asyncio.to_thread(manager.allocate_meeting_number)
+            staged_id = await asyncio.to_thread(manager.stage_template_copy, template_id, number)
+            manager.staged_docs.add(StagedDoc(staged_id, number, template_id, modified))
+
+            # Someone made meeting 01 by hand, and resync-meetings counted it
+            fake.add_document("meeting 01", agenda_content(title="Meeting 01"), FOLDER_ID)
+            await asyncio.to_thread(manager.reconcile_meeting_numbers)
+            doc_id = await asyncio.to_thread(manager.create_from_template, "meeting 02")
+
+        assert doc_id != staged_id
+        assert fake.files[staged_id]["trashed"]
+        assert fake.documents[doc_id].content[0] == "Meeting 02\n"
+
+    @pytest.mark.asyncio
+    async def test_recreated_draft_uses_staged_copy(self, tmp_path):
+        """A missing draft takes the staged copy, keeping meeting numbers in order."""
+        async with FakeGoogle() as fake:
+            fake.add_document(TEMPLATE_DOC_NAME, agenda_content(title="Meeting XX"), FOLDER_ID)
+            fake.add_document("meeting 01", agenda_content(title="Meeting 01"), FOLDER_ID)
+            manager = GoogleDocsManager(fake.service_pool(), tenant=pooled_tenant(tmp_path))
+            await asyncio.to_thread(manager.reconcile_meeting_numbers)
+            template_id, modified = await asyncio.to_thread(manager.find_template_version)
+            number = await asyncio.to_thread(manager.allocate_meeting_number)
+            staged_id = await asyncio.to_thread(manager.stage_template_copy, template_id, number)
+            manager.staged_docs.add(StagedDoc(staged_id, number, template_id, modified))
+
+            await asyncio.to_thread(manager.add_agenda_item, "First")
+            doc_id = await asyncio.to_thread(manager.create_from_template, "meeting 03")
+
+        assert fake.files[staged_id]["name"] == TARGET_DOC_NAME
+        assert fake.documents[staged_id].content[0] == "Meeting 02\n"
+        assert fake.documents[doc_id].content[0] == "Meeting 03\n"
@@ -0,0 +1,142 @@
+"""Tests for the quota-aware request scheduler."""
+import functools
+import time
+
+import pytest
+from unittest.mock import MagicMock, patch
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpMockSequence
+
+from ctf_bot.integrations.scheduler import (
+    GoogleRequestScheduler,
+    ScheduledHttpRequest,
+    TokenBucket,
+    background_priority,
+    bucket_for,
+    retry_after,
+)
+
+
+def http_error(status, headers=None, content=b'{}'):
+    resp = {'status': str(status)}
+    resp.update(headers or {})
+    return HttpError(MagicMock(status=status, get=resp.get), content)
+
+
+class TestBuckets:
+    """Test cases for bucket classification and TokenBucket."""
+
+    def test_bucket_for(self):
+        assert bucket_for('drive.files.list') == 'drive_read'
+        assert bucket_for('drive.files.copy') == 'drive_write'
+        assert bucket_for('docs.documents.get') == 'docs_read'
+        assert bucket_for('docs.documents.batchUpdate') == 'docs_write'
+        assert bucket_for('drive.changes.getStartPageToken') == 'drive_read'
+        assert bucket_for('drive.changes.list') == 'drive_read'
+
+    def test_burst_then_rate_limited(self):
+        """Once the burst is spent, callers wait for the refill rate."""
+        bucket = TokenBucket(per_minute=600, burst=2)  # 10 per second
+        assert bucket.acquire() < 0.01
+        assert bucket.acquire() < 0.01
+        assert bucket.acquire() >= 0.05
+
+    def test_background_yields_to_interactive(self):
+        """Background work can't take a token while an interactive caller waits."""
+        bucket = TokenBucket(per_minute=600, burst=5)
+        with bucket._waiting(interactive=True):
+            assert bucket._try_take(interactive=False) > 0
+            assert bucket._try_take(interactive=True) == 0
+
+
+class TestGoogleRequestScheduler:
+    """Test cases for GoogleRequestScheduler."""
+
+    @pytest.fixture
+    def scheduler(self):
+        return GoogleRequestScheduler({}, max_retries=3)
+
+    def test_retries_transient_errors(self, scheduler):
+        """429/5xx are retried until the call succeeds."""
+        call = MagicMock(side_effect=[http_error(503), http_error(429), 'ok'])
+        with patch('ctf_bot.integrations.scheduler.time.sleep') as sleep:
+            assert scheduler.execute('docs.documents.get', call) == 'ok'
+        assert call.call_count == 3
+        assert sleep.call_count == 2
+
+    def test_honours_retry_after(self, scheduler):
+        """A Retry-After header overrides the computed backoff."""
+        call = MagicMock(side_effect=[http_error(429, {'retry-after': '7'}), 'ok'])
+        with patch('ctf_bot.integrations.scheduler.time.sleep') as sleep:
+            scheduler.execute('docs.documents.batchUpdate', call)
+        sleep.assert_called_once_with(7.0)
+
+    def test_retry_after_http_date(self):
+        """Retry-After may also be an HTTP date."""
+        future = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(time.time() + 30))
+        delay = retry_after(http_error(429, {'retry-after': future}))
+        assert 25 <= delay <= 31
+
+    def test_gives_up_after_max_retries(self, scheduler):
+        call = MagicMock(side_effect=http_error(503))
+        with patch('ctf_bot.integrations.scheduler.time.sleep'):
+            with pytest.raises(HttpError):
+                scheduler.execute('docs.documents.get', call)
+        assert call.call_count == 4
+
+    @pytest.mark.parametrize('method_id', ['drive.files.copy', 'docs.documents.batchUpdate'])
+    def test_does_not_retry_writes_after_server_errors(self, scheduler, method_id):
+        """A copy or document update that failed with a 5xx may still have gone through."""
+        call = MagicMock(side_effect=http_error(503))
+        with pytest.raises(HttpError):
+            scheduler.execute(method_id, call)
+        call.assert_called_once()
+
+        call = MagicMock(side_effect=[http_error(429), 'ok'])
+        with patch('ctf_bot.integrations.scheduler.time.sleep'):
+            assert scheduler.execute(method_id, call) == 'ok'
+
+    def test_does_not_retry_client_errors(self, scheduler):
+        call = MagicMock(side_effect=http_error(404))
+        with pytest.raises(HttpError):
+            scheduler.execute('docs.documents.get', call)
+        call.assert_called_once()
+
+    def test_background_priority_is_passed_to_bucket(self):
+        bucket = MagicMock()
+        bucket.acquire.return_value = 0.0
+        scheduler = GoogleRequestScheduler({'drive_read': bucket})
+        scheduler.execute('drive.files.list', lambda: None)
+        with background_priority():
+            scheduler.execute('drive.files.list', lambda: None)
+        assert [c.args for c in bucket.acquire.call_args_list] == [(True,), (False,)]
+
+    @pytest.mark.asyncio
+    async def test_execute_async_retries(self, scheduler):
+        attempts = []
+
+        async def call():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise http_error(500)
+            return 'ok'
+
+        with patch('ctf_bot.integrations.scheduler.asyncio.sleep') as sleep:
+            sleep.return_value = None
+            assert await scheduler.execute_async('docs.documents.get', call) == 'ok'
+        assert len(attempts) == 2
+
+    def test_scheduled_http_request(self, scheduler):
+        """Services built with ScheduledHttpRequest retry through the scheduler."""
+        http = HttpMockSequence([
+            ({'status': '503'}, b'{}'),
+            ({'status': '200'}, b'{"revisionId": "r1"}'),
+        ])
+        service = build(
+            'docs', 'v1', http=http, static_discovery=True,
+            requestBuilder=functools.partial(ScheduledHttpRequest, scheduler=scheduler),
+        )
+        with patch('ctf_bot.integrations.scheduler.time.sleep'):
+            doc = service.documents().get(documentId='d').execute()
+        assert doc == {'revisionId': 'r1'}
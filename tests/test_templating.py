@@ -0,0 +1,134 @@
+"""Tests for template placeholders."""
+import asyncio
+import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from ctf_bot.config import FOLDER_ID, TEMPLATE_DOC_NAME
+from ctf_bot.integrations.google_docs import GoogleDocsManager
+from ctf_bot.integrations.meeting_numbers import MeetingNumberAllocator
+from ctf_bot.integrations.templating import (
+    TemplateFieldCache,
+    fill_requests,
+    find_placeholders,
+    split_meeting_number,
+    template_fields,
+)
+from ctf_bot.testing.fake_google import FakeDocument, FakeGoogle, agenda_content
+
+
+def template_doc(revision="rev1"):
+    content = agenda_content(["{{ctf}} recap"], title="Meeting XX on {{date}}")
+    doc = FakeDocument("template", "t", content).render()
+    doc["revisionId"] = revision
+    return doc
+
+
+class TestPlaceholders:
+    """Test cases for placeholder detection and requests."""
+
+    def test_find_placeholders_in_paragraphs_and_tables(self):
+        assert find_placeholders(template_doc()) == {"XX", "{{date}}", "{{ctf}}"}
+
+    def test_find_placeholders_in_headers_footers_and_footnotes(self):
+        doc = FakeDocument("template", "t", ["No placeholders here\n"]).render()
+        doc["headers"] = {"h.1": {"headerId": "h.1", "content": [
+            {"paragraph": {"elements": [{"textRun": {"content": "Meeting XX\n"}}]}}
+        ]}}
+        doc["footers"] = {"f.1": {"footerId": "f.1", "content": [
+            {"paragraph": {"elements": [{"textRun": {"content": "{{date}}\n"}}]}}
+        ]}}
+        doc["footnotes"] = {"n.1": {"footnoteId": "n.1", "content": [
+            {"paragraph": {"elements": [{"textRun": {"content": "See {{ctf}}\n"}}]}}
+        ]}}
+        assert find_placeholders(doc) == {"XX", "{{date}}", "{{ctf}}"}
+
+    def test_fill_requests_only_for_used_placeholders(self):
+        fields = template_fields("meeting 07", 7, {"ctf": "Quals", "unused": "x"})
+        requests = fill_requests({"XX", "{{ctf}}", "{{attendees}}"}, fields)
+        assert [(r["replaceAllText"]["containsText"]["text"], r["replaceAllText"]["replaceText"])
+                for r in requests] == [("XX", "07"), ("{{ctf}}", "Quals")]
+
+    def test_fill_requests_without_detection(self):
+        """Undetected templates get every field plus the legacy XX."""
+        requests = fill_requests(None, {"meeting_number": "03", "ctf": "Quals"})
+        assert {r["replaceAllText"]["containsText"]["text"] for r in requests} == {
+            "XX", "{{meeting_number}}", "{{ctf}}",
+        }
+
+    def test_split_meeting_number(self):
+        number, rest = split_meeting_number({"XX", "{{meeting_number}}", "{{date}}"})
+        assert number == {"XX", "{{meeting_number}}"}
+        assert rest == {"{{date}}"}
+
+    def test_extra_fields_override_defaults(self):
+        fields = template_fields("meeting 07", 7, {"date": "2026-10-20"})
+        assert fields == {"title": "meeting 07", "meeting_number": "07", "date": "2026-10-20"}
+
+
+class TestTemplateFieldCache:
+    """Test cases for TemplateFieldCache."""
+
+    def test_rescans_only_when_revision_moves(self):
+        docs = MagicMock()
+        get = docs.documents.return_value.get
+        get.return_value.execute.side_effect = [
+            template_doc("rev1"),
+            {"revisionId": "rev1"},
+            {"revisionId": "rev2"},
+            template_doc("rev2"),
+        ]
+        cache = TemplateFieldCache()
+
+        first = cache.get(docs, "template")
+        assert cache.get(docs, "template") == first
+        cache.get(docs, "template")
+        revision_only = [c.kwargs["fields"] == "revisionId" for c in get.call_args_list]
+        assert revision_only == [False, True, True, False]
+        assert cache.peek("template")[0] == "rev2"
+
+
+class TestAgainstFakeGoogle:
+    """Template instantiation end to end."""
+
+    @pytest.mark.asyncio
+    async def test_one_write_fills_all_placeholders(self, tmp_path):
+        async with FakeGoogle() as fake:
+            fake.add_document(
+                TEMPLATE_DOC_NAME,
+                agenda_content(["{{ctf}} recap"], title="Meeting XX on {{date}}"),
+                FOLDER_ID,
+            )
+            manager = GoogleDocsManager(fake.service_pool())
+            manager.meeting_numbers = MeetingNumberAllocator(
+                tmp_path / "numbers.sqlite3", FOLDER_ID, None
+            )
+            manager.meeting_numbers.reconcile(6)
+
+            doc_id = await asyncio.to_thread(
+                manager.create_from_template, "meeting 07", None, {"ctf": "Quals"}
+            )
+
+        doc = fake.documents[doc_id]
+        assert doc.content[0] == f"Meeting 07 on {datetime.date.today().isoformat()}\n"
+        assert doc.tables()[0][1][0] == "Quals recap\n"
+        assert fake.stats()["calls"]["docs.documents.batchUpdate"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_template_id_is_looked_up_again(self, tmp_path):
+        """A cached template ID that is gone costs a lookup, not a second copy or number."""
+        async with FakeGoogle() as fake:
+            fake.add_document(TEMPLATE_DOC_NAME, agenda_content(title="Meeting XX"), FOLDER_ID)
+            manager = GoogleDocsManager(fake.service_pool())
+            manager.meeting_numbers = MeetingNumberAllocator(
+                tmp_path / "numbers.sqlite3", FOLDER_ID, None
+            )
+            manager.meeting_numbers.reconcile(6)
+            manager.doc_id_cache.put(FOLDER_ID, TEMPLATE_DOC_NAME, "deleted-template")
+
+            doc_id = await asyncio.to_thread(manager.create_from_template, "meeting 07")
+
+        assert fake.documents[doc_id].content[0] == "Meeting 07\n"
+        assert fake.stats()["calls"]["drive.files.copy"] == 1
+        assert manager.meeting_numbers.last_issued() == 7
@@ -0,0 +1,142 @@
+"""Tests for per-guild tenants."""
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from ctf_bot.config import FOLDER_ID, TARGET_DOC_NAME, TEMPLATE_DOC_NAME
+from ctf_bot.discord_bot import create_bot
+from ctf_bot.integrations.google_docs import GoogleDocsManager
+from ctf_bot.integrations.scheduler import GoogleRequestScheduler
+from ctf_bot.tenants import Tenant, TenantRegistry, default_tenant, load_tenants
+from ctf_bot.testing.fake_google import FakeGoogle, agenda_content
+
+
+def write_tenants(path, tenants, **extra):
+    path.write_text(json.dumps({"tenants": tenants, **extra}))
+    return path
+
+
+class TestLoadTenants:
+    """Test cases for load_tenants."""
+
+    def test_defaults_and_default_tenant(self, tmp_path):
+        path = write_tenants(tmp_path / "tenants.json", [
+            {"name": "team-a", "guilds": [1, "2"], "folder_id": "folder-a",
+             "quotas": {"docs_write": 30}},
+        ])
+        team_a, default = load_tenants(path, default_tenant())
+
+        assert team_a.guild_ids == {1, 2}
+        assert team_a.target_doc_name == TARGET_DOC_NAME
+        assert team_a.template_staging_folder_id == "folder-a"
+        assert team_a.state_dir.name == "team-a"
+        assert team_a.quotas == (("docs_write", 30.0),)
+        assert default.folder_id == FOLDER_ID
+
+    @pytest.mark.parametrize("tenants, message", [
+        ([{"name": "a", "guilds": [1]}], "no folder_id"),
+        ([{"name": "a", "guilds": [1], "folder_id": "f"},
+          {"name": "b", "guilds": [1], "folder_id": "g"}], "belongs to both"),
+        ([{"name": "a", "folder_id": "f"}], "leave out guilds"),
+        ([{"name": "a", "guilds": [1], "folder_id": "f", "quotas": {"sheets": 1}}], "unknown quota"),
+        ([{"name": "../a", "guilds": [1], "folder_id": "f"}], "plain"),
+    ])
+    def test_invalid(self, tmp_path, tenants, message):
+        path = write_tenants(tmp_path / "tenants.json", tenants)
+        with pytest.raises(RuntimeError, match=message):
+            load_tenants(path, default_tenant())
+
+    def test_without_default_tenant(self, tmp_path):
+        path = write_tenants(
+            tmp_path / "tenants.json", [{"name": "a", "folder_id": "f"}], default_tenant=False
+        )
+        assert [t.name for t in load_tenants(path, default_tenant())] == ["a"]
+
+
+class TestTenantRegistry:
+    """Test cases for TenantRegistry."""
+
+    def test_routes_guilds_and_falls_back_to_default(self, tmp_path):
+        path = write_tenants(tmp_path / "tenants.json", [
+            {"name": "team-a", "guilds": [1], "folder_id": "folder-a"},
+        ])
+        registry = TenantRegistry(path, default_tenant())
+
+        assert registry.for_guild(1).name == "team-a"
+        assert registry.for_guild(2).name == "default"
+        assert registry.for_guild(None).name == "default"
+
+    def test_no_file_means_default_only(self, tmp_path):
+        registry = TenantRegistry(tmp_path / "missing.json", default_tenant())
+        assert registry.tenants() == [default_tenant()]
+
+    def test_invalid_reload_keeps_current_setup(self, tmp_path):
+        path = write_tenants(tmp_path / "tenants.json", [
+            {"name": "team-a", "guilds": [1], "folder_id": "folder-a"},
+        ], default_tenant=False)
+        registry = TenantRegistry(path, default_tenant())
+        assert registry.for_guild(2) is None
+
+        path.write_text("{not json")
+        with pytest.raises(RuntimeError):
+            registry.reload()
+        assert registry.for_guild(1).folder_id == "folder-a"
+
+        write_tenants(path, [{"name": "team-a", "guilds": [1, 2], "folder_id": "folder-b"}])
+        registry.reload()
+        assert registry.for_guild(2).folder_id == "folder-b"
+
+
+class TestIsolation:
+    """Each tenant works on its own folder, docs and quota budget."""
+
+    def test_quota_overrides(self):
+        scheduler = GoogleRequestScheduler.from_config((("docs_write", 6.0),))
+        assert scheduler.buckets["docs_write"].rate == pytest.approx(0.1)
+
+    @pytest.mark.asyncio
+    async def test_managers_use_their_tenants_folder(self, tmp_path):
+        team_a = Tenant("team-a", "folder-a", target_doc_name="a draft", state_dir=tmp_path / "a")
+        team_b = Tenant("team-b", "folder-b", state_dir=tmp_path / "b")
+        async with FakeGoogle() as fake:
+            for tenant in (team_a, team_b):
+                fake.add_document(tenant.template_doc_name, agenda_content(), tenant.folder_id)
+            managers = [GoogleDocsManager(fake.service_pool(), tenant=t) for t in (team_a, team_b)]
+
+            await asyncio.gather(
+                asyncio.to_thread(managers[0].add_agenda_item, "for a"),
+                asyncio.to_thread(managers[1].add_agenda_item, "for b"),
+            )
+
+        draft_a = fake.find("a draft")
+        draft_b = fake.find(TARGET_DOC_NAME)
+        assert fake.files[draft_a.doc_id]["parents"] == ["folder-a"]
+        assert fake.files[draft_b.doc_id]["parents"] == ["folder-b"]
+        assert [row[0] for row in draft_a.tables()[0][1:]] == ["for a\n"]
+        assert [row[0] for row in draft_b.tables()[0][1:]] == ["for b\n"]
+        assert fake.find(TEMPLATE_DOC_NAME)
+
+    @pytest.mark.asyncio
+    async def test_bot_routes_commands_by_guild(self, tmp_path):
+        path = write_tenants(tmp_path / "tenants.json", [
+            {"name": "team-a", "guilds": [1], "folder_id": "folder-a", "doc_name": "a draft",
+             "state_dir": str(tmp_path / "a")},
+        ], default_tenant=False)
+        bot = create_bot(TenantRegistry(path, default_tenant()))
+        ctx = MagicMock()
+        ctx.reply = AsyncMock()
+        ctx.channel.id, ctx.message.id = 10, 20
+
+        ctx.guild.id = 1
+        await bot.get_command('add-agenda')(ctx, item="Quals recap")
+        ctx.reply.assert_called_with(
+            "📝 Recorded for the 'a draft' agenda table. I'll react with ✅ once it's in the doc."
+        )
+        journal = tmp_path / "a" / "agenda_journal.sqlite3"
+        assert journal.exists()
+
+        ctx.guild.id = 2
+        await bot.get_command('add-agenda')(ctx, item="Quals recap")
+        ctx.reply.assert_called_with("This server isn't set up with a Google Drive folder.")
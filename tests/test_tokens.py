@@ -0,0 +1,175 @@
+"""Tests for access token refresh and the on-disk token cache."""
+import datetime
+import stat
+import threading
+
+import pytest
+
+from ctf_bot.integrations.tokens import (
+    ServiceAccountTokens,
+    TokenCache,
+    TokenRefresher,
+)
+
+
+class FakeCreds:
+    """google-auth credentials stand-in minting a new token per refresh."""
+
+    service_account_email = "bot@example.iam.gserviceaccount.com"
+    scopes = ["https://www.googleapis.com/auth/documents"]
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.token = None
+        self.expiry = None
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self.expiry = datetime.datetime.fromtimestamp(
+            self.clock() + 3600, datetime.timezone.utc
+        ).replace(tzinfo=None)
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenCache:
+    """Test cases for TokenCache."""
+
+    def test_round_trip_owner_only(self, tmp_path):
+        cache = TokenCache(tmp_path / "state" / "tokens.json")
+        cache.save("key", "abc", 4_000_000_000.0)
+
+        assert cache.load("key") == ("abc", 4_000_000_000.0)
+        assert cache.load("other") is None
+        assert stat.S_IMODE(cache.path.stat().st_mode) == 0o600
+
+    def test_only_a_directory_it_creates_is_tightened(self, tmp_path):
+        created = tmp_path / "state"
+        TokenCache(created / "tokens.json").save("key", "abc", 4_000_000_000.0)
+        assert stat.S_IMODE(created.stat().st_mode) == 0o700
+
+        shared = tmp_path / "shared"
+        shared.mkdir()
+        shared.chmod(0o755)
+        TokenCache(shared / "tokens.json").save("key", "abc", 4_000_000_000.0)
+        assert stat.S_IMODE(shared.stat().st_mode) == 0o755
+        assert [p.name for p in shared.iterdir()] == ["tokens.json"]
+
+    def test_failed_save_is_only_logged(self, tmp_path, capsys):
+        not_a_dir = tmp_path / "file"
+        not_a_dir.write_text("")
+        cache = TokenCache(not_a_dir / "tokens.json")
+        cache.save("key", "abc", 4_000_000_000.0)
+        assert cache.load("key") is None
+        assert "Couldn't save Google tokens" in capsys.readouterr().out
+
+    def test_concurrent_saves_keep_every_token(self, tmp_path):
+        """Threads saving through separate caches for one file don't lose each other's tokens."""
+        path = tmp_path / "tokens.json"
+        threads = [
+            threading.Thread(
+                target=TokenCache(path).save, args=(f"key {i}", f"token {i}", 4_000_000_000.0)
+            )
+            for i in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        cache = TokenCache(path)
+        assert [cache.load(f"key {i}") for i in range(8)] == [
+            (f"token {i}", 4_000_000_000.0) for i in range(8)
+        ]
+
+    def test_expired_tokens_are_dropped_on_save(self, tmp_path):
+        cache = TokenCache(tmp_path / "tokens.json")
+        cache.save("old", "abc", 1.0)
+        cache.save("new", "def", 4_000_000_000.0)
+        assert cache.load("old") is None
+
+    def test_unreadable_file_is_empty(self, tmp_path):
+        path = tmp_path / "tokens.json"
+        path.write_text("not json")
+        assert TokenCache(path).load("key") is None
+
+
+class TestServiceAccountTokens:
+    """Test cases for ServiceAccountTokens."""
+
+    def test_refreshes_only_near_expiry(self, tmp_path):
+        clock = Clock()
+        creds = FakeCreds(clock)
+        tokens = ServiceAccountTokens(creds, TokenCache(tmp_path / "t.json"), 600, clock)
+
+        expiry = tokens.ensure_fresh()
+        assert creds.token == "token-1"
+        assert expiry == clock.now + 3600
+
+        clock.now += 2000
+        tokens.ensure_fresh()
+        assert creds.refreshes == 1
+
+        clock.now += 1100  # within the margin
+        assert tokens.ensure_fresh() == clock.now + 3600
+        assert creds.token == "token-2"
+
+    def test_unwritable_cache_does_not_fail_refresh(self, tmp_path):
+        """A token that was minted is used even if it can't be cached."""
+        (tmp_path / "file").write_text("")
+        clock = Clock()
+        creds = FakeCreds(clock)
+        tokens = ServiceAccountTokens(creds, TokenCache(tmp_path / "file" / "t.json"), 600, clock)
+        assert tokens.ensure_fresh() == clock.now + 3600
+        assert creds.token == "token-1"
+
+    def test_restart_reuses_cached_token(self, tmp_path):
+        clock = Clock()
+        cache = TokenCache(tmp_path / "t.json")
+        ServiceAccountTokens(FakeCreds(clock), cache, 600, clock).ensure_fresh()
+
+        creds = FakeCreds(clock)
+        tokens = ServiceAccountTokens(creds, cache, 600, clock)
+
+        assert creds.token == "token-1"
+        assert tokens.ensure_fresh() == clock.now + 3600
+        assert creds.refreshes == 0
+
+
+class TestTokenRefresher:
+    """Test cases for TokenRefresher."""
+
+    @pytest.mark.asyncio
+    async def test_sleeps_until_margin_before_expiry(self):
+        clock = Clock()
+
+        async def refresh():
+            return clock.now + 3600
+
+        refresher = TokenRefresher(refresh, margin=600, clock=clock)
+        assert await refresher.refresh_once() == 3000
+
+    @pytest.mark.asyncio
+    async def test_failures_are_retried(self):
+        async def refresh():
+            raise RuntimeError("token endpoint down")
+
+        refresher = TokenRefresher(refresh, retry_interval=30)
+        assert await refresher.refresh_once() == 30
+
+    @pytest.mark.asyncio
+    async def test_stops_without_a_token_to_manage(self):
+        async def refresh():
+            return None
+
+        refresher = TokenRefresher(refresh)
+        refresher.start()
+        await refresher.task
+        assert refresher.task.done()